@@ -10,6 +10,7 @@ Note:
 """
 import numpy as np
 from . import stats
+from . import parallel
 from .single_process_analysis import SingleProcessAnalysis
 from .estimator import find_estimator
 
@@ -86,7 +87,17 @@ class ActiveInformationStorage(SingleProcessAnalysis):
         Args:
             settings : dict
                 parameters for estimation and statistical testing, see
-                documentation of analyse_single_process() for details
+                documentation of analyse_single_process() for details,
+                settings can further contain
+
+                - executor : str [optional] - 'serial', 'pool', or
+                  'disk_queue', analyse processes in parallel worker
+                  processes, see documentation of the parallel module for
+                  details and further settings (default='serial')
+                - seed : int [optional] - seed for the random number
+                  generator, results are reproducible independent of the
+                  executor (default=None)
+
             data : Data instance
                 raw data for analysis
             process : list of int | 'all'
@@ -111,12 +122,15 @@ class ActiveInformationStorage(SingleProcessAnalysis):
 
         # Perform AIS estimation for each target individually.
         settings.setdefault('verbose', True)
+        labels = ['\n####### analysing process {0} of {1}'.format(
+                                    processes[t], processes)
+                  for t in range(len(processes))]
+        res_processes = parallel.analyse_nodes(
+            self, 'analyse_single_process', settings, data,
+            [(p,) for p in processes], labels)
         results = {}
         for t in range(len(processes)):
-            if settings['verbose']:
-                print('\n####### analysing process {0} of {1}'.format(
-                                                processes[t], processes))
-            r = self.analyse_single_process(settings, data, processes[t])
+            r = res_processes[t]
             r['process'] = processes[t]
             results[processes[t]] = r
         return results
@@ -164,6 +178,14 @@ class ActiveInformationStorage(SingleProcessAnalysis):
                   by shuffling realisations in time instead of shuffling
                   replications; see documentation of Data.permute_samples() for
                   further settings (default=False)
+                - perm_adaptive : bool [optional] - create surrogates in
+                  batches and stop permutation tests once the decision is
+                  settled; see documentation of stats.max_statistic() for
+                  further settings (default=False)
+                - perm_warm_start : bool [optional] - re-use permutations and
+                  surrogate realisations across rounds of candidate
+                  selection; see documentation of stats.max_statistic() for
+                  this and for screening of candidates (default=False)
                 - verbose : bool [optional] - toggle console output
                   (default=True)
 
@@ -177,8 +199,10 @@ class ActiveInformationStorage(SingleProcessAnalysis):
                 results consisting of sets of selected variables as, the
                 current value for this analysis, results for omnibus test
                 (joint influence of all selected variables, omnibus TE,
-                p-value, and significance); NOTE that all variables are listed
-                as tuples (process, lag wrt. current value)
+                p-value, and significance), and the number of permutations
+                used by each statistical test ('n_perm_used'); NOTE that all
+                variables are listed as tuples (process, lag wrt. current
+                value)
         """
         # Check input and clean up object if it was used before.
         self._initialise(settings, data, process)
@@ -201,6 +225,7 @@ class ActiveInformationStorage(SingleProcessAnalysis):
             'ais': self.ais,
             'ais_pval': self.pvalue,
             'ais_sign': self.sign,
+            'n_perm_used': self._n_perm_used,
             'settings': self.settings}
         self._reset()  # remove realisations and min_stats surrogate table
         return results
@@ -273,6 +298,10 @@ class ActiveInformationStorage(SingleProcessAnalysis):
             self.sign = False
             self.ais = None
             self._min_stats_surr_table = None
+        self._n_perm_used = {}
+        self._max_stats_perm = None
+        self._max_stats_surr_realisations = {}
+        self._max_stats_surr_distribution = None
 
         # Check if the user provided a list of candidates that must go into
         # the conditioning set. These will be added and used for TE estimation,
@@ -314,14 +343,17 @@ class ActiveInformationStorage(SingleProcessAnalysis):
         success = False
         while candidate_set:
             # Get realisations for all candidates.
-            cand_real = data.get_realisations(self.current_value,
-                                              candidate_set)[0]
-            cand_real = cand_real.T.reshape(cand_real.size, 1)
+            cand_real = data.get_realisations_stacked(self.current_value,
+                                                      candidate_set)
 
             # Calculate the (C)MI for each candidate and the target.
             temp_te = self._cmi_estimator.estimate_mult(
                                 n_chunks=len(candidate_set),
                                 re_use=['var2', 'conditional'],
+                                cache_keys=self._get_cache_keys(
+                                    data, candidate_set,
+                                    [self.selected_vars_full] *
+                                    len(candidate_set)),
                                 var1=cand_real,
                                 var2=self._current_value_realisations,
                                 conditional=self._selected_vars_realisations)
@@ -345,11 +377,14 @@ class ActiveInformationStorage(SingleProcessAnalysis):
                 success = True
                 # Remove candidate from candidate set and add it to the
                 # selected variables (used as the conditioning set).
-                candidate_set.pop(np.argmax(temp_te))
+                # Realisations of the max candidate are re-used from the
+                # stacked candidate realisations.
+                i_max = np.argmax(temp_te)
+                n_real = data.n_realisations(self.current_value)
+                candidate_set.pop(i_max)
                 self._append_selected_vars(
                         [max_candidate],
-                        data.get_realisations(self.current_value,
-                                              [max_candidate])[0])
+                        cand_real[i_max * n_real:(i_max + 1) * n_real])
             else:
                 if self.settings['verbose']:
                     print(' -- not significant')
@@ -371,35 +406,27 @@ class ActiveInformationStorage(SingleProcessAnalysis):
         """
         # FOR LATER we don't need to test the last included in the first round
         while self.selected_vars_sources:
-            # Find the candidate with the minimum TE into the target.
-            cond_dim = len(self.selected_vars_sources) - 1
-            candidate_realisations = np.empty(
-                                (data.n_realisations(self.current_value) *
-                                 len(self.selected_vars_sources), 1))
-            conditional_realisations = np.empty(
-                                (data.n_realisations(self.current_value) *
-                                 len(self.selected_vars_sources), cond_dim))
-            i_1 = 0
-            i_2 = data.n_realisations(self.current_value)
-            for candidate in self.selected_vars_sources:
-                # Separate the candidate realisations and all other
-                # realisations to test the candidate's individual contribution.
-                [temp_cond, temp_cand] = self._separate_realisations(
+            # Find the candidate with the minimum TE into the target. Separate
+            # each candidate's realisations from all other realisations to
+            # test the candidate's individual contribution, realisations for
+            # all candidates are gathered at once.
+            [conditional_realisations,
+             candidate_realisations] = self._separate_realisations_all(
                                             self.selected_vars_sources,
-                                            candidate)
-                if temp_cond is None:
-                    conditional_realisations = None
-                    re_use = ['var2', 'conditional']
-                else:
-                    conditional_realisations[i_1:i_2, ] = temp_cond
-                    re_use = ['var2']
-                candidate_realisations[i_1:i_2, ] = temp_cand
-                i_1 = i_2
-                i_2 += data.n_realisations(self.current_value)
+                                            self.selected_vars_sources)
+            if conditional_realisations is None:
+                re_use = ['var2', 'conditional']
+            else:
+                re_use = ['var2']
 
             temp_te = self._cmi_estimator.estimate_mult(
                                     n_chunks=len(self.selected_vars_sources),
                                     re_use=re_use,
+                                    cache_keys=self._get_cache_keys(
+                                        data, self.selected_vars_sources,
+                                        [[v for v in self.selected_vars_sources
+                                          if v != c]
+                                         for c in self.selected_vars_sources]),
                                     var1=candidate_realisations,
                                     var2=self._current_value_realisations,
                                     conditional=conditional_realisations)
@@ -463,6 +490,7 @@ class ActiveInformationStorage(SingleProcessAnalysis):
 
     def _reset(self):
         """Reset instance after analysis."""
+        self._print_cache_info()
         self.__init__()
         del self.pvalue
         del self.sign
@@ -12,6 +12,7 @@ Note:
 import numpy as np
 import itertools as it
 from . import stats
+from . import parallel
 from .network_inference import NetworkInference
 
 
@@ -106,6 +107,13 @@ class BivariateTE(NetworkInference):
 
                 - verbose : bool [optional] - toggle console output
                   (default=True)
+                - executor : str [optional] - 'serial', 'pool', or
+                  'disk_queue', analyse targets in parallel worker processes,
+                  see documentation of the parallel module for details and
+                  further settings (default='serial')
+                - seed : int [optional] - seed for the random number
+                  generator, results are reproducible independent of the
+                  executor (default=None)
 
             data : Data instance
                 raw data for analysis
@@ -143,12 +151,14 @@ class BivariateTE(NetworkInference):
 
         # Perform TE estimation for each target individually
         settings.setdefault('verbose', True)
+        labels = ['####### analysing target {0} of {1}'.format(t, targets)
+                  for t in range(len(targets))]
+        res_targets = parallel.analyse_nodes(
+            self, 'analyse_single_target', settings, data,
+            [(targets[t], sources[t]) for t in range(len(targets))], labels)
         results = {}
         for t in range(len(targets)):
-            if settings['verbose']:
-                print('####### analysing target {0} of {1}'.format(t, targets))
-            r = self.analyse_single_target(settings, data,
-                                           targets[t], sources[t])
+            r = res_targets[t]
             r['target'] = targets[t]
             r['sources'] = sources[t]
             results[targets[t]] = r
@@ -231,8 +241,23 @@ class BivariateTE(NetworkInference):
                   by shuffling realisations in time instead of shuffling
                   replications; see documentation of Data.permute_samples() for
                   further settings (default=False)
+                - perm_adaptive : bool [optional] - create surrogates in
+                  batches and stop permutation tests once the decision is
+                  settled; see documentation of stats.max_statistic() for
+                  further settings (default=False)
+                - perm_warm_start : bool [optional] - re-use permutations and
+                  surrogate realisations across rounds of candidate
+                  selection; see documentation of stats.max_statistic() for
+                  this and for screening of candidates (default=False)
                 - verbose : bool [optional] - toggle console output
                   (default=True)
+                - executor : str [optional] - 'serial', 'pool', or
+                  'disk_queue', analyse targets in parallel worker processes,
+                  see documentation of the parallel module for details and
+                  further settings (default='serial')
+                - seed : int [optional] - seed for the random number
+                  generator, results are reproducible independent of the
+                  executor (default=None)
 
             data : Data instance
                 raw data for analysis
@@ -250,8 +275,10 @@ class BivariateTE(NetworkInference):
                 past), pvalues and TE for each selected variable, the current
                 value for this analysis, results for omnibus test (joint
                 influence of all selected source variables on the target,
-                omnibus TE, p-value, and significance); NOTE that all variables
-                are listed as tuples (process, lag wrt. current value)
+                omnibus TE, p-value, and significance), and the number of
+                permutations used by each statistical test ('n_perm_used');
+                NOTE that all variables are listed as tuples (process, lag
+                wrt. current value)
         """
         # Check input and clean up object if it was used before.
         self._initialise(settings, data, sources, target)
@@ -284,7 +311,8 @@ class BivariateTE(NetworkInference):
             'selected_sources_te': self.te_sign_sources,
             'omnibus_te': self.te_omnibus,
             'omnibus_pval': self.pvalue_omnibus,
-            'omnibus_sign': self.sign_omnibus}
+            'omnibus_sign': self.sign_omnibus,
+            'n_perm_used': self._n_perm_used}
         self._reset()  # remove attributes
         return results
 
@@ -4,7 +4,9 @@ Created on Mon Mar  7 18:13:27 2016
 
 @author: patricia
 """
+import hashlib
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from . import idtxl_utils as utils
 
 VERBOSE = False
@@ -123,6 +125,20 @@ class Data():
         print('overwriting existing data')
         del(self._data)
 
+    @property
+    def fingerprint(self):
+        """Return a hash of the data.
+
+        The fingerprint identifies the data, e.g., when caching estimates. It
+        is computed when first requested and reset when new data is set.
+        """
+        if getattr(self, '_fingerprint', None) is None:
+            data = np.ascontiguousarray(self.data)
+            h = hashlib.sha1(repr((data.shape, data.dtype.str)).encode())
+            h.update(data)
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
     def set_data(self, data, dim_order):
         """Overwrite data in an existing Data object.
 
@@ -153,11 +169,102 @@ class Data():
             delattr(self, 'data')
         except AttributeError:
             pass
+        self._free_shared_data()
         if self.normalise:
             self.data = self._normalise_data(data_ordered)
         else:
             self.data = data_ordered
         self.data_type = type(self.data[0, 0, 0])
+        self._fingerprint = None
+
+    def share_data(self, file_name=None):
+        """Move data into memory that can be shared between processes.
+
+        Copy the (normalised) data into a shared memory block or, if a file
+        name is provided, into a memory-mapped file. When the Data instance
+        is pickled, e.g., when it is sent to worker processes during parallel
+        network analysis, only the name of the block or file is transferred.
+        Unpickled instances attach to the existing memory instead of holding
+        their own copy of the data, such that memory use does not grow with
+        the number of workers. Attached data are read-only.
+
+        The instance calling share_data() owns the memory block and removes
+        it when new data are set, when unshare_data() is called, or when the
+        instance is garbage collected. Memory-mapped files are not removed.
+
+        Args:
+            file_name : str [optional]
+                file used to store the memory-mapped data, if None, a shared
+                memory block is used (default=None)
+        """
+        if not hasattr(self, 'data'):
+            raise AttributeError('No data have been added.')
+        self.unshare_data()
+        if file_name is None:
+            shm, data = utils.share_array(self.data)
+            self._shared_memory = shm
+            self._shared = ('shared_memory', shm.name, data.shape,
+                            data.dtype.str)
+        else:
+            data = np.memmap(file_name, mode='w+', dtype=self.data.dtype,
+                             shape=self.data.shape)
+            data[:] = self.data
+            data.flush()
+            self._shared = ('memmap', file_name, data.shape, data.dtype.str)
+        del self._data
+        self.data = data
+
+    def unshare_data(self):
+        """Copy shared data back into private memory and free shared memory.
+
+        Calling the method on data that is not shared does nothing.
+        """
+        if getattr(self, '_shared', None) is None:
+            return
+        data = np.array(self.data)
+        del self._data
+        self.data = data
+        self._free_shared_data()
+
+    def _free_shared_data(self):
+        """Detach from shared data and remove owned shared memory."""
+        self._shared = None
+        shm = getattr(self, '_shared_memory', None)
+        self._shared_memory = None
+        if shm is not None:
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:  # views on the buffer still exist
+                pass
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if getattr(self, '_shared', None) is not None:
+            del state['_data']
+            state['_shared_memory'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        shared = state.get('_shared', None)
+        if shared is None:
+            return
+        kind, name, shape, dtype = shared
+        if kind == 'shared_memory':
+            # Keep a reference to the block, the view does not keep it open.
+            self._attached_memory, data = utils.attach_shared_array(
+                                                        name, shape, dtype)
+        else:
+            data = np.memmap(name, mode='r', dtype=dtype, shape=shape)
+        data.flags.writeable = False
+        self._data = data
+
+    def __del__(self):
+        try:
+            self._free_shared_data()
+        except Exception:
+            pass
 
     def _normalise_data(self, d):
         """Z-standardise data separately for each process."""
@@ -239,46 +346,25 @@ class Data():
             raise RuntimeError('All indices for which data is retrieved must '
                                ' be smaller than the current value.')
 
-        # Allocate memory.
-        n_real_time = self.n_realisations_samples(current_value)
-        n_real_repl = self.n_realisations_repl()
-        realisations = np.empty((n_real_time * n_real_repl,
-                                 len(idx_list))).astype(self.data_type)
+        # Gather realisations of all variables from the embedding view in a
+        # single indexing operation.
+        procs, samples = self._get_idx_arrays(idx_list)
+        realisations = self._gather_realisations(current_value, procs,
+                                                 samples)
 
         # Shuffle the replication order if requested. This creates surrogate
         # data by permuting replications while keeping the order of samples
         # intact.
         if shuffle:
             replications_order = np.random.permutation(self.n_replications)
+            realisations = realisations[replications_order]
         else:
             replications_order = np.arange(self.n_replications)
-
-        # Retrieve data.
-        i = 0
-        for idx in idx_list:
-            r = 0
-            # get the last sample as negative value, i.e., no. samples from the
-            # end of the array
-            last_sample = idx[1] - current_value[1]  # indexing is much faster
-            if last_sample == 0:                     # than looping over time!
-                last_sample = None
-            for replication in replications_order:
-                try:
-                    realisations[r:r + n_real_time, i] = self.data[
-                                                        idx[0],
-                                                        idx[1]: last_sample,
-                                                        replication]
-                except IndexError:
-                    raise IndexError('You tried to access variable {0} in a '
-                                     'data set with {1} processes and {2} '
-                                     'samples.'.format(idx, self.n_processes,
-                                                       self.n_samples))
-                r += n_real_time
-
-            assert(not np.isnan(realisations[:, i]).any()), ('There are nans '
-                                                             'in the retrieved'
-                                                             ' realisations.')
-            i += 1
+        n_real_time = self.n_realisations_samples(current_value)
+        realisations = realisations.reshape(n_real_time * self.n_replications,
+                                            len(idx_list))
+        assert not np.isnan(realisations).any(), ('There are nans in the '
+                                                  'retrieved realisations.')
 
         # For each realisation keep the index of the replication it came from.
         replications_index = np.repeat(replications_order, n_real_time)
@@ -287,6 +373,95 @@ class Data():
 
         return realisations, replications_index
 
+    def get_realisations_stacked(self, current_value, idx_list):
+        """Return realisations of variables stacked along the first axis.
+
+        Return realisations for indices in list, where realisations of
+        individual variables are concatenated along the first axis, i.e., the
+        format expected for the chunked estimation of multiple variables (see
+        Estimator.estimate_mult()). Realisations are gathered in a single
+        indexing operation.
+
+        Args:
+            current_value : tuple
+                index of the current value in current analysis, has to have the
+                form (idx process, idx sample)
+            idx_list: list of tuples
+                variable indices
+
+        Returns:
+            numpy array
+                realisations with dimensions (no. samples * no. replications *
+                number of indices) x 1
+        """
+        if not all(np.array([x[1] for x in idx_list]) <= current_value[1]):
+            raise RuntimeError('All indices for which data is retrieved must '
+                               ' be smaller than the current value.')
+        procs, samples = self._get_idx_arrays(idx_list)
+        realisations = self._gather_realisations(
+            current_value, procs, samples, stacked=True).reshape(-1, 1)
+        assert not np.isnan(realisations).any(), ('There are nans in the '
+                                                  'retrieved realisations.')
+        return realisations
+
+    def get_embedding_view(self, current_value):
+        """Return a read-only view on realisations of all past variables.
+
+        Return a view on the data that holds the realisations of every
+        variable (process, sample) up to the current value without copying
+        the data. The view has dimensions (replications x realisations over
+        samples x processes x samples up to the current value), where entry
+        [r, t, p, s] holds the sample s + t of process p in replication r.
+        Hence, view[:, :, p, s] holds the realisations of variable (p, s) for
+        all replications, in the order returned by get_realisations(). Copy
+        the view (e.g., by indexing it with index arrays) if a contiguous
+        buffer is required.
+
+        Args:
+            current_value : tuple
+                index of the current value in current analysis, has to have the
+                form (idx process, idx sample)
+
+        Returns:
+            numpy array
+                read-only view on the data
+        """
+        if not hasattr(self, 'data'):
+            raise AttributeError('No data has been added to this Data() '
+                                 'instance.')
+        n_real_time = self.n_realisations_samples(current_value)
+        stride_p, stride_s, stride_r = self._data.strides
+        return as_strided(self._data,
+                          shape=(self.n_replications, n_real_time,
+                                 self.n_processes, current_value[1] + 1),
+                          strides=(stride_r, stride_s, stride_p, stride_s),
+                          writeable=False)
+
+    def _gather_realisations(self, current_value, procs, samples,
+                             stacked=False):
+        """Return realisations of variables given as index arrays.
+
+        Return an array with dimensions (replications x realisations over
+        samples x variables) or, if stacked is True, (variables x
+        replications x realisations over samples).
+        """
+        view = self.get_embedding_view(current_value)
+        if stacked:
+            return view.transpose(2, 3, 0, 1)[procs, samples]
+        return view[:, :, procs, samples]
+
+    def _get_idx_arrays(self, idx_list):
+        """Return process and sample indices as arrays, check their range."""
+        procs = np.array([x[0] for x in idx_list], dtype=int)
+        samples = np.array([x[1] for x in idx_list], dtype=int)
+        invalid = ((procs < 0) | (procs >= self.n_processes) | (samples < 0))
+        if invalid.any():
+            raise IndexError('You tried to access variable {0} in a data set '
+                             'with {1} processes and {2} samples.'.format(
+                                idx_list[np.where(invalid)[0][0]],
+                                self.n_processes, self.n_samples))
+        return procs, samples
+
     def _get_data_slice(self, process, offset_samples=0, shuffle=False):
         """Return data slice for a single process.
 
@@ -578,6 +753,100 @@ class Data():
             perm_idx[mask] = perm
         return realisations_perm, perm_idx
 
+    def permute_replications_mult(self, current_value, idx_list, n_perm,
+                                  perm=None):
+        """Return realisations for multiple permutations of replications.
+
+        Create n_perm surrogate data sets at once by permuting realisations
+        over replications while keeping the temporal structure (order of
+        samples) intact, see documentation of permute_replications(). All
+        permutations are drawn as one index matrix and applied to the
+        realisations in a single indexing operation.
+
+        Args:
+            current_value : tuple
+                index of the current_value in the data
+            idx_list : list of tuples
+                indices of variables
+            n_perm : int
+                number of permutations
+            perm : numpy array [optional]
+                permuted replication indices returned by a previous call,
+                these are applied instead of drawing new permutations, n_perm
+                is ignored
+
+        Returns:
+            numpy array
+                permuted realisations with dimensions (realisations * n_perm) x
+                number of indices, realisations for individual permutations
+                are concatenated along the first axis
+            numpy array
+                permuted replication indices with dimensions n_perm x
+                replications
+
+        Raises:
+            TypeError if idx_realisations is not a list
+        """
+        if type(idx_list) is not list:
+            raise TypeError('idx needs to be a list of tuples.')
+        realisations = self._get_realisations_blocks(current_value, idx_list)
+        if perm is None:
+            perm = np.argsort(np.random.rand(n_perm, self.n_replications),
+                              axis=1)
+        return (realisations[perm].reshape(-1, len(idx_list)), perm)
+
+    def permute_samples_mult(self, current_value, idx_list, perm_settings,
+                             n_perm, perm=None):
+        """Return realisations for multiple permutations of samples.
+
+        Create n_perm surrogate data sets at once by permuting realisations
+        over samples (time) while keeping the order of replications intact,
+        see documentation of permute_samples() for the available permutation
+        types and settings. All permutations are drawn as one index matrix and
+        applied to the realisations in a single indexing operation.
+
+        Args:
+            current_value : tuple
+                index of the current_value in the data
+            idx_list : list of tuples
+                indices of variables
+            perm_settings : dict
+                settings specifying the allowed permutations, see
+                documentation of permute_samples()
+            n_perm : int
+                number of permutations
+            perm : numpy array [optional]
+                permuted sample indices returned by a previous call, these are
+                applied instead of drawing new permutations, n_perm is ignored
+
+        Returns:
+            numpy array
+                permuted realisations with dimensions (realisations * n_perm) x
+                number of indices, realisations for individual permutations
+                are concatenated along the first axis
+            numpy array
+                permuted sample indices with dimensions n_perm x samples
+
+        Raises:
+            TypeError if idx_realisations is not a list
+        """
+        if type(idx_list) is not list:
+            raise TypeError('idx needs to be a list of tuples.')
+        realisations = self._get_realisations_blocks(current_value, idx_list)
+        if perm is None:
+            perm = self._get_permutation_samples_mult(realisations.shape[1],
+                                                      perm_settings, n_perm)
+        replications = np.arange(self.n_replications)[np.newaxis, :,
+                                                      np.newaxis]
+        return (realisations[replications, perm[:, np.newaxis, :]].reshape(
+            -1, len(idx_list)), perm)
+
+    def _get_realisations_blocks(self, current_value, idx_list):
+        """Return realisations with dimensions replications x samples x idx."""
+        return self.get_realisations(current_value, idx_list)[0].reshape(
+            self.n_replications, self.n_realisations_samples(current_value),
+            len(idx_list))
+
     def _get_permutation_samples(self, n_samples, perm_settings):
         """Generate permutation of n samples.
 
@@ -634,6 +903,84 @@ class Data():
                                                                     perm_type))
         return perm
 
+    def _get_permutation_samples_mult(self, n_samples, perm_settings, n_perm):
+        """Generate multiple permutations of n samples.
+
+        Vectorised version of _get_permutation_samples(), returning one
+        permutation per row. Restricted permutations are drawn by sorting
+        random keys within groups of samples or blocks that may be swapped.
+
+        Args:
+            n_samples : int
+                length of the permutation
+            perm_settings : dict
+                settings specifying the allowed permutations, see documentation
+                of permute_samples()
+            n_perm : int
+                number of permutations
+
+        Returns:
+            numpy array
+                permuted indices of samples with dimensions n_perm x n_samples
+        """
+        perm_type = perm_settings['perm_type']
+        idx = np.arange(n_samples)
+
+        if perm_type == 'random':
+            perm = np.argsort(np.random.rand(n_perm, n_samples), axis=1)
+
+        elif perm_type == 'circular':
+            max_shift = perm_settings['max_shift']
+            if type(max_shift) is not int:
+                raise TypeError(' ''max_shift'' has to be an int.')
+            assert (max_shift <= n_samples), (
+                'Max_shift ({0}) has to be equal to or smaller than the '
+                'number of samples in the time series ({1}).'.format(
+                                                    max_shift, n_samples))
+            shift = np.random.randint(low=1, high=max_shift + 1, size=n_perm)
+            perm = (idx - shift[:, np.newaxis]) % n_samples
+
+        elif perm_type == 'block':
+            block_size = perm_settings['block_size']
+            perm_range = perm_settings['perm_range']
+            if type(block_size) is not int:
+                raise TypeError(' ''block_size'' has to be an int.')
+            if type(perm_range) is not int:
+                raise TypeError(' ''perm_range'' has to be an int.')
+            # Permute block indices within groups of perm_range blocks, then
+            # expand permuted blocks into sample indices. The last block may
+            # have fewer samples if n_samples % block_size isn't 0.
+            n_blocks = np.ceil(n_samples / block_size).astype(int)
+            blocks = np.arange(n_blocks)
+            perm_blocks = np.argsort(
+                blocks // perm_range + np.random.rand(n_perm, n_blocks),
+                axis=1)
+            block_len = np.diff(np.append(blocks * block_size, n_samples))
+            perm_len = block_len[perm_blocks]
+            perm_start = (perm_blocks * block_size -
+                          (np.cumsum(perm_len, axis=1) - perm_len))
+            perm = np.repeat(perm_start.ravel(), perm_len.ravel()).reshape(
+                n_perm, n_samples) + idx
+
+        elif perm_type == 'local':
+            perm_range = perm_settings['perm_range']
+            if type(perm_range) is not int:
+                raise TypeError(' ''perm_range'' has to be an int.')
+            assert (perm_range > 1), ('Permutation range has to be larger '
+                                      'than 1, otherwise there is nothing to '
+                                      'permute.')
+            assert (n_samples >= perm_range), (
+                'Not enough realisations per replication ({0}) to allow for '
+                'the requested "perm_range" of {1}.' .format(n_samples,
+                                                             perm_range))
+            perm = np.argsort(
+                idx // perm_range + np.random.rand(n_perm, n_samples), axis=1)
+
+        else:
+            raise ValueError('Unknown permutation type ({0}).'.format(
+                                                                    perm_type))
+        return perm
+
     def _swap_local(self, n, perm_range):
         """Permute n samples within blocks of length 'perm_range'.
 
@@ -797,3 +1144,256 @@ class Data():
                               term_2 * x[4, n - 1, r] +
                               np.random.normal())
         self.set_data(x[:, 3:, :], 'psr')
+
+
+class LazyData(Data):
+    """Store data on disk and load realisations when they are requested.
+
+    LazyData wraps an array that is stored on disk, e.g., a numpy memmap (see
+    numpy.load(file_name, mmap_mode='r')) or an HDF5 dataset opened with
+    h5py, and provides the same interface for retrieving realisations as
+    Data. Data are neither reordered nor copied into memory. If
+    normalisation is requested, the mean and standard deviation of each
+    process are computed in a single streaming pass over the array, and
+    slices are normalised when they are read. Methods returning realisations
+    read only the samples needed for the requested variables, such that the
+    memory used in addition to the returned realisations is set by the
+    embedding window instead of the recording length.
+
+    When pickled, e.g., when sent to worker processes during parallel
+    network analysis, memmaps and HDF5 datasets are transferred as file
+    references and are re-opened read-only by the receiving process.
+
+    Examples:
+        dat = np.load('recording.npy', mmap_mode='r')  # 'spr' array on disk
+        data = LazyData(dat, dim_order='spr')
+
+    Args:
+        data : array-like [optional]
+            1/2/3-dimensional on-disk array with raw data, must support
+            numpy-style slicing
+        dim_order : string [optional]
+            order of dimensions, see Data (default='psr')
+        normalise : bool [optional]
+            if True, data gets normalised per process (default=True)
+        block_size : int [optional]
+            maximum number of values read at once when computing the mean and
+            standard deviation of each process or the data fingerprint
+            (default=1e7)
+
+    Attributes:
+        data : array-like
+            on-disk array as provided, i.e., not normalised and in the
+            original dimension order, set via 'set_data' method
+        n_processes : int
+            number of processes
+        n_replications : int
+            number of replications
+        n_samples : int
+            number of samples in time
+        normalise : bool
+            if true, all data gets z-standardised per process
+    """
+
+    def __init__(self, data=None, dim_order='psr', normalise=True,
+                 block_size=int(1e7)):
+        self.block_size = block_size
+        super().__init__(data, dim_order, normalise)
+
+    @property
+    def data(self):
+        """Return on-disk data array."""
+        return self._source
+
+    def set_data(self, data, dim_order):
+        """Overwrite data in an existing LazyData object.
+
+        Args:
+            data : array-like
+                1- to 3-dimensional on-disk array of realisations
+            dim_order : string
+                order of dimensions, accepts any combination of the characters
+                'p', 's', and 'r' for processes, samples, and replications;
+                must have the same length as number of dimensions in data
+        """
+        if len(dim_order) > 3:
+            raise RuntimeError('dim_order can not have more than three '
+                               'entries')
+        if len(dim_order) != data.ndim:
+            raise RuntimeError('Data array dimension ({0}) and length of '
+                               'dim_order ({1}) are not equal.'.format(
+                                           data.ndim, len(dim_order)))
+        self._source = data
+        self._dim_order = dim_order
+        shape = [data.shape[dim_order.index(d)] if d in dim_order else 1
+                 for d in 'psr']
+        self.n_processes, self.n_samples, self.n_replications = shape
+        print('Adding data with properties: {0} processes, {1} samples, {2} '
+              'replications'.format(self.n_processes, self.n_samples,
+                                    self.n_replications))
+        self._fingerprint = None
+        if self.normalise:
+            self._mean, self._std = self._get_process_statistics()
+            self.data_type = np.float64
+        else:
+            self.data_type = np.dtype(data.dtype).type
+
+    def share_data(self, file_name=None):
+        """Do nothing, LazyData is shared through the file holding the data."""
+        pass
+
+    def get_embedding_view(self, current_value):
+        """Not available for LazyData, use get_realisations() instead."""
+        raise RuntimeError('LazyData does not provide an embedding view, use '
+                           'get_realisations() instead.')
+
+    @property
+    def fingerprint(self):
+        """Return a hash of the data.
+
+        The hash is computed in blocks when first requested and reset when new
+        data is set.
+        """
+        if getattr(self, '_fingerprint', None) is None:
+            h = hashlib.sha1(repr((
+                self.n_processes, self.n_samples, self.n_replications,
+                np.dtype(self._source.dtype).str, self.normalise)).encode())
+            for start, stop in self._get_sample_blocks():
+                h.update(np.ascontiguousarray(
+                    self._read_samples(0, self.n_processes, start, stop,
+                                       normalise=False)))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def _get_sample_blocks(self):
+        """Return sample ranges that are read at once in streaming passes."""
+        block = max(1, int(self.block_size) //
+                    (self.n_processes * self.n_replications))
+        return [(s, min(s + block, self.n_samples))
+                for s in range(0, self.n_samples, block)]
+
+    def _get_process_statistics(self):
+        """Return mean and standard deviation of each process.
+
+        Compute statistics in a single pass over blocks of samples, combining
+        the statistics of each block with those of previous blocks (Chan et
+        al., 1979). The standard deviation uses N - 1 degrees of freedom, as
+        in Data.
+        """
+        n = 0
+        mean = np.zeros(self.n_processes)
+        m2 = np.zeros(self.n_processes)
+        for start, stop in self._get_sample_blocks():
+            block = self._read_samples(0, self.n_processes, start, stop,
+                                       normalise=False).astype(np.float64)
+            n_block = block.shape[1] * block.shape[2]
+            mean_block = block.mean(axis=(1, 2))
+            m2_block = ((block - mean_block[:, np.newaxis, np.newaxis]) ** 2
+                        ).sum(axis=(1, 2))
+            delta = mean_block - mean
+            mean += delta * n_block / (n + n_block)
+            m2 += m2_block + delta ** 2 * n * n_block / (n + n_block)
+            n += n_block
+        return mean, np.sqrt(m2 / (n - 1))
+
+    def _read_samples(self, proc_start, proc_stop, start, stop,
+                      normalise=None):
+        """Read a block of samples from disk.
+
+        Return samples start to stop of processes proc_start to proc_stop for
+        all replications, with dimensions processes x samples x replications.
+        """
+        if normalise is None:
+            normalise = self.normalise
+        index = {'p': slice(proc_start, proc_stop), 's': slice(start, stop),
+                 'r': slice(None)}
+        block = np.asarray(self._source[tuple(index[d] for d in
+                                              self._dim_order)])
+        order = self._dim_order
+        for d in 'psr':  # add missing dimensions
+            if d not in order:
+                block = np.expand_dims(block, block.ndim)[
+                    tuple(slice(None) for o in order) + (index[d], )]
+                order += d
+        block = block.transpose([order.index(d) for d in 'psr'])
+        if normalise:
+            block = ((block - self._mean[proc_start:proc_stop, np.newaxis,
+                                         np.newaxis]) /
+                     self._std[proc_start:proc_stop, np.newaxis, np.newaxis])
+        return block
+
+    def _gather_realisations(self, current_value, procs, samples,
+                             stacked=False):
+        """Return realisations of variables given as index arrays.
+
+        For each process, read samples from the earliest requested variable
+        up to the last realisation of the latest requested variable, see
+        Data._gather_realisations() for the returned dimensions.
+        """
+        n_real_time = self.n_realisations_samples(current_value)
+        n_vars = procs.shape[0]
+        if stacked:
+            realisations = np.empty((n_vars, self.n_replications,
+                                     n_real_time), dtype=self.data_type)
+        else:
+            realisations = np.empty((self.n_replications, n_real_time,
+                                     n_vars), dtype=self.data_type)
+        for p in np.unique(procs):
+            idx = np.where(procs == p)[0]
+            start = samples[idx].min()
+            block = self._read_samples(p, p + 1, start,
+                                       samples[idx].max() + n_real_time)[0]
+            for i in idx:
+                window = block[samples[i] - start:
+                               samples[i] - start + n_real_time].T
+                if stacked:
+                    realisations[i] = window
+                else:
+                    realisations[:, :, i] = window
+        return realisations
+
+    def _get_data_slice(self, process, offset_samples=0, shuffle=False):
+        """Return data slice for a single process, see Data."""
+        if not offset_samples <= self.n_samples:
+            print('Offset {0} must be smaller than number of samples in the '
+                  ' data ({1})'.format(offset_samples, self.n_samples))
+            raise RuntimeError('Offset must be smaller than no. samples.')
+        if not 0 <= process < self.n_processes:
+            raise IndexError('You tried to access process {0} with an offset '
+                             'of {1} in a data set of {2} processes and {3} '
+                             'samples.'.format(process, offset_samples,
+                                               self.n_processes,
+                                               self.n_samples))
+        if shuffle:
+            replication_index = np.random.permutation(self.n_replications)
+        else:
+            replication_index = np.arange(self.n_replications)
+        data_slice = self._read_samples(process, process + 1, offset_samples,
+                                        self.n_samples)[0]
+        data_slice = data_slice[:, replication_index]
+        assert not np.isnan(data_slice).any(), ('There are nans in the '
+                                                'retrieved data slice.')
+        return data_slice, replication_index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        source = self._source
+        if isinstance(source, np.memmap) and source.filename is not None:
+            state['_source'] = ('memmap', source.filename, source.dtype.str,
+                                source.shape, source.offset,
+                                'F' if (source.flags.f_contiguous and not
+                                        source.flags.c_contiguous) else 'C')
+        elif type(source).__module__.startswith('h5py'):
+            state['_source'] = ('hdf5', source.file.filename, source.name)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        source = state.get('_source', None)
+        if isinstance(source, tuple) and source[0] == 'memmap':
+            self._source = np.memmap(source[1], mode='r', dtype=source[2],
+                                     shape=source[3], offset=source[4],
+                                     order=source[5])
+        elif isinstance(source, tuple) and source[0] == 'hdf5':
+            import h5py
+            self._source = h5py.File(source[1], 'r')[source[2]]
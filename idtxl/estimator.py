@@ -6,6 +6,7 @@ import importlib
 import inspect
 from pprint import pprint
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 import numpy as np
 
 MODULE_EXTENSIONS = ('.py')  # ('.py', '.pyc', '.pyo')
@@ -91,6 +92,15 @@ class Estimator(metaclass=ABCMeta):
     The method 'is_analytic_null_estimator()' indicates whether the implemented
     estimator supports the generation of analytic surrogates (see docstring for
     details).
+
+    Estimates can optionally be cached to avoid the repeated estimation of the
+    same quantity, see documentation of 'estimate_mult()'. Caching is enabled
+    through the estimator settings:
+
+    - cache_estimates : bool [optional] - cache estimates returned by
+      'estimate_mult()' if keys are provided (default=False)
+    - cache_size : int [optional] - maximum number of cached estimates, the
+      least recently used estimates are discarded first (default=10000)
     """
 
     def __init__(self, settings=None):
@@ -213,7 +223,7 @@ class Estimator(metaclass=ABCMeta):
             raise TypeError('Input arrays must be 1D or 2D')
         return var
 
-    def estimate_mult(self, n_chunks=1, re_use=None, **data):
+    def estimate_mult(self, n_chunks=1, re_use=None, cache_keys=None, **data):
         """Estimate measure for multiple data sets (chunks).
 
         Test if the estimator used provides parallel capabilities; if so,
@@ -246,6 +256,12 @@ class Estimator(metaclass=ABCMeta):
                 number of data chunks (default=1)
             re_use : list of keys [optional}
                 realisatins to be re-used (default=None)
+            cache_keys : list [optional]
+                one hashable key per chunk identifying the estimated quantity,
+                e.g., the indices of the variables in each chunk together with
+                a fingerprint of the data; if caching is enabled in the
+                settings, estimates for known keys are taken from the cache
+                and only the remaining chunks are estimated (default=None)
             data: dict of numpy arrays
                 realisations of random variables
 
@@ -257,13 +273,44 @@ class Estimator(metaclass=ABCMeta):
         if re_use is None:
             re_use = []
 
+        cache = self._get_cache()
+        if cache is not None and cache_keys is not None:
+            assert len(cache_keys) == n_chunks, (
+                'Number of cache keys must match the number of chunks.')
+            keys = [(self._settings_fingerprint, k) for k in cache_keys]
+            res = np.empty(n_chunks)
+            missing = []
+            for c in range(n_chunks):
+                estimate = cache.get(keys[c])
+                if estimate is None:
+                    missing.append(c)
+                else:
+                    res[c] = estimate
+            if missing:
+                if len(missing) < n_chunks:
+                    data = self._select_chunks(n_chunks, missing, re_use,
+                                               data)
+                res[missing] = self._estimate_chunks(len(missing), re_use,
+                                                     **data)
+                for c in missing:
+                    cache.put(keys[c], res[c])
+            return res
+
+        return self._estimate_chunks(n_chunks, re_use, **data)
+
+    def _estimate_chunks(self, n_chunks, re_use, **data):
+        """Estimate measure for multiple chunks, see estimate_mult()."""
         # If the estimator supports parallel estimation, pass the variables
         # and number of chunks on to the estimator.
         if self.is_parallel():
             for k in re_use:  # multiply data for re-use
                 if data[k] is not None:
                     data[k] = np.tile(data[k], (n_chunks, 1))
-            return self.estimate(n_chunks=n_chunks, **data)
+            res = self.estimate(n_chunks=n_chunks, **data)
+            # Estimators may return a float for a single chunk.
+            if np.ndim(res) == 0:
+                res = np.array([res])
+            return res
 
         # If estimator does not support parallel estimation, loop over chunks
         # and estimate iteratively for individual chunks.
@@ -304,3 +351,83 @@ class Estimator(metaclass=ABCMeta):
                 i += 1
 
             return res
+
+    def _select_chunks(self, n_chunks, chunks, re_use, data):
+        """Return data for a subset of chunks."""
+        data_selected = {}
+        for v in data.keys():
+            if v in re_use or data[v] is None:
+                data_selected[v] = data[v]
+            else:
+                shape = data[v].shape[1:]
+                data_selected[v] = data[v].reshape(
+                    (n_chunks, -1) + shape)[chunks].reshape((-1,) + shape)
+        return data_selected
+
+    def _get_cache(self):
+        """Return the estimate cache if caching is enabled, else None."""
+        settings = getattr(self, 'settings', None)
+        if (not settings or not settings.get('cache_estimates', False) or
+                settings.get('local_values', False)):
+            return None
+        try:
+            return self._estimate_cache
+        except AttributeError:
+            settings.setdefault('cache_size', 10000)
+            self._estimate_cache = EstimateCache(settings['cache_size'])
+            # Settings are fingerprinted when the cache is created, in
+            # analogy to estimators that apply their settings on creation.
+            self._settings_fingerprint = repr(sorted(
+                [(k, repr(settings[k])) for k in settings.keys()]))
+            return self._estimate_cache
+
+    def cache_info(self):
+        """Return hits, misses, and size of the estimate cache.
+
+        Returns:
+            dict
+                number of cache hits and misses, current and maximum number of
+                cached estimates; None if caching is disabled
+        """
+        cache = self._get_cache()
+        if cache is None:
+            return None
+        return cache.info()
+
+
+class EstimateCache():
+    """Cache estimates with least-recently-used (LRU) eviction.
+
+    Args:
+        max_size : int
+            maximum number of cached estimates
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._estimates = OrderedDict()
+
+    def get(self, key):
+        """Return cached estimate or None if the key is unknown."""
+        try:
+            estimate = self._estimates[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._estimates.move_to_end(key)
+        self.hits += 1
+        return estimate
+
+    def put(self, key, estimate):
+        """Add estimate to cache, discard least recently used if full."""
+        self._estimates[key] = estimate
+        self._estimates.move_to_end(key)
+        while len(self._estimates) > self.max_size:
+            self._estimates.popitem(last=False)
+
+    def info(self):
+        """Return cache statistics."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._estimates), 'max_size': self.max_size}
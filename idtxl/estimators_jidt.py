@@ -1,7 +1,11 @@
 """Provide JIDT estimators."""
+import time
+import threading
+import warnings
 from pkg_resources import resource_filename
 import numpy as np
 from abc import abstractmethod
+from scipy.stats import chi2
 from idtxl.estimator import Estimator
 from . import idtxl_exceptions as ex
 from . import idtxl_utils as utils
@@ -14,6 +18,165 @@ except ImportError as err:
 
 # TODO check IDTxl nomenclature (variable > process, estimate vs. calculate)
 
+# Maximum number of variables for which discrete estimators keep bin edges.
+BIN_EDGES_CACHE_SIZE = 100
+# Maximum number of data shapes for which estimators keep the parameters of
+# chi-square null distributions.
+CHI_SQUARE_CACHE_SIZE = 100
+# Maximum number of JIDT calculators kept in the process-wide pool.
+CALCULATOR_POOL_SIZE = 100
+
+# Process-wide JVM session: calculator pool and statistics on the JVM
+# startup and the overhead of calculator creation and data transfer.
+_jvm_session = {'pool': {}, 'lock': threading.Lock(), 'max_heap': None,
+                'startup_time': 0.0, 'calculators_created': 0,
+                'calculators_reused': 0, 'creation_time': 0.0,
+                'n_transfers': 0, 'transfer_time': 0.0}
+
+
+def start_jvm(max_heap=None):
+    """Start the JAVA virtual machine (JVM) for this process.
+
+    The JVM is started once per process and is shared by all JIDT
+    estimators. The heap size can only be set before the JVM is started,
+    later requests for a different heap size are ignored.
+
+    Args:
+        max_heap : str [optional]
+            maximum heap size of the JVM, e.g., '4g' or '3000m'; if None,
+            use the JVM's default (default=None)
+    """
+    if jp.isJVMStarted():
+        return
+    jar_location = resource_filename(__name__, 'infodynamics.jar')
+    options = ['-ea', '-Djava.class.path=' + jar_location]
+    if max_heap is not None:
+        options.append('-Xmx{0}'.format(max_heap))
+    t = time.perf_counter()
+    jp.startJVM(jp.getDefaultJVMPath(), *options)
+    _jvm_session['startup_time'] = time.perf_counter() - t
+    _jvm_session['max_heap'] = max_heap
+
+
+def get_jvm_stats():
+    """Return statistics of the JVM session of this process.
+
+    Returns:
+        dict
+            whether the JVM is running and its maximum heap size, JVM
+            startup time (in s), no. JIDT calculators created and re-used
+            from the pool, time spent creating calculators (in s), no.
+            arrays copied into the JVM and time spent copying (in s)
+    """
+    stats = {k: v for k, v in _jvm_session.items()
+             if k not in ['pool', 'lock']}
+    stats['jvm_started'] = jp.isJVMStarted()
+    stats['pool_size'] = len(_jvm_session['pool'])
+    return stats
+
+
+def _get_calculator(CalcClass, args=(), properties=None, debug=False):
+    """Return a JIDT calculator from the process-wide pool.
+
+    Calculators are created on first request and are re-used by all
+    estimators requesting the same calculator class, constructor arguments,
+    properties, and debug setting. Estimators call the calculator's
+    initialise() method before adding observations, such that calculators
+    can be shared. Re-using calculators avoids their construction and lets
+    the JVM re-use code compiled for earlier estimates.
+
+    Args:
+        CalcClass : JAVA class
+            JAVA class returned by jpype.JPackage
+        args : tuple [optional]
+            arguments to the calculator's constructor (default=())
+        properties : list of tuples [optional]
+            (name, value) pairs passed to the calculator's setProperty()
+            method, values are strings (default=None)
+        debug : bool [optional]
+            return debug information when calling JIDT (default=False)
+
+    Returns:
+        Java object
+            JIDT calculator
+    """
+    if properties is None:
+        properties = []
+    key = (str(CalcClass), tuple(args), tuple(properties), bool(debug),
+           threading.get_ident())
+    with _jvm_session['lock']:
+        pool = _jvm_session['pool']
+        try:
+            calc = pool.pop(key)  # move to the end of the pool
+            pool[key] = calc
+            _jvm_session['calculators_reused'] += 1
+            return calc
+        except KeyError:
+            pass
+        t = time.perf_counter()
+        calc = CalcClass(*args)
+        for name, value in properties:
+            calc.setProperty(name, value)
+        calc.setDebug(debug)
+        _jvm_session['creation_time'] += time.perf_counter() - t
+        _jvm_session['calculators_created'] += 1
+        if len(pool) >= CALCULATOR_POOL_SIZE:
+            del pool[next(iter(pool))]
+        pool[key] = calc
+        return calc
+
+
+def _get_array_address(a):
+    """Return the address of the first element of a numpy array."""
+    return a.__array_interface__['data'][0]
+
+
+def _get_permutation_invariant_hash(a):
+    """Return a hash of an array that does not depend on the order of rows.
+
+    Hash each value by multiplying its bit pattern with a large odd constant
+    and mixing high and low bits, then sum hashes and squared hashes over
+    rows (modulo 2 ** 64).
+    """
+    bits = np.ascontiguousarray(a, dtype=np.float64).view(np.uint64)
+    h = bits * np.uint64(0x9E3779B97F4A7C15)
+    h ^= h >> np.uint64(31)
+    return (tuple(np.atleast_1d(h.sum(axis=0)).tolist()) +
+            tuple(np.atleast_1d((h * h).sum(axis=0)).tolist()))
+
+
+def _to_java_array(var, java_type='double'):
+    """Return a JAVA array holding a copy of a numpy array.
+
+    Copy the array into the JVM in one pass through jpype's buffer protocol
+    (JArray.of), instead of converting the array element by element. Fall
+    back to the conversion from lists for older versions of jpype.
+
+    Args:
+        var : numpy array
+            1D or 2D array to be copied
+        java_type : str [optional]
+            type of the JAVA array, 'double' or 'int' (default='double')
+
+    Returns:
+        Java object
+            JAVA array of doubles or integers with the dimensions of var
+    """
+    t = time.perf_counter()
+    if java_type == 'int':
+        var = np.ascontiguousarray(var, dtype=np.int32)
+        JType = jp.JInt
+    else:
+        var = np.ascontiguousarray(var, dtype=np.float64)
+        JType = jp.JDouble
+    try:
+        java_var = jp.JArray.of(var)
+    except AttributeError:  # JArray.of was added in jpype 1.0
+        java_var = jp.JArray(JType, var.ndim)(var.tolist())
+    _jvm_session['n_transfers'] += 1
+    _jvm_session['transfer_time'] += time.perf_counter() - t
+    return java_var
+
 
 class JidtEstimator(Estimator):
     """Abstract class for implementation of JIDT estimators.
@@ -48,6 +211,13 @@ class JidtEstimator(Estimator):
               JIDT (default=False)
             - local_values : bool [optional] - return local TE instead of
               average TE (default=False)
+            - jvm_max_heap : str [optional] - maximum heap size of the JAVA
+              virtual machine, e.g., '4g', only used if the JVM is not
+              running yet, see start_jvm() (default=None, JVM default)
+
+    JIDT calculators are taken from a process-wide pool and are shared
+    between estimators with equal settings, see get_jvm_stats() for JVM
+    startup time and calculator and data transfer overhead.
     """
 
     def __init__(self, settings=None):
@@ -57,12 +227,11 @@ class JidtEstimator(Estimator):
         settings.setdefault('debug', False)
         self.settings = settings
 
-    def _start_jvm(self):
-        """Start JAVA virtual machine if it is not running."""
-        jar_location = resource_filename(__name__, 'infodynamics.jar')
-        if not jp.isJVMStarted():
-            jp.startJVM(jp.getDefaultJVMPath(), '-ea', ('-Djava.class.path=' +
-                                                        jar_location))
+    def _start_jvm(self, settings=None):
+        """Start JAVA virtual machine if it is not running, see start_jvm()."""
+        if settings is None:
+            settings = {}
+        start_jvm(settings.get('jvm_max_heap', None))
 
     def _set_te_defaults(self):
         """Set defaults for transfer entropy estimation."""
@@ -88,6 +257,39 @@ class JidtEstimator(Estimator):
     def is_parallel(self):
         return False
 
+    def _estimate_chunks(self, n_chunks, re_use, **data):
+        """Estimate measure for multiple chunks, see estimate_mult().
+
+        Variables in re_use are the same for all chunks. Their JAVA copies
+        are created once and stay resident in the JVM while chunks are
+        estimated one at a time.
+        """
+        self._resident_arrays = {
+            _get_array_address(data[k]): {} for k in re_use
+            if data.get(k, None) is not None}
+        try:
+            return super()._estimate_chunks(n_chunks, re_use, **data)
+        finally:
+            self._resident_arrays = None
+
+    def _to_java(self, var, java_type='double'):
+        """Return JAVA copy of a variable, see _to_java_array().
+
+        Return the resident copy if the variable is re-used for multiple
+        chunks and was copied before.
+        """
+        resident = getattr(self, '_resident_arrays', None)
+        if not resident:
+            return _to_java_array(var, java_type)
+        try:
+            copies = resident[_get_array_address(var)]
+        except KeyError:
+            return _to_java_array(var, java_type)
+        key = (var.shape, var.strides, var.dtype.str, java_type)
+        if key not in copies:
+            copies[key] = _to_java_array(var, java_type)
+        return copies[key]
+
 
 class JidtKraskov(JidtEstimator):
     """Abstract class for implementation of JIDT Kraskov-estimators.
@@ -134,16 +336,16 @@ class JidtKraskov(JidtEstimator):
         self.settings.setdefault('num_threads', 'USE_ALL')
 
         # Set properties of JIDT's estimator object.
-        self.calc = CalcClass()
-        self.calc.setProperty('PROP_KRASKOV_ALG_NUM', str(1))
-        self.calc.setProperty('NORMALISE',
-                              str(self.settings['normalise']).lower())
-        self.calc.setProperty('k', str(self.settings['kraskov_k']))
-        self.calc.setProperty('DYN_CORR_EXCL', str(self.settings['theiler_t']))
-        self.calc.setProperty('NOISE_LEVEL_TO_ADD',
-                              str(self.settings['noise_level']))
-        self.calc.setProperty('NUM_THREADS', str(self.settings['num_threads']))
-        self.calc.setDebug(self.settings['debug'])
+        self.calc = _get_calculator(
+            CalcClass,
+            properties=[
+                ('PROP_KRASKOV_ALG_NUM', str(1)),
+                ('NORMALISE', str(self.settings['normalise']).lower()),
+                ('k', str(self.settings['kraskov_k'])),
+                ('DYN_CORR_EXCL', str(self.settings['theiler_t'])),
+                ('NOISE_LEVEL_TO_ADD', str(self.settings['noise_level'])),
+                ('NUM_THREADS', str(self.settings['num_threads']))],
+            debug=self.settings['debug'])
 
     def is_analytic_null_estimator(self):
         return False
@@ -184,24 +386,63 @@ class JidtDiscrete(JidtEstimator):
     def __init__(self, settings):
         super().__init__(settings)
         self.settings.setdefault('discretise_method', 'none')
+        self._bin_edges = {}
+        # Set if an alphabet was relabelled since the flag was last reset,
+        # see common_estimate_surrogates_analytic().
+        self._alphabet_relabelled = False
+
+    def _discretise(self, var, n_bins):
+        """Discretise a variable using the requested method.
+
+        Bin edges are cached and reused for variables holding the same values
+        in any order, e.g., surrogate data created by permuting the original
+        variable. Variables are identified by a permutation-invariant hash.
+        """
+        key = (self.settings['discretise_method'], n_bins, var.shape,
+               _get_permutation_invariant_hash(var))
+        bin_edges = self._bin_edges.get(key, None)
+        if self.settings['discretise_method'] == 'equal':
+            var, bin_edges = utils.discretise(var, n_bins, bin_edges,
+                                              return_edges=True)
+        else:
+            var, bin_edges = utils.discretise_max_ent(var, n_bins, bin_edges,
+                                                      return_edges=True)
+        if key not in self._bin_edges:
+            if len(self._bin_edges) >= BIN_EDGES_CACHE_SIZE:
+                del self._bin_edges[next(iter(self._bin_edges))]
+            self._bin_edges[key] = bin_edges
+        return var
+
+    def _combine_discrete_dimensions(self, var, n_bins):
+        """Combine dimensions of a discrete variable into one dimension.
+
+        Return combined values and their alphabet size. JIDT's discrete
+        calculators allocate counts for the full alphabet, hence, alphabets
+        larger than the number of samples (or JAVA's maximum integer) are
+        relabelled to the combinations that occur in the data, see
+        idtxl_utils.combine_discrete_dimensions(). The alphabet size of
+        relabelled data is at most the number of samples.
+        """
+        max_alphabet_size = min(var.shape[0], np.iinfo(np.int32).max)
+        if var.ndim > 1 and int(n_bins) ** var.shape[1] > max_alphabet_size:
+            self._alphabet_relabelled = True
+        var, alph = utils.combine_discrete_dimensions(
+            var, n_bins, max_alphabet_size=max_alphabet_size,
+            return_alphabet_size=True)
+        # JIDT's discrete calculators expect a base of at least 2, which may
+        # be undercut by relabelled data with a single combination of values.
+        return var, max(int(alph), 2)
 
     def _discretise_vars(self, var1, var2, conditional=None):
         # Discretise variables if requested. Otherwise assert data are discrete
         # and provided alphabet sizes are correct.
-        if self.settings['discretise_method'] == 'equal':
-            var1 = utils.discretise(var1, self.settings['alph1'])
-            var2 = utils.discretise(var2, self.settings['alph2'])
+        if self.settings['discretise_method'] in ['equal', 'max_ent']:
+            var1 = self._discretise(var1, self.settings['alph1'])
+            var2 = self._discretise(var2, self.settings['alph2'])
             if not (conditional is None):
-                conditional = utils.discretise(conditional,
+                conditional = self._discretise(conditional,
                                                self.settings['alphc'])
 
-        elif self.settings['discretise_method'] == 'max_ent':
-            var1 = utils.discretise_max_ent(var1, self.settings['alph1'])
-            var2 = utils.discretise_max_ent(var2, self.settings['alph2'])
-            if not (conditional is None):
-                conditional = utils.discretise_max_ent(conditional,
-                                                       self.settings['alphc'])
-
         elif self.settings['discretise_method'] == 'none':
             assert issubclass(var1.dtype.type, np.integer), (
                 'Var1 is not an integer numpy array. '
@@ -303,8 +544,7 @@ class JidtGaussian(JidtEstimator):
 
     def __init__(self, CalcClass, settings):
         super().__init__(settings)
-        self.calc = CalcClass()
-        self.calc.setDebug(self.settings['debug'])
+        self.calc = _get_calculator(CalcClass, debug=self.settings['debug'])
 
     def is_analytic_null_estimator(self):
         return True
@@ -388,10 +628,11 @@ class JidtKraskovCMI(JidtKraskov):
 
     def __init__(self, settings=None):
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
                      ConditionalMutualInfoCalculatorMultiVariateKraskov1)
         super().__init__(CalcClass, settings)
+        self.est_mi = None  # MI estimator if no conditional is provided
 
     def estimate(self, var1, var2, conditional=None):
         """Estimate conditional mutual information.
@@ -414,8 +655,9 @@ class JidtKraskovCMI(JidtKraskov):
         """
         # Return MI if no conditional was provided.
         if conditional is None:
-            est_mi = JidtKraskovMI(self.settings)
-            return est_mi.estimate(var1, var2)
+            if self.est_mi is None:
+                self.est_mi = JidtKraskovMI(self.settings)
+            return self.est_mi.estimate(var1, var2)
         else:
             assert(conditional.size != 0), 'Conditional Array is empty.'
 
@@ -435,7 +677,8 @@ class JidtKraskovCMI(JidtKraskov):
         self._check_number_of_points(var1.shape[0])
 
         self.calc.initialise(var1.shape[1], var2.shape[1], cond.shape[1])
-        self.calc.setObservations(var1, var2, cond)
+        self.calc.setObservations(self._to_java(var1), self._to_java(var2),
+                                  self._to_java(cond))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -492,9 +735,10 @@ class JidtDiscreteCMI(JidtDiscrete):
         # Start JAVA virtual machine and create JAVA object. Add JAVA object to
         # instance, the discrete estimator requires the variable dimensions
         # upon instantiation.
-        self._start_jvm()
+        self._start_jvm(settings)
         self.CalcClass = (jp.JPackage('infodynamics.measures.discrete').
                           ConditionalMutualInformationCalculatorDiscrete)
+        self.est_mi = None  # MI estimator if no conditional is provided
 
     def estimate(self, var1, var2, conditional=None, return_calc=False):
         """Estimate conditional mutual information.
@@ -525,49 +769,49 @@ class JidtDiscreteCMI(JidtDiscrete):
         """
         # Calculate an MI if no conditional was provided
         if (conditional is None) or (self.settings['alphc'] == 0):
-            est = JidtDiscreteMI(self.settings)
+            if self.est_mi is None:
+                self.est_mi = JidtDiscreteMI(self.settings)
             # Return value will be just the estimate if return_calc is False,
             #  or estimate plus the JIDT MI calculator if return_calc is True:
-            return est.estimate(var1, var2, return_calc)
+            self.est_mi._alphabet_relabelled = False
+            result = self.est_mi.estimate(var1, var2, return_calc)
+            if self.est_mi._alphabet_relabelled:
+                self._alphabet_relabelled = True
+            return result
         else:
             assert(conditional.size != 0), 'Conditional Array is empty.'
 
-        # Check and remember the no. dimensions for each variable before
-        # collapsing them into univariate arrays later.
         var1 = self._ensure_two_dim_input(var1)
         var2 = self._ensure_two_dim_input(var2)
         conditional = self._ensure_two_dim_input(conditional)
-        var1_dim = var1.shape[1]
-        var2_dim = var2.shape[1]
-        cond_dim = conditional.shape[1]
 
         # Discretise if requested.
         var1, var2, conditional = self._discretise_vars(var1, var2,
                                                         conditional)
 
         # Then collapse any mulitvariates into univariate arrays:
-        var1 = utils.combine_discrete_dimensions(var1, self.settings['alph1'])
-        var2 = utils.combine_discrete_dimensions(var2, self.settings['alph2'])
-        conditional = utils.combine_discrete_dimensions(conditional,
-                                                        self.settings['alphc'])
+        var1, alph1 = self._combine_discrete_dimensions(
+                                                var1, self.settings['alph1'])
+        var2, alph2 = self._combine_discrete_dimensions(
+                                                var2, self.settings['alph2'])
+        conditional, alphc = self._combine_discrete_dimensions(
+                                        conditional, self.settings['alphc'])
 
         # We have a non-trivial conditional, so make a proper conditional MI
         # calculation
-        calc = self.CalcClass(int(np.power(self.settings['alph1'], var1_dim)),
-                              int(np.power(self.settings['alph2'], var2_dim)),
-                              int(np.power(self.settings['alphc'], cond_dim)))
-        calc.setDebug(self.settings['debug'])
+        calc = _get_calculator(self.CalcClass, args=(alph1, alph2, alphc),
+                               debug=self.settings['debug'])
         calc.initialise()
         # Unfortunately no faster way to pass numpy arrays in than this list
         # conversion
-        calc.addObservations(jp.JArray(jp.JInt, 1)(var1.tolist()),
-                             jp.JArray(jp.JInt, 1)(var2.tolist()),
-                             jp.JArray(jp.JInt, 1)(conditional.tolist()))
+        calc.addObservations(self._to_java(var1, 'int'),
+                             self._to_java(var2, 'int'),
+                             self._to_java(conditional, 'int'))
         if self.settings['local_values']:
             result = np.array(calc.computeLocalFromPreviousObservations(
-                jp.JArray(jp.JInt, 1)(var1.tolist()),
-                jp.JArray(jp.JInt, 1)(var2.tolist()),
-                jp.JArray(jp.JInt, 1)(conditional.tolist())
+                self._to_java(var1, 'int'),
+                self._to_java(var2, 'int'),
+                self._to_java(conditional, 'int')
                 ))
         else:
             result = calc.computeAverageLocalOfObservations()
@@ -652,7 +896,7 @@ class JidtDiscreteMI(JidtDiscrete):
         # Start JAVA virtual machine and create JAVA object. Add JAVA object to
         # instance, the discrete estimator requires the variable dimensions
         # upon instantiation.
-        self._start_jvm()
+        self._start_jvm(settings)
         self.CalcClass = (jp.JPackage('infodynamics.measures.discrete').
                           MutualInformationCalculatorDiscrete)
 
@@ -679,35 +923,33 @@ class JidtDiscreteMI(JidtDiscrete):
                 JIDT calculator that was used here. Only returned if
                 return_calc was set.
         """
-        # Check and remember the no. dimensions for each variable before
-        # collapsing them into univariate arrays later.
         var1 = self._ensure_two_dim_input(var1)
         var2 = self._ensure_two_dim_input(var2)
-        var1_dim = var1.shape[1]
-        var2_dim = var2.shape[1]
 
         # Discretise variables if requested.
         var1, var2 = self._discretise_vars(var1, var2)
 
         # Then collapse any mulitvariates into univariate arrays:
-        var1 = utils.combine_discrete_dimensions(var1, self.settings['alph1'])
-        var2 = utils.combine_discrete_dimensions(var2, self.settings['alph2'])
+        var1, alph1 = self._combine_discrete_dimensions(
+                                                var1, self.settings['alph1'])
+        var2, alph2 = self._combine_discrete_dimensions(
+                                                var2, self.settings['alph2'])
 
         # Initialise estimator
-        max_base = int(max(np.power(self.settings['alph1'], var1_dim),
-                           np.power(self.settings['alph2'], var2_dim)))
-        calc = self.CalcClass(max_base, self.settings['lag'])
-        calc.setDebug(self.settings['debug'])
+        max_base = max(alph1, alph2)
+        calc = _get_calculator(self.CalcClass,
+                               args=(max_base, self.settings['lag']),
+                               debug=self.settings['debug'])
         calc.initialise()
 
         # Unfortunately no faster way to pass numpy arrays in than this list
         # conversion
-        calc.addObservations(jp.JArray(jp.JInt, 1)(var1.tolist()),
-                             jp.JArray(jp.JInt, 1)(var2.tolist()))
+        calc.addObservations(self._to_java(var1, 'int'),
+                             self._to_java(var2, 'int'))
         if self.settings['local_values']:
             result = np.array(calc.computeLocalFromPreviousObservations(
-                jp.JArray(jp.JInt, 1)(var1.tolist()),
-                jp.JArray(jp.JInt, 1)(var2.tolist())))
+                self._to_java(var1, 'int'),
+                self._to_java(var2, 'int')))
         else:
             result = calc.computeAverageLocalOfObservations()
         if return_calc:
@@ -777,7 +1019,7 @@ class JidtKraskovMI(JidtKraskov):
 
     def __init__(self, settings=None):
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
                      MutualInfoCalculatorMultiVariateKraskov1)
         super().__init__(CalcClass, settings)
@@ -814,7 +1056,7 @@ class JidtKraskovMI(JidtKraskov):
         self._check_number_of_points(var1.shape[0])
 
         self.calc.initialise(var1.shape[1], var2.shape[1])
-        self.calc.setObservations(var1, var2)
+        self.calc.setObservations(self._to_java(var1), self._to_java(var2))
 
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
@@ -881,7 +1123,7 @@ class JidtKraskovAIS(JidtKraskov):
         assert type(settings['tau']) is int, ('Tau has to be an integer.')
 
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
                      ActiveInfoStorageCalculatorKraskov)
         super().__init__(CalcClass, settings)
@@ -906,7 +1148,7 @@ class JidtKraskovAIS(JidtKraskov):
         self._check_number_of_points(process.shape[0])
 
         self.calc.initialise(self.settings['history'], self.settings['tau'])
-        self.calc.setObservations(process)
+        self.calc.setObservations(self._to_java(process))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -959,7 +1201,7 @@ class JidtDiscreteAIS(JidtDiscrete):
         settings.setdefault('alph', int(2))
 
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         self.CalcClass = (jp.JPackage('infodynamics.measures.discrete').
                           ActiveInformationCalculatorDiscrete)
         super().__init__(settings)
@@ -998,22 +1240,22 @@ class JidtDiscreteAIS(JidtDiscrete):
             if self.settings['alph'] < np.unique(process).shape[0]:
                 raise RuntimeError('The process'' alphabet size does not match'
                                    ' the no. unique elements in the process.')
-        elif self.settings['discretise_method'] == 'equal':
-            process = utils.discretise(process, self.settings['alph'])
-        elif self.settings['discretise_method'] == 'max_ent':
-            process = utils.discretise_max_ent(process, self.settings['alph'])
+        elif self.settings['discretise_method'] in ['equal', 'max_ent']:
+            process = self._discretise(process, self.settings['alph'])
         else:
             pass  # don't discretise at all, assume data to be discrete
 
         # And finally make the TE calculation:
-        calc = self.CalcClass(self.settings['alph'], self.settings['history'])
+        calc = _get_calculator(
+            self.CalcClass,
+            args=(self.settings['alph'], self.settings['history']))
         calc.initialise()
         # Unfortunately no faster way to pass numpy arrays in than this list
         # conversion
-        calc.addObservations(jp.JArray(jp.JInt, 1)(process.tolist()))
+        calc.addObservations(self._to_java(process, 'int'))
         if self.settings['local_values']:
             result = np.array(calc.computeLocalFromPreviousObservations(
-                                    jp.JArray(jp.JInt, 1)(process.tolist())))
+                                    self._to_java(process, 'int')))
         else:
             result = calc.computeAverageLocalOfObservations()
         if return_calc:
@@ -1093,7 +1335,7 @@ class JidtGaussianAIS(JidtGaussian):
         assert type(settings['tau']) is int, ('Tau has to be an integer.')
 
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
                      ActiveInfoStorageCalculatorGaussian)
         super().__init__(CalcClass, settings)
@@ -1115,7 +1357,7 @@ class JidtGaussianAIS(JidtGaussian):
         process = self._ensure_one_dim_input(process)
 
         self.calc.initialise(self.settings['history'], self.settings['tau'])
-        self.calc.setObservations(process)
+        self.calc.setObservations(self._to_java(process))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -1149,7 +1391,7 @@ class JidtGaussianMI(JidtGaussian):
 
     def __init__(self, settings=None):
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
                      MutualInfoCalculatorMultiVariateGaussian)
         super().__init__(CalcClass, settings)
@@ -1184,7 +1426,7 @@ class JidtGaussianMI(JidtGaussian):
             var2 = var2[self.settings['lag']:, :]
 
         self.calc.initialise(var1.shape[1], var2.shape[1])
-        self.calc.setObservations(var1, var2)
+        self.calc.setObservations(self._to_java(var1), self._to_java(var2))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -1224,7 +1466,7 @@ class JidtGaussianCMI(JidtGaussian):
 
     def __init__(self, settings=None):
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
                      ConditionalMutualInfoCalculatorMultiVariateGaussian)
         super().__init__(CalcClass, settings)
@@ -1269,7 +1511,8 @@ class JidtGaussianCMI(JidtGaussian):
                 var1.shape[0], cond.shape[0]))
 
         self.calc.initialise(var1.shape[1], var2.shape[1], cond.shape[1])
-        self.calc.setObservations(var1, var2, cond)
+        self.calc.setObservations(self._to_java(var1), self._to_java(var2),
+                                  self._to_java(cond))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -1351,7 +1594,7 @@ class JidtKraskovTE(JidtKraskov):
 
     def __init__(self, settings):
         # Start JAVA virtual machine.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.kraskov').
                      TransferEntropyCalculatorKraskov)
         super().__init__(CalcClass, settings)
@@ -1387,7 +1630,8 @@ class JidtKraskovTE(JidtKraskov):
                              self.settings['history_source'],
                              self.settings['tau_source'],
                              self.settings['source_target_delay'])
-        self.calc.setObservations(source, target)
+        self.calc.setObservations(self._to_java(source),
+                                  self._to_java(target))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -1455,7 +1699,7 @@ class JidtDiscreteTE(JidtDiscrete):
         self.settings.setdefault('alph2', int(2))
 
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         self.CalcClass = (jp.JPackage('infodynamics.measures.discrete').
                           TransferEntropyCalculatorDiscrete)
 
@@ -1490,21 +1734,22 @@ class JidtDiscreteTE(JidtDiscrete):
 
         # And finally make the TE calculation:
         max_base = max(self.settings['alph1'], self.settings['alph2'])
-        calc = self.CalcClass(max_base,
-                              self.settings['history_target'],
-                              self.settings['tau_target'],
-                              self.settings['history_source'],
-                              self.settings['tau_source'],
-                              self.settings['source_target_delay'])
+        calc = _get_calculator(self.CalcClass,
+                               args=(max_base,
+                                     self.settings['history_target'],
+                                     self.settings['tau_target'],
+                                     self.settings['history_source'],
+                                     self.settings['tau_source'],
+                                     self.settings['source_target_delay']))
         calc.initialise()
         # Unfortunately no faster way to pass numpy arrays in than this list
         # conversion
-        calc.addObservations(jp.JArray(jp.JInt, 1)(source.tolist()),
-                             jp.JArray(jp.JInt, 1)(target.tolist()))
+        calc.addObservations(self._to_java(source, 'int'),
+                             self._to_java(target, 'int'))
         if self.settings['local_values']:
             result = np.array(calc.computeLocalFromPreviousObservations(
-                jp.JArray(jp.JInt, 1)(source.tolist()),
-                jp.JArray(jp.JInt, 1)(target.tolist())))
+                self._to_java(source, 'int'),
+                self._to_java(target, 'int')))
         else:
             result = calc.computeAverageLocalOfObservations()
         if return_calc:
@@ -1583,7 +1828,7 @@ class JidtGaussianTE(JidtGaussian):
 
     def __init__(self, settings):
         # Start JAVA virtual machine and create JAVA object.
-        self._start_jvm()
+        self._start_jvm(settings)
         CalcClass = (jp.JPackage('infodynamics.measures.continuous.gaussian').
                      TransferEntropyCalculatorGaussian)
         super().__init__(CalcClass, settings)
@@ -1615,7 +1860,8 @@ class JidtGaussianTE(JidtGaussian):
                              self.settings['history_source'],
                              self.settings['tau_source'],
                              self.settings['source_target_delay'])
-        self.calc.setObservations(source, target)
+        self.calc.setObservations(self._to_java(source),
+                                  self._to_java(target))
         if self.settings['local_values']:
             return np.array(self.calc.computeLocalOfPreviousObservations())
         else:
@@ -1627,7 +1873,10 @@ def common_estimate_surrogates_analytic(estimator, n_perm=200, **data):
 
     Estimate the surrogate distribution analytically for a JidtEstimator
     which is_analytic_null_estimator(), by sampling estimates at random
-    p-values in the analytic distribution.
+    p-values in the analytic distribution. Chi-square distributions returned
+    by the Gaussian and discrete estimators are evaluated for all p-values at
+    once using scipy.stats.chi2. Their parameters are kept by the estimator
+    and are re-used for data of the same shape, without estimating again.
 
     Args:
         estimator : a JidtEstimator object, which returns True to a call to
@@ -1643,13 +1892,79 @@ def common_estimate_surrogates_analytic(estimator, n_perm=200, **data):
             under the null hypothesis of no relationship between var1 and
             var2 (in the context of conditional)
     """
-    # Compute the statistical significance of the estimate to get an
-    #  AnalyticMeasurementDistribution object:
-    analytic_distribution = estimator.get_analytic_distribution(**data)
-    # Then compute surrogates at n_perm random p-values
-    surrogate_estimates = np.empty(n_perm)
-    for perm in range(n_perm):
-        surrogate_estimates[perm] = \
-            analytic_distribution.computeEstimateForGivenPValue(
-                np.random.random())
-    return surrogate_estimates
+    # Chi-square null distributions depend on the number of observations and
+    # the degrees of freedom only, which are determined by the shape of the
+    # data and the estimator settings. Keep these parameters, such that the
+    # calculator is prepared once and surrogates for further variables of the
+    # same shape are sampled without calling JIDT. If discrete alphabets are
+    # relabelled, the degrees of freedom depend on the values occurring in
+    # the data and parameters are not kept.
+    try:
+        cache = estimator._chi_square_parameters
+    except AttributeError:
+        cache = estimator._chi_square_parameters = {}
+    key = (repr(sorted([(k, repr(v)) for k, v in estimator.settings.items()])),
+           tuple(sorted([(k, None if v is None else np.shape(v))
+                         for k, v in data.items()])))
+    parameters = cache.get(key, None)
+    if parameters is None:
+        # Compute the statistical significance of the estimate to get an
+        #  AnalyticMeasurementDistribution object:
+        if hasattr(estimator, '_alphabet_relabelled'):
+            estimator._alphabet_relabelled = False
+        analytic_distribution = estimator.get_analytic_distribution(**data)
+        parameters = _get_chi_square_parameters(analytic_distribution)
+        if parameters is None:
+            # Compute surrogates at n_perm random p-values
+            surrogate_estimates = np.empty(n_perm)
+            for perm in range(n_perm):
+                surrogate_estimates[perm] = \
+                    analytic_distribution.computeEstimateForGivenPValue(
+                        np.random.random())
+            return surrogate_estimates
+        if not getattr(estimator, '_alphabet_relabelled', False):
+            if len(cache) >= CHI_SQUARE_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[key] = parameters
+
+    # Compute surrogates at n_perm random p-values, using the same inverse
+    # of the chi-square distribution as JIDT.
+    n_observations, degrees_of_freedom = parameters
+    return (chi2.ppf(1 - np.random.random(n_perm), degrees_of_freedom) /
+            (2.0 * n_observations))
+
+
+def _get_chi_square_parameters(analytic_distribution):
+    """Return parameters of a JIDT chi-square null distribution.
+
+    Read the number of observations and degrees of freedom from a JIDT
+    ChiSquareMeasurementDistribution object. The fields are not public and
+    are read using JAVA reflection. If the fields are not found, e.g., for a
+    different version of JIDT, a warning is issued and None is returned, such
+    that surrogates are computed by the JIDT distribution object.
+
+    Args:
+        analytic_distribution : Java object
+            JIDT AnalyticMeasurementDistribution object
+
+    Returns:
+        tuple | None
+            number of observations and degrees of freedom, None if the
+            distribution is not a chi-square distribution
+    """
+    ChiSquareClass = (jp.JPackage('infodynamics.utils').
+                      ChiSquareMeasurementDistribution)
+    if not isinstance(analytic_distribution, ChiSquareClass):
+        return None
+    parameters = []
+    try:
+        for name in ['numObservations', 'degreesOfFreedom']:
+            field = ChiSquareClass.class_.getDeclaredField(name)
+            field.setAccessible(True)
+            parameters.append(int(field.getInt(analytic_distribution)))
+    except Exception as e:
+        warnings.warn('Could not read parameters of the JIDT chi-square '
+                      'distribution ({0}), computing surrogates through '
+                      'JIDT instead.'.format(e), RuntimeWarning)
+        return None
+    return tuple(parameters)
@@ -0,0 +1,209 @@
+"""Provide Kraskov estimators that distribute chunks over CPU processes."""
+import os
+import copy as cp
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from idtxl.estimators_python import (PythonKraskov, PythonKraskovCMI,
+                                     PythonKraskovMI, PythonKraskovTE,
+                                     PythonKraskovAIS)
+from . import idtxl_utils as utils
+
+
+class MultiprocessingKraskov(PythonKraskov):
+    """Abstract class for implementation of multiprocessing Kraskov estimators.
+
+    Abstract class for implementation of Kraskov estimators that distribute
+    chunks over a pool of local worker processes, child classes implement
+    estimators for mutual information (MI), conditional mutual information
+    (CMI), active information storage (AIS), and transfer entropy (TE). The
+    estimators provide the same chunked interface as the OpenCL estimators
+    and return the same estimates as the Python Kraskov estimators, see
+    parent class for references and details.
+
+    Chunks are split into runs, where the memory used by all runs that are
+    processed in parallel is bounded by 'max_mem'. Input data are copied into
+    shared memory once per call to estimate() and are read by all worker
+    processes from there. Data are normalised and noise is added in the
+    calling process, such that results do not depend on the number of
+    workers. Worker processes are started using the 'spawn' method and are
+    kept alive between calls; they are shut down by calling close() or when
+    the estimator is garbage collected. The pool is not pickled with the
+    estimator.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters:
+
+            - kraskov_k : int [optional] - no. nearest neighbours for KNN
+              search (default=4)
+            - normalise : bool | str [optional] - z-standardise data within
+              each chunk, JIDT's 'true'/'false' are accepted (default=False)
+            - theiler_t : int [optional] - no. next temporal neighbours ignored
+              in KNN and range searches (default=0)
+            - noise_level : float | str [optional] - random noise added to
+              the data using numpy's random number generator (default=1e-8)
+            - local_values : bool [optional] - return local values instead of
+              averages (default=False)
+            - n_workers : int [optional] - number of worker processes
+              (default=number of CPUs)
+            - max_mem : int [optional] - approximate memory in bytes used by
+              all runs that are processed in parallel (default=1e9)
+            - debug : bool [optional] - print memory usage and number of
+              runs (default=False)
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self.settings.setdefault('n_workers', os.cpu_count())
+        self.settings.setdefault('max_mem', int(1e9))
+        self.settings.setdefault('debug', False)
+        self._pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Shut down the pool of worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self):
+        """Return pool of worker processes, start pool if necessary."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.settings['n_workers'],
+                mp_context=mp.get_context('spawn'))
+        return self._pool
+
+    def _get_runs(self, n_points, point_dim, n_chunks):
+        """Split chunks into runs that fit into the memory limit."""
+        chunklength = n_points // n_chunks
+        n_query = (int(self.settings['kraskov_k']) +
+                   2 * int(self.settings['theiler_t']) + 1)
+        # Copies of the joint and marginal spaces, KD-trees, and KNN search
+        # results.
+        mem_chunk = chunklength * (4 * 8 * (point_dim + 1) + 16 * n_query)
+        n_workers = max(1, min(self.settings['n_workers'], n_chunks))
+        max_mem_run = self.settings['max_mem'] / n_workers
+        if mem_chunk > max_mem_run:
+            raise RuntimeError('Size of single chunk ({0} bytes) exceeds the '
+                               'memory available per worker ({1:.0f} '
+                               'bytes).'.format(mem_chunk, max_mem_run))
+        chunks_per_run = min(int(max_mem_run // mem_chunk),
+                             int(np.ceil(n_chunks / n_workers)))
+        runs = [(c, min(c + chunks_per_run, n_chunks))
+                for c in range(0, n_chunks, chunks_per_run)]
+        if self.settings['debug']:
+            print('Memory per chunk: {0:.5f} MB, chunks per run: {1}, '
+                  'runs: {2}.'.format(mem_chunk / 1024 / 1024,
+                                      chunks_per_run, len(runs)))
+        return runs
+
+    def _estimate_local(self, var1, var2, conditional, n_chunks):
+        """Return local MI or CMI values, estimated by worker processes."""
+        variables = [var1, var2, conditional]
+        point_dim = sum(v.shape[1] for v in variables if v is not None)
+        runs = self._get_runs(var1.shape[0], point_dim, n_chunks)
+        if len(runs) == 1 or self.settings['n_workers'] < 2:
+            return super()._estimate_local(var1, var2, conditional, n_chunks)
+
+        chunklength = var1.shape[0] // n_chunks
+        settings = cp.copy(self.settings)
+        settings['num_threads'] = 1
+        shared = []
+        try:
+            for v in variables:
+                if v is None:
+                    shared.append(None)
+                else:
+                    shared.append(utils.share_array(v)[0])
+            buffers = [None if v is None else (s.name, v.shape, v.dtype)
+                       for v, s in zip(variables, shared)]
+            pool = self._get_pool()
+            futures = [pool.submit(_estimate_run, settings, buffers,
+                                   r[0] * chunklength, r[1] * chunklength,
+                                   r[1] - r[0])
+                       for r in runs]
+            return np.concatenate([f.result() for f in futures])
+        finally:
+            for s in shared:
+                if s is not None:
+                    s.close()
+                    s.unlink()
+
+
+def _estimate_run(settings, buffers, start, stop, n_chunks):
+    """Return local values for one run of chunks, this is the worker job."""
+    shared = []
+    variables = []
+    try:
+        for b in buffers:
+            if b is None:
+                variables.append(None)
+            else:
+                shm, var = utils.attach_shared_array(*b)
+                shared.append(shm)
+                variables.append(var[start:stop])
+        return PythonKraskovCMI(settings)._estimate_local(*variables,
+                                                          n_chunks)
+    finally:
+        variables = None
+        var = None
+        for shm in shared:
+            shm.close()
+
+
+class MultiprocessingKraskovCMI(MultiprocessingKraskov, PythonKraskovCMI):
+    """Calculate conditional mutual information using worker processes.
+
+    Calculate the conditional mutual information (CMI) between three
+    variables. If no conditional is given (is None), the function returns the
+    mutual information between var1 and var2. See parent classes for
+    references, settings, and estimate().
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+
+
+class MultiprocessingKraskovMI(MultiprocessingKraskov, PythonKraskovMI):
+    """Calculate mutual information using worker processes.
+
+    Calculate the mutual information (MI) between two variables. See parent
+    classes for references, settings, and estimate().
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+
+
+class MultiprocessingKraskovTE(MultiprocessingKraskov, PythonKraskovTE):
+    """Calculate transfer entropy using worker processes.
+
+    Calculate transfer entropy between a source and a target variable. See
+    parent classes for references, settings, and estimate().
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+
+
+class MultiprocessingKraskovAIS(MultiprocessingKraskov, PythonKraskovAIS):
+    """Calculate active information storage using worker processes.
+
+    Calculate active information storage (AIS) for some process. See parent
+    classes for references, settings, and estimate().
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
@@ -0,0 +1,1356 @@
+"""Provide NumPy/SciPy estimators that do not require a JVM."""
+import numpy as np
+from scipy.special import digamma
+from scipy.spatial import cKDTree
+from scipy.linalg import solve_triangular
+from idtxl.estimator import Estimator
+from . import idtxl_utils as utils
+
+
+def _embed_te(source, target, n_chunks, settings):
+    """Return source past, target current value, and target past.
+
+    Embed past states within each chunk of 1D source and target
+    realisations. The first valid embedding is the same as for JIDT's TE
+    estimators. Returns 2D arrays [(embedded points * n_chunks) x history].
+    """
+    k = settings['history_target']
+    k_tau = settings['tau_target']
+    h = settings['history_source']
+    h_tau = settings['tau_source']
+    delay = settings['source_target_delay']
+    source = source.reshape(n_chunks, -1)
+    target = target.reshape(n_chunks, -1)
+    start = max((k - 1) * k_tau, (h - 1) * h_tau + delay - 1)
+    t = np.arange(start, target.shape[1] - 1)
+    current_value = target[:, t + 1].reshape(-1, 1)
+    target_past = target[:, t[:, np.newaxis] -
+                         np.arange(k) * k_tau].reshape(-1, k)
+    source_past = source[:, (t[:, np.newaxis] + 1 - delay) -
+                         np.arange(h) * h_tau].reshape(-1, h)
+    return source_past, current_value, target_past
+
+
+def _parse_bool(value, name):
+    """Return a boolean setting, also accepting JIDT's 'true'/'false'."""
+    if isinstance(value, str) and value.lower() in ['true', 'false']:
+        return value.lower() == 'true'
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    raise TypeError('{0} should be a bool or \'true\'/\'false\', got {1}.'
+                    .format(name, repr(value)))
+
+
+def _embed_ais(process, n_chunks, history, tau):
+    """Return past states and current values of a 1D process.
+
+    Embed past states within each chunk. Returns 2D arrays [(embedded points
+    * n_chunks) x history] and [(embedded points * n_chunks) x 1].
+    """
+    process = process.reshape(n_chunks, -1)
+    t = np.arange((history - 1) * tau, process.shape[1] - 1)
+    current_value = process[:, t + 1].reshape(-1, 1)
+    past = process[:, t[:, np.newaxis] -
+                   np.arange(history) * tau].reshape(-1, history)
+    return past, current_value
+
+
+class PythonKraskov(Estimator):
+    """Abstract class for implementation of NumPy/SciPy Kraskov estimators.
+
+    Abstract class for implementation of Kraskov estimators written in Python,
+    child classes implement estimators for mutual information (MI),
+    conditional mutual information (CMI), active information storage (AIS),
+    and transfer entropy (TE) using the Kraskov-Grassberger-Stoegbauer
+    estimator for continuous data (algorithm 1). Nearest neighbour and range
+    searches use the maximum norm and are run on KD-trees provided by
+    scipy.spatial.cKDTree. Estimators do not require a Java virtual machine
+    and return the same estimates as the JIDT Kraskov estimators for the same
+    settings if no noise is added.
+
+    References:
+
+    - Kraskov, A., Stoegbauer, H., & Grassberger, P. (2004). Estimating mutual
+      information. Phys Rev E, 69(6), 066138.
+    - Lizier, Joseph T., Mikhail Prokopenko, and Albert Y. Zomaya. (2012).
+      Local measures of information storage in complex distributed computation.
+      Inform Sci, 208, 39-54.
+    - Schreiber, T. (2000). Measuring information transfer. Phys Rev Lett,
+      85(2), 461.
+
+    Estimators can be used to perform multiple, independent searches in
+    parallel. Each of these parallel searches is called a 'chunk'. To search
+    multiple chunks, provide point sets as 2D arrays, where the first
+    dimension represents samples or points, and the second dimension
+    represents the points' dimensions. Concatenate chunk data in the first
+    dimension and pass the number of chunks to the estimators. Chunks must be
+    of equal size. All chunks are searched in a single KD-tree, where points
+    of different chunks are separated by an additional coordinate that keeps
+    them from becoming neighbours.
+
+    Set common estimation parameters for Python Kraskov estimators. For usage
+    of these estimators see documentation for the child classes.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters:
+
+            - kraskov_k : int [optional] - no. nearest neighbours for KNN
+              search (default=4)
+            - normalise : bool | str [optional] - z-standardise data within
+              each chunk, JIDT's 'true'/'false' are accepted (default=False)
+            - theiler_t : int [optional] - no. next temporal neighbours ignored
+              in KNN and range searches (default=0)
+            - noise_level : float | str [optional] - random noise added to
+              the data using numpy's random number generator (default=1e-8)
+            - local_values : bool [optional] - return local values instead of
+              averages (default=False)
+            - num_threads : int | str [optional] - number of threads used for
+              KD-tree searches, 'USE_ALL' uses all available threads
+              (default=1)
+    """
+
+    def __init__(self, settings=None):
+        # Get defaults for estimator settings
+        settings = self._check_settings(settings)
+        settings.setdefault('kraskov_k', int(4))
+        settings.setdefault('theiler_t', int(0))
+        settings.setdefault('noise_level', 1e-8)
+        settings.setdefault('normalise', False)
+        settings.setdefault('local_values', False)
+        settings.setdefault('num_threads', int(1))
+        # Accept settings given as strings for JIDT estimators.
+        settings['normalise'] = _parse_bool(settings['normalise'],
+                                            'normalise')
+        settings['noise_level'] = float(settings['noise_level'])
+        self.settings = settings
+
+    def is_parallel(self):
+        return True
+
+    def is_analytic_null_estimator(self):
+        return False
+
+    def _get_workers(self):
+        """Return number of workers for KD-tree searches."""
+        if self.settings['num_threads'] == 'USE_ALL':
+            return -1
+        return int(self.settings['num_threads'])
+
+    def _prepare_var(self, var, n_chunks):
+        """Return normalised copy of variable with noise added."""
+        var = np.array(self._ensure_two_dim_input(var), dtype=np.float64)
+        if self.settings['normalise']:
+            var = var.reshape(n_chunks, -1, var.shape[1])
+            std = var.std(axis=1, keepdims=True)
+            std[std == 0] = 1
+            var = ((var - var.mean(axis=1, keepdims=True)) / std).reshape(
+                                                            -1, var.shape[2])
+        if self.settings['noise_level'] > 0:
+            var += np.random.normal(scale=self.settings['noise_level'],
+                                    size=var.shape)
+        return var
+
+    def _count_neighbours(self, space, eps, chunklength):
+        """Count neighbours within the KNN distance in a (sub-)space.
+
+        Count, for each point, the number of points with a distance strictly
+        smaller than eps, excluding the point itself and points within the
+        Theiler window. The last column of space holds the chunk offset.
+        """
+        tree = cKDTree(space)
+        count = tree.query_ball_point(space, r=np.nextafter(eps, 0),
+                                      p=np.inf, return_length=True,
+                                      workers=self._get_workers()) - 1
+        theiler_t = int(self.settings['theiler_t'])
+        if theiler_t > 0:
+            position = np.arange(space.shape[0]) % chunklength
+            for d in range(1, theiler_t + 1):
+                i = np.where(position < chunklength - d)[0]
+                dist = np.max(np.abs(space[i, :-1] - space[i + d, :-1]),
+                              axis=1)
+                count[i] -= dist < eps[i]
+                count[i + d] -= dist < eps[i + d]
+        return count
+
+    def _estimate_local(self, var1, var2, conditional, n_chunks):
+        """Return local MI or CMI values for all chunks.
+
+        Use algorithm 1 by Kraskov et al. Find the distance to the k-th
+        nearest neighbour in the joint space and count neighbours within this
+        distance in the marginal spaces. If conditional is None, return local
+        MI values, otherwise, return local CMI values.
+        """
+        kraskov_k = int(self.settings['kraskov_k'])
+        theiler_t = int(self.settings['theiler_t'])
+        n_points = var1.shape[0]
+        chunklength = n_points // n_chunks
+
+        # Separate chunks by an offset coordinate that is larger than any
+        # distance within a chunk.
+        variables = [v for v in (var1, var2, conditional) if v is not None]
+        spread = max(np.ptp(v) for v in variables)
+        offset = (np.repeat(np.arange(n_chunks, dtype=np.float64),
+                            chunklength) * (2 * spread + 1))[:, np.newaxis]
+        dim1 = var1.shape[1]
+        dim2 = var2.shape[1]
+        joint = np.hstack(variables + [offset])
+
+        # Find KNN distances in the joint space, ignoring the Theiler window
+        # (this includes the point itself).
+        n_query = min(kraskov_k + 2 * theiler_t + 1, n_points)
+        dist, idx = cKDTree(joint).query(joint, k=n_query, p=np.inf,
+                                         workers=self._get_workers())
+        dist = dist.reshape(n_points, n_query)
+        idx = idx.reshape(n_points, n_query)
+        dist[np.abs(idx - np.arange(n_points)[:, np.newaxis]) <=
+             theiler_t] = np.inf
+        eps = np.sort(dist, axis=1)[:, kraskov_k - 1]
+
+        # Count neighbours in marginal spaces.
+        if conditional is None:
+            count1 = self._count_neighbours(
+                np.hstack((var1, offset)), eps, chunklength)
+            count2 = self._count_neighbours(
+                np.hstack((var2, offset)), eps, chunklength)
+            return (digamma(kraskov_k) + digamma(chunklength) -
+                    digamma(count1 + 1) - digamma(count2 + 1))
+        else:
+            count1_cond = self._count_neighbours(
+                np.delete(joint, np.s_[dim1:dim1 + dim2], axis=1), eps,
+                chunklength)
+            count2_cond = self._count_neighbours(
+                joint[:, dim1:], eps, chunklength)
+            count_cond = self._count_neighbours(
+                joint[:, dim1 + dim2:], eps, chunklength)
+            return (digamma(kraskov_k) - digamma(count1_cond + 1) -
+                    digamma(count2_cond + 1) + digamma(count_cond + 1))
+
+    def _average(self, local, n_chunks):
+        """Return local values or averages over chunks."""
+        if self.settings['local_values']:
+            return local
+        if n_chunks == 1:
+            return np.mean(local)
+        return local.reshape(n_chunks, -1).mean(axis=1)
+
+
+class PythonKraskovCMI(PythonKraskov):
+    """Calculate conditional mutual information with Python Kraskov estimator.
+
+    Calculate the conditional mutual information (CMI) between three
+    variables. If no conditional is given (is None), the function returns the
+    mutual information between var1 and var2. See parent class for references
+    and settings.
+
+    Note:
+        Some technical details: IDTxl normalises over raw data once, outside
+        the CMI estimator to save computation time. The Theiler window ignores
+        trial boundaries but not chunk boundaries. The CMI estimator does add
+        noise to the data as a default. To make analysis runs replicable set
+        noise_level to 0 or seed numpy's random number generator.
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+
+    def estimate(self, var1, var2, conditional=None, n_chunks=1):
+        """Estimate conditional mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            conditional : numpy array [optional]
+                realisations of the conditioning variable (similar to var),
+                if no conditional is provided, return MI between var1 and var2
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average CMI over all samples, average CMI for each chunk if
+                n_chunks > 1, or local CMI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._prepare_var(var1, n_chunks)
+        var2 = self._prepare_var(var2, n_chunks)
+        assert var1.shape[0] == var2.shape[0]
+        if conditional is not None:
+            conditional = self._prepare_var(conditional, n_chunks)
+            assert conditional.shape[0] == var1.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        self._check_number_of_points(var1.shape[0] // n_chunks)
+        return self._average(
+            self._estimate_local(var1, var2, conditional, n_chunks), n_chunks)
+
+
+class PythonKraskovMI(PythonKraskov):
+    """Calculate mutual information with a Python Kraskov estimator.
+
+    Calculate the mutual information (MI) between two variables. See parent
+    class for references and settings.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters, see parent class, additionally:
+
+            - lag : int [optional] - time difference in samples to calculate
+              the lagged MI between processes (default=0)
+
+    Note:
+        Some technical details: IDTxl normalises over raw data once, outside
+        the MI estimator to save computation time. The Theiler window ignores
+        trial boundaries but not chunk boundaries. The MI estimator does add
+        noise to the data as a default. To make analysis runs replicable set
+        noise_level to 0 or seed numpy's random number generator.
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self.settings.setdefault('lag', 0)
+
+    def estimate(self, var1, var2, n_chunks=1):
+        """Estimate mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average MI over all samples, average MI for each chunk if
+                n_chunks > 1, or local MI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._prepare_var(var1, n_chunks)
+        var2 = self._prepare_var(var2, n_chunks)
+        assert var1.shape[0] == var2.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        lag = int(self.settings['lag'])
+        if lag > 0:  # shift variables within each chunk
+            var1 = var1.reshape(n_chunks, -1, var1.shape[1])[:, :-lag, :]
+            var1 = var1.reshape(-1, var1.shape[2])
+            var2 = var2.reshape(n_chunks, -1, var2.shape[1])[:, lag:, :]
+            var2 = var2.reshape(-1, var2.shape[2])
+        self._check_number_of_points(var1.shape[0] // n_chunks)
+        return self._average(
+            self._estimate_local(var1, var2, None, n_chunks), n_chunks)
+
+
+class PythonKraskovTE(PythonKraskov):
+    """Calculate transfer entropy with a Python Kraskov estimator.
+
+    Calculate transfer entropy between a source and a target variable as the
+    CMI between the source's past and the target's current value, conditional
+    on the target's past. Past states are embedded within each chunk, the
+    first valid embedding is the same as for JIDT's estimator. See parent
+    class for references.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history_target : int - number of samples in the target's past
+              used as embedding
+            - history_source  : int [optional] - number of samples in the
+              source's past used as embedding (default=same as the target
+              history)
+            - tau_source : int [optional] - source's embedding delay
+              (default=1)
+            - tau_target : int [optional] - target's embedding delay
+              (default=1)
+            - source_target_delay : int [optional] - information transfer delay
+              between source and target (default=1)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        super().__init__(settings)
+        try:
+            history_target = self.settings['history_target']
+        except KeyError:
+            raise RuntimeError('No target history was provided for TE '
+                               'estimation.')
+        self.settings.setdefault('history_source', history_target)
+        self.settings.setdefault('tau_target', 1)
+        self.settings.setdefault('tau_source', 1)
+        self.settings.setdefault('source_target_delay', 1)
+        for s in ['history_target', 'history_source', 'tau_target',
+                  'tau_source', 'source_target_delay']:
+            assert type(self.settings[s]) is int, (
+                '{0} has to be an integer.'.format(s))
+
+    def estimate(self, source, target, n_chunks=1):
+        """Estimate transfer entropy from a source to a target variable.
+
+        Args:
+            source : numpy array
+                realisations of source variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            target : numpy array
+                realisations of target variable (similar to source)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average TE over all samples, average TE for each chunk if
+                n_chunks > 1, or local TE for individual samples if
+                'local_values'=True
+        """
+        source = self._ensure_one_dim_input(source)
+        target = self._ensure_one_dim_input(target)
+        assert source.shape[0] == target.shape[0]
+        assert source.shape[0] % n_chunks == 0
+        self._check_number_of_points(source.shape[0] // n_chunks -
+                                     self.settings['source_target_delay'])
+
+        source_past, current_value, target_past = _embed_te(
+            source, target, n_chunks, self.settings)
+        self._check_number_of_points(current_value.shape[0] // n_chunks)
+
+        source_past = self._prepare_var(source_past, n_chunks)
+        current_value = self._prepare_var(current_value, n_chunks)
+        target_past = self._prepare_var(target_past, n_chunks)
+        return self._average(
+            self._estimate_local(source_past, current_value, target_past,
+                                 n_chunks), n_chunks)
+
+
+class PythonKraskovAIS(PythonKraskov):
+    """Calculate active information storage with a Python Kraskov estimator.
+
+    Calculate active information storage (AIS) for some process as the MI
+    between the process' past state and its current value. Past states are
+    embedded within each chunk. See parent class for references.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history : int - number of samples in the processes' past used as
+              embedding
+            - tau : int [optional] - the processes' embedding delay
+              (default=1)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        # Check for history for AIS estimation.
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        try:
+            settings['history']
+        except KeyError:
+            raise RuntimeError('No history was provided for AIS estimation.')
+        settings.setdefault('tau', 1)
+        assert type(settings['history']) is int, (
+                                            'History has to be an integer.')
+        assert type(settings['tau']) is int, ('Tau has to be an integer.')
+        super().__init__(settings)
+
+    def estimate(self, process, n_chunks=1):
+        """Estimate active information storage.
+
+        Args:
+            process : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average AIS over all samples, average AIS for each chunk if
+                n_chunks > 1, or local AIS for individual samples if
+                'local_values'=True
+        """
+        process = self._ensure_one_dim_input(process)
+        assert process.shape[0] % n_chunks == 0
+        self._check_number_of_points(process.shape[0] // n_chunks)
+
+        past, current_value = _embed_ais(process, n_chunks,
+                                         self.settings['history'],
+                                         self.settings['tau'])
+        self._check_number_of_points(current_value.shape[0] // n_chunks)
+
+        past = self._prepare_var(past, n_chunks)
+        current_value = self._prepare_var(current_value, n_chunks)
+        return self._average(
+            self._estimate_local(past, current_value, None, n_chunks),
+            n_chunks)
+
+
+def _relabel(symbols):
+    """Return symbols relabelled to consecutive integers and alphabet size."""
+    labels, symbols = np.unique(symbols, return_inverse=True)
+    return symbols.ravel().astype(np.int64), labels.shape[0]
+
+
+def _join_symbols(symbols1, alph1, symbols2, alph2):
+    """Return joint symbols of two discrete variables and alphabet size.
+
+    Joint symbols are calculated as symbols1 * alph2 + symbols2. If the joint
+    alphabet does not fit into a 64-bit integer, both variables are
+    relabelled to the symbols that actually occur before they are joined.
+    """
+    if alph1 * alph2 > np.iinfo(np.int64).max:
+        symbols1, alph1 = _relabel(symbols1)
+        symbols2, alph2 = _relabel(symbols2)
+    return symbols1 * alph2 + symbols2, alph1 * alph2
+
+
+def _count_symbols(symbols, alph):
+    """Return, for each sample, the number of occurrences of its symbol."""
+    if alph > 4 * symbols.shape[0]:  # avoid bincount over sparse alphabets
+        symbols, alph = _relabel(symbols)
+    return np.bincount(symbols, minlength=alph)[symbols]
+
+
+class PythonDiscrete(Estimator):
+    """Abstract class for implementation of NumPy plug-in estimators.
+
+    Abstract class for implementation of plug-in estimators for discrete data
+    written in Python, child classes implement estimators for mutual
+    information (MI), conditional mutual information (CMI), actice information
+    storage (AIS), and transfer entropy (TE). Probabilities are estimated
+    from symbol counts, where multi-dimensional variables are combined into
+    one-dimensional symbols before counting. Estimators do not require a
+    Java virtual machine and return the same estimates as the discrete JIDT
+    estimators for the same settings. Estimates are returned in bits.
+
+    Estimators can be used to perform multiple, independent estimations in
+    parallel. Each of these parallel estimations is called a 'chunk'. To
+    estimate multiple chunks, concatenate chunk data in the first dimension
+    and pass the number of chunks to the estimators. Chunks must be of equal
+    size. Symbols of all chunks are counted in a single call to np.bincount,
+    where the chunk index is added to the symbols as an additional
+    dimension. Variables are discretised within each chunk if requested.
+
+    Set common estimation parameters for Python discrete estimators. For
+    usage of these estimators see documentation for the child classes.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters:
+
+            - local_values : bool [optional] - return local values instead of
+              averages (default=False)
+            - discretise_method : str [optional] - if and how to discretise
+              incoming continuous variables to discrete values, can be
+              'max_ent' for maximum entropy binning, 'equal' for equal size
+              bins, and 'none' if no binning is required (default='none')
+    """
+
+    def __init__(self, settings=None):
+        settings = self._check_settings(settings)
+        settings.setdefault('local_values', False)
+        settings.setdefault('discretise_method', 'none')
+        self.settings = settings
+
+    def is_parallel(self):
+        return True
+
+    def is_analytic_null_estimator(self):
+        return False
+
+    def _set_alphabet_sizes(self, names):
+        """Set default alphabet sizes, overwrite with num_discrete_bins."""
+        try:
+            num_discrete_bins = int(self.settings['num_discrete_bins'])
+            for a in names:
+                self.settings[a] = num_discrete_bins
+        except KeyError:
+            pass  # Do nothing and use the default for alph_* set below
+        for a in names:
+            self.settings.setdefault(a, int(2))
+
+    def _discretise(self, var, n_bins, n_chunks, name):
+        """Discretise a variable within each chunk if requested.
+
+        If no discretisation is requested, assert data are discrete and the
+        provided alphabet size is correct.
+        """
+        if self.settings['discretise_method'] in ['equal', 'max_ent']:
+            if self.settings['discretise_method'] == 'equal':
+                discretise = utils.discretise
+            else:
+                discretise = utils.discretise_max_ent
+            chunks = np.split(var, n_chunks)
+            return np.concatenate([discretise(c, n_bins) for c in chunks])
+        elif self.settings['discretise_method'] == 'none':
+            assert issubclass(var.dtype.type, np.integer), (
+                '{0} is not an integer numpy array. Discretise data to use '
+                'this estimator.'.format(name))
+            assert np.min(var) >= 0, (
+                'Minimum of {0} is smaller than 0.'.format(name))
+            assert np.max(var) < n_bins, (
+                'Maximum of {0} is larger than the alphabet size.'.format(
+                                                                        name))
+            return var
+        else:
+            raise ValueError('Unkown discretisation method.')
+
+    def _get_symbols(self, var, n_bins):
+        """Return variable combined into one dimension and alphabet size."""
+        var, alph = utils.combine_discrete_dimensions(
+            self._ensure_two_dim_input(var), n_bins,
+            return_alphabet_size=True)
+        return var.astype(np.int64), int(alph)
+
+    def _estimate_local(self, var1, var2, conditional, n_chunks):
+        """Return local MI or CMI values for all chunks.
+
+        Variables are tuples of one-dimensional symbols and alphabet sizes.
+        Symbols are joined with the chunk index, such that all chunks are
+        counted at once. If conditional is None, return local MI values,
+        otherwise, return local CMI values.
+        """
+        n_points = var1[0].shape[0]
+        chunk = np.repeat(np.arange(n_chunks, dtype=np.int64),
+                          n_points // n_chunks)
+        if conditional is None:
+            conditional = (np.zeros(n_points, dtype=np.int64), 1)
+        cond = _join_symbols(chunk, n_chunks, *conditional)
+        cond1 = _join_symbols(*cond, *var1)
+        cond2 = _join_symbols(*cond, *var2)
+        joint = _join_symbols(*cond1, *var2)
+        return np.log2(_count_symbols(*joint) * _count_symbols(*cond) /
+                       (_count_symbols(*cond1) * _count_symbols(*cond2)))
+
+    def _average(self, local, n_chunks):
+        """Return local values or averages over chunks."""
+        if self.settings['local_values']:
+            return local
+        if n_chunks == 1:
+            return np.mean(local)
+        return local.reshape(n_chunks, -1).mean(axis=1)
+
+
+class PythonDiscreteCMI(PythonDiscrete):
+    """Calculate conditional mutual information with a plug-in estimator.
+
+    Calculate the conditional mutual information (CMI) between three
+    variables using a plug-in (histogram) estimator. If no conditional is
+    given (is None), the function returns the mutual information between var1
+    and var2. See parent class for settings.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters, see parent class, additionally:
+
+            - num_discrete_bins : int [optional] - number of discrete bins/
+              levels or the base of each dimension of the discrete variables
+              (default=2). If set, this parameter overwrites/sets alph1, alph2
+              and alphc
+            - alph1 : int [optional] - number of discrete bins/levels for var1
+              (default=2, or the value set for num_discrete_bins)
+            - alph2 : int [optional] - number of discrete bins/levels for var2
+              (default=2, or the value set for num_discrete_bins)
+            - alphc : int [optional] - number of discrete bins/levels for
+              conditional (default=2, or the value set for num_discrete_bins)
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self._set_alphabet_sizes(['alph1', 'alph2', 'alphc'])
+
+    def estimate(self, var1, var2, conditional=None, n_chunks=1):
+        """Estimate conditional mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            conditional : numpy array [optional]
+                realisations of the conditioning variable (similar to var),
+                if no conditional is provided, return MI between var1 and var2
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average CMI over all samples, average CMI for each chunk if
+                n_chunks > 1, or local CMI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._ensure_two_dim_input(var1)
+        var2 = self._ensure_two_dim_input(var2)
+        assert var1.shape[0] == var2.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        var1 = self._get_symbols(self._discretise(
+            var1, self.settings['alph1'], n_chunks, 'var1'),
+            self.settings['alph1'])
+        var2 = self._get_symbols(self._discretise(
+            var2, self.settings['alph2'], n_chunks, 'var2'),
+            self.settings['alph2'])
+        if conditional is not None:
+            conditional = self._ensure_two_dim_input(conditional)
+            assert conditional.shape[0] == var1[0].shape[0]
+            conditional = self._get_symbols(self._discretise(
+                conditional, self.settings['alphc'], n_chunks,
+                'conditional'), self.settings['alphc'])
+        return self._average(
+            self._estimate_local(var1, var2, conditional, n_chunks), n_chunks)
+
+
+class PythonDiscreteMI(PythonDiscrete):
+    """Calculate mutual information with a plug-in estimator.
+
+    Calculate the mutual information (MI) between two variables using a
+    plug-in (histogram) estimator. See parent class for settings.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters, see parent class, additionally:
+
+            - num_discrete_bins : int [optional] - number of discrete bins/
+              levels or the base of each dimension of the discrete variables
+              (default=2). If set, this parameter overwrites/sets alph1 and
+              alph2
+            - alph1 : int [optional] - number of discrete bins/levels for var1
+              (default=2, or the value set for num_discrete_bins)
+            - alph2 : int [optional] - number of discrete bins/levels for var2
+              (default=2, or the value set for num_discrete_bins)
+            - lag : int [optional] - time difference in samples to calculate
+              the lagged MI between processes (default=0)
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self.settings.setdefault('lag', int(0))
+        self._set_alphabet_sizes(['alph1', 'alph2'])
+
+    def estimate(self, var1, var2, n_chunks=1):
+        """Estimate mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average MI over all samples, average MI for each chunk if
+                n_chunks > 1, or local MI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._ensure_two_dim_input(var1)
+        var2 = self._ensure_two_dim_input(var2)
+        assert var1.shape[0] == var2.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        var1, alph1 = self._get_symbols(self._discretise(
+            var1, self.settings['alph1'], n_chunks, 'var1'),
+            self.settings['alph1'])
+        var2, alph2 = self._get_symbols(self._discretise(
+            var2, self.settings['alph2'], n_chunks, 'var2'),
+            self.settings['alph2'])
+        lag = int(self.settings['lag'])
+        if lag > 0:  # shift variables within each chunk
+            var1 = var1.reshape(n_chunks, -1)[:, :-lag].ravel()
+            var2 = var2.reshape(n_chunks, -1)[:, lag:].ravel()
+        return self._average(
+            self._estimate_local((var1, alph1), (var2, alph2), None,
+                                 n_chunks), n_chunks)
+
+
+class PythonDiscreteTE(PythonDiscrete):
+    """Calculate transfer entropy with a plug-in estimator.
+
+    Calculate transfer entropy between a source and a target variable as the
+    CMI between the source's past and the target's current value, conditional
+    on the target's past. Variables are discretised before past states are
+    embedded within each chunk, the first valid embedding is the same as for
+    JIDT's estimator. See parent class for settings.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history_target : int - number of samples in the target's past
+              used as embedding
+            - history_source  : int [optional] - number of samples in the
+              source's past used as embedding (default=same as the target
+              history)
+            - tau_source : int [optional] - source's embedding delay
+              (default=1)
+            - tau_target : int [optional] - target's embedding delay
+              (default=1)
+            - source_target_delay : int [optional] - information transfer delay
+              between source and target (default=1)
+            - num_discrete_bins : int [optional] - number of discrete bins/
+              levels or the base of each dimension of the discrete variables
+              (default=2). If set, this parameter overwrites/sets alph1 and
+              alph2
+            - alph1 : int [optional] - number of discrete bins/levels for
+              source (default=2, or the value set for num_discrete_bins)
+            - alph2 : int [optional] - number of discrete bins/levels for
+              target (default=2, or the value set for num_discrete_bins)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        super().__init__(settings)
+        try:
+            history_target = self.settings['history_target']
+        except KeyError:
+            raise RuntimeError('No target history was provided for TE '
+                               'estimation.')
+        self.settings.setdefault('history_source', history_target)
+        self.settings.setdefault('tau_target', 1)
+        self.settings.setdefault('tau_source', 1)
+        self.settings.setdefault('source_target_delay', 1)
+        for s in ['history_target', 'history_source', 'tau_target',
+                  'tau_source', 'source_target_delay']:
+            assert type(self.settings[s]) is int, (
+                '{0} has to be an integer.'.format(s))
+        self._set_alphabet_sizes(['alph1', 'alph2'])
+
+    def estimate(self, source, target, n_chunks=1):
+        """Estimate transfer entropy from a source to a target variable.
+
+        Args:
+            source : numpy array
+                realisations of source variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            target : numpy array
+                realisations of target variable (similar to source)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average TE over all samples, average TE for each chunk if
+                n_chunks > 1, or local TE for individual samples if
+                'local_values'=True
+        """
+        source = self._ensure_one_dim_input(source)
+        target = self._ensure_one_dim_input(target)
+        assert source.shape[0] == target.shape[0]
+        assert source.shape[0] % n_chunks == 0
+        source = self._discretise(source, self.settings['alph1'], n_chunks,
+                                  'source')
+        target = self._discretise(target, self.settings['alph2'], n_chunks,
+                                  'target')
+        source_past, current_value, target_past = _embed_te(
+            source, target, n_chunks, self.settings)
+        return self._average(self._estimate_local(
+            self._get_symbols(source_past, self.settings['alph1']),
+            self._get_symbols(current_value, self.settings['alph2']),
+            self._get_symbols(target_past, self.settings['alph2']),
+            n_chunks), n_chunks)
+
+
+class PythonDiscreteAIS(PythonDiscrete):
+    """Calculate active information storage with a plug-in estimator.
+
+    Calculate active information storage (AIS) for some process as the MI
+    between the process' past state and its current value, using a plug-in
+    (histogram) estimator. The process is discretised before past states are
+    embedded within each chunk. See parent class for settings.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history : int - number of samples in the processes' past used as
+              embedding
+            - tau : int [optional] - the processes' embedding delay
+              (default=1)
+            - num_discrete_bins : int [optional] - number of discrete bins/
+              levels or the base of each dimension of the discrete variables
+              (default=2). If set, this parameter overwrites/sets alph
+            - alph : int [optional] - number of discrete bins/levels for the
+              process (default=2, or the value set for num_discrete_bins)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        try:
+            settings['history']
+        except KeyError:
+            raise RuntimeError('No history was provided for AIS estimation.')
+        settings.setdefault('tau', 1)
+        assert type(settings['history']) is int, (
+                                            'History has to be an integer.')
+        assert type(settings['tau']) is int, ('Tau has to be an integer.')
+        super().__init__(settings)
+        self._set_alphabet_sizes(['alph'])
+
+    def estimate(self, process, n_chunks=1):
+        """Estimate active information storage.
+
+        Args:
+            process : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average AIS over all samples, average AIS for each chunk if
+                n_chunks > 1, or local AIS for individual samples if
+                'local_values'=True
+        """
+        process = self._ensure_one_dim_input(process)
+        assert process.shape[0] % n_chunks == 0
+        process = self._discretise(process, self.settings['alph'], n_chunks,
+                                   'process')
+        past, current_value = _embed_ais(process, n_chunks,
+                                         self.settings['history'],
+                                         self.settings['tau'])
+        return self._average(self._estimate_local(
+            self._get_symbols(past, self.settings['alph']),
+            self._get_symbols(current_value, self.settings['alph']),
+            None, n_chunks), n_chunks)
+
+
+class PythonGaussian(Estimator):
+    """Abstract class for implementation of NumPy Gaussian estimators.
+
+    Abstract class for implementation of Gaussian estimators written in
+    Python, child classes implement estimators for mutual information (MI),
+    conditional mutual information (CMI), active information storage (AIS),
+    and transfer entropy (TE) assuming multivariate Gaussian variables. The
+    CMI is calculated from the log-determinants of covariance sub-matrices,
+    which are computed for all chunks at once on stacked matrices. Estimators
+    do not require a Java virtual machine and return the same estimates as
+    the JIDT Gaussian estimators. Estimates are returned in nats.
+
+    References:
+
+    - Barnett, L., Barrett, A. B., & Seth, A. K. (2009). Granger causality
+      and transfer entropy are equivalent for Gaussian variables. Phys Rev
+      Lett, 103(23), 238701.
+
+    Estimators can be used to perform multiple, independent estimations in
+    parallel. Each of these parallel estimations is called a 'chunk'. To
+    estimate multiple chunks, concatenate chunk data in the first dimension
+    and pass the number of chunks to the estimators. Chunks must be of equal
+    size.
+
+    Set common estimation parameters for Python Gaussian estimators. For
+    usage of these estimators see documentation for the child classes.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters:
+
+            - local_values : bool [optional] - return local values instead of
+              averages (default=False)
+    """
+
+    def __init__(self, settings=None):
+        settings = self._check_settings(settings)
+        settings.setdefault('local_values', False)
+        self.settings = settings
+
+    def is_parallel(self):
+        return True
+
+    def is_analytic_null_estimator(self):
+        return False
+
+    def _estimate_chunks(self, n_chunks, re_use, **data):
+        """Estimate measure for multiple chunks, see estimate_mult().
+
+        If var2 and the conditional are re-used for all chunks of var1,
+        estimate averages for all chunks from shared covariances.
+        """
+        conditional = data.get('conditional', None)
+        if (self.settings['local_values'] or 'var2' not in re_use or
+                'var1' not in data or
+                int(self.settings.get('lag', 0)) > 0 or
+                (conditional is not None and 'conditional' not in re_use)):
+            return super()._estimate_chunks(n_chunks, re_use, **data)
+        var1 = self._ensure_two_dim_input(data['var1'])
+        var2 = self._ensure_two_dim_input(data['var2'])
+        if conditional is not None:
+            conditional = self._ensure_two_dim_input(conditional)
+            assert conditional.shape[0] == var2.shape[0]
+        assert var1.shape[0] == var2.shape[0] * n_chunks
+        return np.atleast_1d(self._estimate_cmi_shared(
+            var1, var2, conditional, n_chunks))
+
+    def _estimate_cmi(self, var1, var2, conditional, n_chunks):
+        """Return average or local MI or CMI for all chunks.
+
+        Compute the covariance matrix of the joint variable for each chunk
+        and evaluate the log-determinants of its sub-matrices for all chunks
+        at once. If conditional is None, return MI values.
+        """
+        variables = [v for v in (var1, var2, conditional) if v is not None]
+        dim1 = var1.shape[1]
+        dim2 = var2.shape[1]
+        dim = sum(v.shape[1] for v in variables)
+        joint = np.hstack(variables).reshape(n_chunks, -1, dim)
+        joint = joint - joint.mean(axis=1, keepdims=True)
+        cov = np.einsum('cld,cle->cde', joint, joint) / (joint.shape[1] - 1)
+
+        # Sub-spaces (var1, cond), (var2, cond), (cond), and (var1, var2,
+        # cond) enter the CMI with the given signs.
+        idx_1 = np.arange(dim1)
+        idx_2 = np.arange(dim1, dim1 + dim2)
+        idx_c = np.arange(dim1 + dim2, dim)
+        subspaces = [(np.hstack((idx_1, idx_c)), 1),
+                     (np.hstack((idx_2, idx_c)), 1),
+                     (idx_c, -1),
+                     (np.arange(dim), -1)]
+        res = 0
+        for idx, sign in subspaces:
+            if idx.shape[0] == 0:
+                continue
+            sub_cov = cov[:, idx][:, :, idx]
+            logdet = np.linalg.slogdet(sub_cov)[1]
+            if self.settings['local_values']:
+                # Add squared Mahalanobis distance of each sample.
+                sub_joint = joint[:, :, idx]
+                mahalanobis = np.einsum(
+                    'cld,cdl->cl', sub_joint,
+                    np.linalg.solve(sub_cov, sub_joint.transpose(0, 2, 1)))
+                res = res + sign * 0.5 * (logdet[:, np.newaxis] +
+                                          mahalanobis)
+            else:
+                res = res + sign * 0.5 * logdet
+        if self.settings['local_values']:
+            return res.ravel()
+        if n_chunks == 1:
+            return res[0]
+        return res
+
+    def _estimate_cmi_shared(self, var1, var2, conditional, n_chunks):
+        """Return average MI or CMI for chunks sharing var2 and conditional.
+
+        The variables var2 and conditional are provided for a single chunk
+        and are the same for all chunks of var1, e.g., when testing multiple
+        candidates or surrogates. The CMI is calculated from Schur
+        complements of the covariance of var1, where the covariances of
+        (var2, cond) and cond and their Cholesky factors are computed once
+        and are used for all chunks.
+        """
+        dim1 = var1.shape[1]
+        dim2 = var2.shape[1]
+        shared = var2 if conditional is None else np.hstack((var2,
+                                                            conditional))
+        shared = shared - shared.mean(axis=0)
+        chunklength = shared.shape[0]
+        var1 = var1.reshape(n_chunks, chunklength, dim1)
+        var1 = var1 - var1.mean(axis=1, keepdims=True)
+        cov_shared = shared.T.dot(shared) / (chunklength - 1)
+        cov_1 = np.einsum('cld,cle->cde', var1, var1) / (chunklength - 1)
+        # Cross-covariances for all chunks as one matrix [dim shared x
+        # (n_chunks * dim1)].
+        cov_cross = np.einsum('ls,cld->scd', shared, var1).reshape(
+            shared.shape[1], -1) / (chunklength - 1)
+
+        def schur_logdet(cov, cross):
+            # Return log-determinant of the Schur complement of cov for all
+            # chunks.
+            if cov.shape[0] == 0:
+                return np.linalg.slogdet(cov_1)[1]
+            a = solve_triangular(np.linalg.cholesky(cov), cross, lower=True)
+            a = a.reshape(-1, n_chunks, dim1)
+            return np.linalg.slogdet(
+                cov_1 - np.einsum('scd,sce->cde', a, a))[1]
+
+        res = 0.5 * (schur_logdet(cov_shared[dim2:, dim2:], cov_cross[dim2:]) -
+                     schur_logdet(cov_shared, cov_cross))
+        if n_chunks == 1:
+            return res[0]
+        return res
+
+
+class PythonGaussianCMI(PythonGaussian):
+    """Calculate conditional mutual information with a Gaussian estimator.
+
+    Calculate the conditional mutual information (CMI) between three
+    variables assuming multivariate Gaussian variables. If no conditional is
+    given (is None), the function returns the mutual information between var1
+    and var2. See parent class for references and settings.
+
+    If var2 and the conditional are re-used for all chunks in a call to
+    estimate_mult(), e.g., when testing multiple candidates or surrogates,
+    the covariances of the re-used variables are computed once and all
+    chunks are evaluated by batched updates of their Cholesky factors.
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+
+    def estimate(self, var1, var2, conditional=None, n_chunks=1):
+        """Estimate conditional mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            conditional : numpy array [optional]
+                realisations of the conditioning variable (similar to var),
+                if no conditional is provided, return MI between var1 and var2
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average CMI over all samples, average CMI for each chunk if
+                n_chunks > 1, or local CMI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._ensure_two_dim_input(var1)
+        var2 = self._ensure_two_dim_input(var2)
+        assert var1.shape[0] == var2.shape[0]
+        if conditional is not None:
+            conditional = self._ensure_two_dim_input(conditional)
+            assert conditional.shape[0] == var1.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        return self._estimate_cmi(var1, var2, conditional, n_chunks)
+
+
+class PythonGaussianMI(PythonGaussian):
+    """Calculate mutual information with a Gaussian estimator.
+
+    Calculate the mutual information (MI) between two variables assuming
+    multivariate Gaussian variables. See parent class for references and
+    settings.
+
+    Args:
+        settings : dict [optional]
+            set estimator parameters, see parent class, additionally:
+
+            - lag : int [optional] - time difference in samples to calculate
+              the lagged MI between processes (default=0)
+    """
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self.settings.setdefault('lag', 0)
+
+    def estimate(self, var1, var2, n_chunks=1):
+        """Estimate mutual information.
+
+        Args:
+            var1 : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x
+                variable dimension] or a 1D array representing [realisations]
+            var2 : numpy array
+                realisations of the second variable (similar to var1)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average MI over all samples, average MI for each chunk if
+                n_chunks > 1, or local MI for individual samples if
+                'local_values'=True
+        """
+        var1 = self._ensure_two_dim_input(var1)
+        var2 = self._ensure_two_dim_input(var2)
+        assert var1.shape[0] == var2.shape[0]
+        assert var1.shape[0] % n_chunks == 0
+        lag = int(self.settings['lag'])
+        if lag > 0:  # shift variables within each chunk
+            var1 = var1.reshape(n_chunks, -1, var1.shape[1])[:, :-lag, :]
+            var1 = var1.reshape(-1, var1.shape[2])
+            var2 = var2.reshape(n_chunks, -1, var2.shape[1])[:, lag:, :]
+            var2 = var2.reshape(-1, var2.shape[2])
+        return self._estimate_cmi(var1, var2, None, n_chunks)
+
+
+class PythonGaussianTE(PythonGaussian):
+    """Calculate transfer entropy with a Gaussian estimator.
+
+    Calculate transfer entropy between a source and a target variable as the
+    CMI between the source's past and the target's current value, conditional
+    on the target's past, assuming multivariate Gaussian variables. Past
+    states are embedded within each chunk, the first valid embedding is the
+    same as for JIDT's estimator. See parent class for references.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history_target : int - number of samples in the target's past
+              used as embedding
+            - history_source  : int [optional] - number of samples in the
+              source's past used as embedding (default=same as the target
+              history)
+            - tau_source : int [optional] - source's embedding delay
+              (default=1)
+            - tau_target : int [optional] - target's embedding delay
+              (default=1)
+            - source_target_delay : int [optional] - information transfer delay
+              between source and target (default=1)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        super().__init__(settings)
+        try:
+            history_target = self.settings['history_target']
+        except KeyError:
+            raise RuntimeError('No target history was provided for TE '
+                               'estimation.')
+        self.settings.setdefault('history_source', history_target)
+        self.settings.setdefault('tau_target', 1)
+        self.settings.setdefault('tau_source', 1)
+        self.settings.setdefault('source_target_delay', 1)
+        for s in ['history_target', 'history_source', 'tau_target',
+                  'tau_source', 'source_target_delay']:
+            assert type(self.settings[s]) is int, (
+                '{0} has to be an integer.'.format(s))
+
+    def estimate(self, source, target, n_chunks=1):
+        """Estimate transfer entropy from a source to a target variable.
+
+        Args:
+            source : numpy array
+                realisations of source variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            target : numpy array
+                realisations of target variable (similar to source)
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average TE over all samples, average TE for each chunk if
+                n_chunks > 1, or local TE for individual samples if
+                'local_values'=True
+        """
+        source = self._ensure_one_dim_input(source)
+        target = self._ensure_one_dim_input(target)
+        assert source.shape[0] == target.shape[0]
+        assert source.shape[0] % n_chunks == 0
+        source_past, current_value, target_past = _embed_te(
+            source, target, n_chunks, self.settings)
+        return self._estimate_cmi(source_past, current_value, target_past,
+                                  n_chunks)
+
+
+class PythonGaussianAIS(PythonGaussian):
+    """Calculate active information storage with a Gaussian estimator.
+
+    Calculate active information storage (AIS) for some process as the MI
+    between the process' past state and its current value, assuming
+    multivariate Gaussian variables. Past states are embedded within each
+    chunk. See parent class for references.
+
+    Args:
+        settings : dict
+            set estimator parameters, see parent class, additionally:
+
+            - history : int - number of samples in the processes' past used as
+              embedding
+            - tau : int [optional] - the processes' embedding delay
+              (default=1)
+
+    Note:
+        Local values are returned for embedded points only, i.e., the
+        returned array is shorter than the input by the number of samples
+        needed for the first embedding in each chunk.
+    """
+
+    def __init__(self, settings):
+        if type(settings) is not dict:
+            raise TypeError('settings should be a dictionary.')
+        try:
+            settings['history']
+        except KeyError:
+            raise RuntimeError('No history was provided for AIS estimation.')
+        settings.setdefault('tau', 1)
+        assert type(settings['history']) is int, (
+                                            'History has to be an integer.')
+        assert type(settings['tau']) is int, ('Tau has to be an integer.')
+        super().__init__(settings)
+
+    def estimate(self, process, n_chunks=1):
+        """Estimate active information storage.
+
+        Args:
+            process : numpy array
+                realisations of first variable, either a 2D numpy array where
+                array dimensions represent [(realisations * n_chunks) x 1] or
+                a 1D array representing [realisations]
+            n_chunks : int [optional]
+                number of data chunks, no. data points has to be the same for
+                each chunk (default=1)
+
+        Returns:
+            float | numpy array
+                average AIS over all samples, average AIS for each chunk if
+                n_chunks > 1, or local AIS for individual samples if
+                'local_values'=True
+        """
+        process = self._ensure_one_dim_input(process)
+        assert process.shape[0] % n_chunks == 0
+        past, current_value = _embed_ais(process, n_chunks,
+                                         self.settings['history'],
+                                         self.settings['tau'])
+        return self._estimate_cmi(past, current_value, None, n_chunks)
@@ -4,6 +4,7 @@ Provide functions to import the following into IDTxl:
 
     - mat-files (version>7.3, hdf5)
     - FieldTrip-style mat-files (version>7.3, hdf5)
+    - npy-files and HDF5 datasets, read lazily from disk
 
 Matlab supports hdf5 only for files saved as version 7.3 or higher:
 https://au.mathworks.com/help/matlab/ref/save.html#inputarg_version
@@ -27,7 +28,7 @@ Created on Wed Mar 19 12:34:36 2014
 import h5py
 import numpy as np
 from scipy.io import loadmat
-from idtxl.data import Data
+from idtxl.data import Data, LazyData
 
 VERBOSE = False
 
@@ -253,3 +254,65 @@ def import_matarray(file_name, array_name, file_version, dim_order,
     fsample = 1
     timestamps = np.arange(dat.n_samples)
     return dat, label, timestamps, fsample
+
+
+def import_memmap(file_name, dim_order, normalise=True):
+    """Import npy-file as memory-mapped, lazily loaded IDTxl data.
+
+    Open a numpy npy-file as read-only memmap without loading it into memory
+    and return a LazyData object reading realisations from disk when they are
+    requested.
+
+    Args:
+        file_name : string
+            full npy-file_name on disk
+        dim_order : string
+            order of dimensions, accepts any combination of the characters
+            'p', 's', and 'r' for processes, samples, and replications; must
+            have the same length as the data dimensionality
+        normalise : bool [optional]
+            normalise data, statistics are computed in one pass over the file
+            (default=True)
+
+    Returns:
+        LazyData() instance
+    """
+    return LazyData(np.load(file_name, mmap_mode='r'), dim_order=dim_order,
+                    normalise=normalise)
+
+
+def import_hdf5(file_name, dataset_name, dim_order, normalise=True):
+    """Import HDF5 dataset as lazily loaded IDTxl data.
+
+    Open an HDF5 file read-only and return a LazyData object reading
+    realisations from the dataset when they are requested. Note that MATLAB
+    stores arrays in hdf5 mat-files with reversed dimension order.
+
+    Args:
+        file_name : string
+            full HDF5 file_name on disk
+        dataset_name : string
+            name of the dataset within the file
+        dim_order : string
+            order of dimensions, accepts any combination of the characters
+            'p', 's', and 'r' for processes, samples, and replications; must
+            have the same length as the data dimensionality
+        normalise : bool [optional]
+            normalise data, statistics are computed in one pass over the
+            dataset (default=True)
+
+    Returns:
+        LazyData() instance
+    """
+    # The file has to stay open while the returned LazyData object reads
+    # from it, close it only if no LazyData object is created.
+    hdf5_file = h5py.File(file_name, 'r')
+    try:
+        if dataset_name not in hdf5_file:
+            raise RuntimeError('Dataset {0} not in file {1}.'.format(
+                dataset_name, file_name))
+        return LazyData(hdf5_file[dataset_name], dim_order=dim_order,
+                        normalise=normalise)
+    except BaseException:
+        hdf5_file.close()
+        raise
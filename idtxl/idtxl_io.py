@@ -57,7 +57,7 @@ def save(dat, file_path):
     elif type(dat) is np.ndarray:
         # TODO this can't handle scalars, handle this as an exception
         np.save(file_path, dat)
-    elif type(dat) is __name__.data.Data:
+    elif type(dat) is Data:
         np.savez(file_path, data=dat.data, normalised=dat.normalise)
 
 
@@ -1,7 +1,9 @@
 """Provide IDTxl utility functions."""
+import sys
 import pprint
 import copy as cp
 import numpy as np
+from multiprocessing import shared_memory, resource_tracker
 
 
 def swap_chars(s, i_1, i_2):
@@ -116,101 +118,109 @@ def autocorrelation(x):
     return 3
 
 
-def discretise(a, numBins):
+def discretise(a, numBins, bin_edges=None, return_edges=False):
     """Discretise continuous data into discrete values (with 0 as lowest)
     by evenly partitioning the range of the data, one dimension at a time.
     Adapted from infodynamics.utils.MatrixUtils.discretise() from JIDT by J.Lizier
 
+    Data are binned by floor arithmetic, where the maximum value is put into
+    the largest bin. Bin edges computed for one data set can be reused for
+    another data set with the same range, e.g., for surrogate data created by
+    permuting the original data. Values outside the range of the edges are
+    put into the lowest or largest bin. If all values of a dimension are
+    equal, they are put into the lowest bin.
+
     Args:
         a : numpy array
             data to be discretised. Dimensions are
             realisations x variable dimension
         numBins : int
             number of discrete levels or bins to partition the data into
+        bin_edges : numpy array [optional]
+            precomputed bin edges, as returned if return_edges is True; if
+            None, edges are computed from the data (default=None)
+        return_edges : bool [optional]
+            if True, return bin edges together with the discretised data
+            (default=False)
 
     Returns:
         numpy array
             discretised data
+        numpy array
+            bin edges with dimensions (numBins + 1) [x variable dimension],
+            only returned if return_edges is True
     """
-
-    num_samples = a.shape[0]
-    if (len(a.shape) == 1):
-        # It's a unidimensional array
-        discretised_values = np.zeros(num_samples, dtype=np.int_)
-        theMin = a.min()
-        theMax = a.max()
-        binInterval = (theMax - theMin) / numBins
-        for t in range(num_samples):
-            discretised_values[t] = int((a[t] - theMin) / binInterval)
-            if (discretised_values[t] == numBins):
-                # This occurs for the maximum value; put it in the largest bin (base - 1)
-                discretised_values[t] = discretised_values[t] - 1
-        return discretised_values
-
-    # Else, multivariate array
-    num_dimensions = a.shape[1]
-    discretised_values = np.zeros([num_samples, num_dimensions], dtype=np.int_)
-    for v in range(a.shape[1]):
-        # Bin dimension v:
-        theMin = a[:,v].min()
-        theMax = a[:,v].max()
-        binInterval = (theMax - theMin) / numBins
-        for t in range(num_samples):
-            discretised_values[t,v] = int((a[t,v] - theMin) / binInterval)
-            if (discretised_values[t,v] == numBins):
-                # This occurs for the maximum value; put it in the largest bin (base - 1)
-                discretised_values[t,v] = discretised_values[t,v] - 1
+    if bin_edges is None:
+        theMin = a.min(axis=0)
+        theMax = a.max(axis=0)
+        bin_edges = theMin + np.multiply.outer(np.arange(numBins + 1),
+                                               (theMax - theMin) / numBins)
+        bin_edges[-1] = theMax
+    binInterval = (bin_edges[-1] - bin_edges[0]) / numBins
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discretised_values = np.floor((a - bin_edges[0]) / binInterval)
+    discretised_values[~np.isfinite(discretised_values)] = 0
+    # The maximum value falls on the upper edge; put it in the largest bin
+    # (base - 1).
+    discretised_values = np.clip(discretised_values, 0,
+                                 numBins - 1).astype(np.int_)
+    if return_edges:
+        return discretised_values, bin_edges
     return discretised_values
 
 
-def discretise_max_ent(a, numBins):
+def discretise_max_ent(a, numBins, bin_edges=None, return_edges=False):
     """Discretise continuous data into discrete values (with 0 as lowest)
     by making a maximum entropy partitioning, one dimension at a time.
     Adapted from infodynamics.utils.MatrixUtils.discretiseMaxEntropy() from JIDT by J.Lizier
 
+    The upper edge (cutoff) of each bin is found by partial sorting of the
+    data, each value is put into the first bin whose cutoff is larger than or
+    equal to the value. Cutoffs computed for one data set can be reused for
+    another data set with the same values, e.g., for surrogate data created
+    by permuting the original data.
+
     Args:
         a : numpy array
             data to be discretised. Dimensions are
             realisations x variable dimension
         numBins : int
             number of discrete levels or bins to partition the data into
+        bin_edges : numpy array [optional]
+            precomputed cutoffs, as returned if return_edges is True; if None,
+            cutoffs are computed from the data (default=None)
+        return_edges : bool [optional]
+            if True, return cutoffs together with the discretised data
+            (default=False)
 
     Returns:
         numpy array
             discretised data
+        numpy array
+            cutoffs with dimensions numBins [x variable dimension], only
+            returned if return_edges is True
     """
-
     num_samples = a.shape[0]
-    if (len(a.shape) == 1):
-        # It's a unidimensional array
-        discretised_values = np.zeros(num_samples, dtype=np.int_)
-        cuttoff_values = np.zeros(numBins)
-        sorted_copy = np.sort(a)
-        for bin in range(numBins):
-            compartmentSize = int((bin+1)*(num_samples)/numBins)-1;
-            cuttoff_values[bin] = sorted_copy[compartmentSize]
-        for t in range(num_samples):
-            for m in range(numBins):
-                if (a[t] <= cuttoff_values[m]):
-                    discretised_values[t] = m
-                    break
-        return discretised_values
-
-    # Else, multivariate array
-    num_dimensions = a.shape[1]
-    discretised_values = np.zeros([num_samples, num_dimensions], dtype=np.int_)
-    for v in range(num_dimensions):
-        # Bin dimension v:
-        cuttoff_values = np.zeros(numBins)
-        sorted_copy = np.sort(a[:,v])
-        for bin in range(numBins):
-            compartmentSize = int((bin+1)*(num_samples)/numBins)-1;
-            cuttoff_values[bin] = sorted_copy[compartmentSize]
-        for t in range(num_samples):
-            for m in range(numBins):
-                if (a[t,v] <= cuttoff_values[m]):
-                    discretised_values[t,v] = m
-                    break
+    if bin_edges is None:
+        compartment_size = (np.arange(1, numBins + 1) * num_samples //
+                            numBins) - 1
+        bin_edges = np.partition(a, compartment_size, axis=0)[
+                                                            compartment_size]
+        # For fewer samples than bins, the first compartment index is -1,
+        # which selects the maximum. Make cutoffs monotonic such that the
+        # search returns the first cutoff larger than or equal to a value.
+        bin_edges = np.maximum.accumulate(bin_edges, axis=0)
+    if len(a.shape) == 1:
+        discretised_values = np.searchsorted(bin_edges, a, side='left')
+    else:
+        discretised_values = np.empty(a.shape, dtype=np.int_)
+        for v in range(a.shape[1]):
+            discretised_values[:, v] = np.searchsorted(
+                bin_edges[:, v], a[:, v], side='left')
+    discretised_values = np.minimum(discretised_values,
+                                    numBins - 1).astype(np.int_)
+    if return_edges:
+        return discretised_values, bin_edges
     return discretised_values
 
 
@@ -245,7 +255,8 @@ def separate_arrays(idx_all, idx_single, a):
     return real_remaining, real_single
 
 
-def combine_discrete_dimensions(a, numBins):
+def combine_discrete_dimensions(a, numBins, max_alphabet_size=None,
+                                return_alphabet_size=False):
     """Combine multi-dimensional discrete variable into a single dimension.
 
     Combine all dimensions for a discrete variable down into a single
@@ -255,36 +266,66 @@ def combine_discrete_dimensions(a, numBins):
     Adapted from infodynamics.utils.MatrixUtils.computeCombinedValues() from
     JIDT by J.Lizier.
 
+    Values are combined in a single dot product with the powers of the base.
+    If the combined alphabet size (numBins ** no. dimensions) exceeds
+    max_alphabet_size, combined values would overflow. Instead, each unique
+    combination of values is then relabelled by its rank among all unique
+    combinations occurring in the data, which preserves the order of
+    combined values. The alphabet size of relabelled data is the number of
+    unique combinations.
+
     Args:
         a : numpy array
             data to be combined across all variable dimensions. Dimensions are
             realisations (samples) x variable dimension
         numBins : int
             number of discrete levels or bins for each variable dimension
+        max_alphabet_size : int [optional]
+            maximum alphabet size of combined values, larger alphabets are
+            relabelled (default=maximum of int64)
+        return_alphabet_size : bool [optional]
+            if True, return the alphabet size of the combined values
+            (default=False)
 
     Returns:
         numpy array
             a univariate array -- one entry now for each sample,
             with all dimensions of the data now combined for that sample
+        int
+            alphabet size of combined values, only returned if
+            return_alphabet_size is True
     """
+    if max_alphabet_size is None:
+        max_alphabet_size = np.iinfo(np.int64).max
     if (len(a.shape) == 1):
         # It's already a unidimensional array
-        return a
-
-    # Else, 2D array assumed
-    num_samples = a.shape[0]
-    dimensions = a.shape[1]
-    combined_values = np.zeros(num_samples, dtype=np.int_)
-    for t in range(num_samples):
-        combined_value = 0
-        multiplier = 1
-        for c in range(dimensions - 1, -1, -1):
-            combined_value = combined_value + a[t][c] * multiplier
-            multiplier = multiplier * numBins
-            if multiplier <= 0:
-                # Multiplier has overflown
-                raise ArithmeticError('Combination of numBins and number of dimensions of a leads to overflow in making unidimensional array')
-        combined_values[t] = int(combined_value)
+        combined_values = a
+        alphabet_size = numBins
+    else:
+        # Else, 2D array assumed
+        alphabet_size = int(numBins) ** a.shape[1]
+        if alphabet_size <= max_alphabet_size:
+            powers = np.power(np.int64(numBins),
+                              np.arange(a.shape[1] - 1, -1, -1,
+                                        dtype=np.int64))
+            combined_values = a.astype(np.int64).dot(powers).astype(np.int_)
+        else:
+            # Combined values overflow, relabel unique combinations. Combine
+            # groups of dimensions that fit into int64 first to reduce the
+            # number of columns to be compared.
+            group_size = 1
+            while int(numBins) ** (group_size + 1) <= np.iinfo(np.int64).max:
+                group_size += 1
+            groups = [combine_discrete_dimensions(a[:, g:g + group_size],
+                                                  numBins)
+                      for g in range(0, a.shape[1], group_size)]
+            unique, combined_values = np.unique(
+                np.array(groups, dtype=np.int64).T, axis=0,
+                return_inverse=True)
+            combined_values = combined_values.reshape(-1).astype(np.int_)
+            alphabet_size = unique.shape[0]
+    if return_alphabet_size:
+        return combined_values, alphabet_size
     return combined_values
 
 
@@ -323,3 +364,65 @@ def combine_results(*results):
         res.update(r)
     return cp.deepcopy(res)
 
+
+def share_array(a):
+    """Copy array into a new shared memory block.
+
+    Args:
+        a : numpy array
+            array to be shared between processes
+
+    Returns:
+        multiprocessing.shared_memory.SharedMemory instance
+            shared memory block holding a copy of the array, the caller is
+            responsible for calling close() and unlink() on the block
+        numpy array
+            view of the array in shared memory
+    """
+    a = np.ascontiguousarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    shared = np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)
+    shared[:] = a
+    return shm, shared
+
+
+def attach_shared_array(name, shape, dtype):
+    """Attach to an array in an existing shared memory block.
+
+    The block is not registered with the resource tracker of the calling
+    process, such that it is not removed when the process exits. The process
+    that created the block remains responsible for unlinking it.
+
+    Args:
+        name : str
+            name of the shared memory block
+        shape : tuple
+            shape of the shared array
+        dtype : numpy dtype
+            data type of the shared array
+
+    Returns:
+        multiprocessing.shared_memory.SharedMemory instance
+            attached shared memory block, call close() when done
+        numpy array
+            view of the array in shared memory
+    """
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        # Older versions register attached blocks with the resource tracker,
+        # which unlinks them when a process with its own tracker exits.
+        # Unregistering afterwards would remove the creator's registration
+        # from a tracker shared with child processes, hence skip registration.
+        register = resource_tracker.register
+        resource_tracker.register = _skip_shared_memory_register
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _skip_shared_memory_register(name, rtype):
+    if rtype != 'shared_memory':
+        resource_tracker._resource_tracker.register(name, rtype)
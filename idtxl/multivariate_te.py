@@ -12,6 +12,7 @@ Note:
 """
 import numpy as np
 from . import stats
+from . import parallel
 from .network_inference import NetworkInference
 from .stats import network_fdr
 
@@ -110,6 +111,13 @@ class MultivariateTE(NetworkInference):
                 - fdr_correction : bool [optional] - correct results on the
                   network level, see documentation of stats.network_fdr() for
                   details (default=True)
+                - executor : str [optional] - 'serial', 'pool', or
+                  'disk_queue', analyse targets in parallel worker processes,
+                  see documentation of the parallel module for details and
+                  further settings (default='serial')
+                - seed : int [optional] - seed for the random number
+                  generator, results are reproducible independent of the
+                  executor (default=None)
 
             data : Data instance
                 raw data for analysis
@@ -151,16 +159,16 @@ class MultivariateTE(NetworkInference):
                                                'sources have to have the same '
                                                'same length')
 
-        # Perform TE estimation for each target individually
+        # Perform TE estimation for each target individually, targets are
+        # distributed over workers if requested in the settings.
+        labels = ['\n####### analysing target with index {0} from list {1}'
+                  .format(t, targets) for t in range(len(targets))]
+        res_targets = parallel.analyse_nodes(
+            self, 'analyse_single_target', settings, data,
+            [(targets[t], sources[t]) for t in range(len(targets))], labels)
         results = {}
         for t in range(len(targets)):
-            if settings['verbose']:
-                print('\n####### analysing target with index {0} from list {1}'
-                      .format(t, targets))
-            results[targets[t]] = self.analyse_single_target(settings,
-                                                             data,
-                                                             targets[t],
-                                                             sources[t])
+            results[targets[t]] = res_targets[t]
 
         # Perform FDR-correction on the network level. Add FDR-corrected
         # results as an extra field. Network_fdr/combine_results internally
@@ -247,6 +255,14 @@ class MultivariateTE(NetworkInference):
                   creation by shuffling realisations in time instead of
                   shuffling replications; see documentation of
                   Data.permute_samples() for further settings (default=False)
+                - perm_adaptive : bool [optional] - create surrogates in
+                  batches and stop permutation tests once the decision is
+                  settled; see documentation of stats.max_statistic() for
+                  further settings (default=False)
+                - perm_warm_start : bool [optional] - re-use permutations and
+                  surrogate realisations across rounds of candidate
+                  selection; see documentation of stats.max_statistic() for
+                  this and for screening of candidates (default=False)
                 - verbose : bool [optional] - toggle console output
                   (default=True)
 
@@ -266,8 +282,10 @@ class MultivariateTE(NetworkInference):
                 past), pvalues and TE for each selected variable, the current
                 value for this analysis, results for omnibus test (joint
                 influence of all selected source variables on the target,
-                omnibus TE, p-value, and significance); NOTE that all variables
-                are listed as tuples (process, lag wrt. current value)
+                omnibus TE, p-value, and significance), and the number of
+                permutations used by each statistical test ('n_perm_used');
+                NOTE that all variables are listed as tuples (process, lag
+                wrt. current value)
         """
         # Check input and clean up object if it was used before.
         self._initialise(settings, data, sources, target)
@@ -302,7 +320,8 @@ class MultivariateTE(NetworkInference):
             'selected_sources_te': self.te_sign_sources,
             'omnibus_te': self.te_omnibus,
             'omnibus_pval': self.pvalue_omnibus,
-            'omnibus_sign': self.sign_omnibus
+            'omnibus_sign': self.sign_omnibus,
+            'n_perm_used': self._n_perm_used
             }
         self._reset()  # remove attributes
         return results
@@ -352,6 +371,11 @@ class MultivariateTE(NetworkInference):
             temp_te = self._cmi_estimator.estimate_mult(
                                 n_chunks=len(self.selected_vars_sources),
                                 re_use=['var2'],
+                                cache_keys=self._get_cache_keys(
+                                    data, self.selected_vars_sources,
+                                    [[v for v in self.selected_vars_full
+                                      if v != c]
+                                     for c in self.selected_vars_sources]),
                                 var1=candidate_realisations,
                                 var2=self._current_value_realisations,
                                 conditional=conditional_realisations)
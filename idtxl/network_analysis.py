@@ -7,7 +7,6 @@ Created on Mon Mar  7 18:13:27 2016
 import copy as cp
 import itertools as it
 import numpy as np
-from . import idtxl_utils as utils
 
 
 class NetworkAnalysis():
@@ -25,6 +24,10 @@ class NetworkAnalysis():
         self._current_value_realisations = None
         self._selected_vars_realisations = None
         self._min_stats_surr_table = None
+        self._n_perm_used = {}
+        self._max_stats_perm = None
+        self._max_stats_surr_realisations = {}
+        self._max_stats_surr_distribution = None
 
     @property
     def current_value(self):
@@ -68,6 +71,9 @@ class NetworkAnalysis():
             raise TypeError(('Expected a list of tuples (index process, ' +
                              'index sample).'))
         self._selected_vars_full = idx_list
+        # Map each variable to its column in the realisations buffer.
+        self._selected_vars_columns = {idx: i for i, idx in
+                                       enumerate(idx_list)}
 
     @property
     def selected_vars_target(self):
@@ -99,69 +105,81 @@ class NetworkAnalysis():
 
     @property
     def _selected_vars_realisations(self):
-        """Get realisations of the full conditional set."""
-        return self.__selected_vars_realisations
+        """Get realisations of the full conditional set.
+
+        Realisations are kept in a preallocated buffer with one column per
+        selected variable, whose capacity is doubled when it is full. The
+        property returns a view of the filled columns, which is only valid
+        until the next variable is appended or removed.
+        """
+        if self.__selected_vars_buffer is None:
+            return None
+        return self.__selected_vars_buffer[:, :self.__n_selected_vars]
 
     @_selected_vars_realisations.setter
     def _selected_vars_realisations(self, realisations):
-        self.__selected_vars_realisations = realisations
+        if realisations is None:
+            self.__selected_vars_buffer = None
+            self.__n_selected_vars = 0
+        else:
+            self.__selected_vars_buffer = np.array(realisations)
+            self.__n_selected_vars = realisations.shape[1]
 
     @property
     def _selected_vars_target_realisations(self):
-        """Get realisations of the target samples in the conditional.
-
-        Note:
-            Each time this property is called, realisations are actually
-            extracted from the array of all realisations, which may be slow!
-            Use temporary variables to speed things up.
-        """
-        indices = np.zeros(len(self.selected_vars_target)).astype(int)
-        i = 0
-        for idx in self.selected_vars_target:
-            indices[i] = self.selected_vars_full.index(idx)
-            i += 1
-        self._selected_vars_target_realisations = (
-                                self._selected_vars_realisations[:, indices])
-        return self.__selected_vars_target_realisations
-
-    @_selected_vars_target_realisations.setter
-    def _selected_vars_target_realisations(self, realisations):
-        self.__selected_vars_target_realisations = realisations
+        """Get realisations of the target samples in the conditional."""
+        return self._get_selected_vars_realisations(self.selected_vars_target)
 
     @property
     def _selected_vars_sources_realisations(self):
-        """Get realisations of the source samples in the conditional.
+        """Get realisations of the source samples in the conditional."""
+        return self._get_selected_vars_realisations(
+                                                    self.selected_vars_sources)
 
-        Note:
-            Each time this property is called, realisations are actually
-            extracted from the array of all realisations, which may be slow!
-            Use temporary variables to speed things up.
+    def _get_selected_vars_realisations(self, idx_list):
+        """Get realisations of a subset of selected variables.
+
+        Returns a view of the realisations buffer if the variables occupy
+        consecutive columns, e.g., all target or all source variables if these
+        were selected in separate rounds, and a copy otherwise.
         """
-        indices = np.zeros(len(self.selected_vars_sources)).astype(int)
-        i = 0
-        for idx in self.selected_vars_sources:
-            indices[i] = self.selected_vars_full.index(idx)
-            i += 1
-        self._selected_vars_sources_realisations = (
-                                self._selected_vars_realisations[:, indices])
-        return self.__selected_vars_sources_realisations
-
-    @_selected_vars_sources_realisations.setter
-    def _selected_vars_sources_realisations(self, realisations):
-        self.__selected_vars_sources_realisations = realisations
+        if self.__selected_vars_buffer is None:
+            return None
+        columns = [self._selected_vars_columns[idx] for idx in idx_list]
+        if not columns:
+            return self.__selected_vars_buffer[:, :0]
+        if columns == list(range(columns[0], columns[0] + len(columns))):
+            return self.__selected_vars_buffer[
+                                    :, columns[0]:columns[0] + len(columns)]
+        return self.__selected_vars_buffer[:, columns]
 
     def _append_selected_vars_realisations(self, realisations):
         """Append realisations of conditionals to existing realisations.
 
-        Returns:
-            realisations: numpy array with dimensions replications x number
-                of indices.
+        Realisations are copied into the free columns of the realisations
+        buffer. If the buffer is full, its capacity is doubled, such that
+        appending is amortised O(1) per variable.
+
+        Args:
+            realisations : numpy array
+                realisations with dimensions realisations x number of indices
         """
-        if self._selected_vars_realisations is None or realisations.size == 0:
+        if self.__selected_vars_buffer is None:
             self._selected_vars_realisations = realisations
-        else:
-            self._selected_vars_realisations = np.hstack(
-                            (self._selected_vars_realisations, realisations))
+            return
+        n_new = realisations.shape[1]
+        if n_new == 0:
+            return
+        buffer = self.__selected_vars_buffer
+        n_vars = self.__n_selected_vars
+        dtype = np.result_type(buffer.dtype, realisations.dtype)
+        if n_vars + n_new > buffer.shape[1] or dtype != buffer.dtype:
+            capacity = max(2 * buffer.shape[1], n_vars + n_new)
+            buffer = np.empty((buffer.shape[0], capacity), dtype=dtype)
+            buffer[:, :n_vars] = self.__selected_vars_buffer[:, :n_vars]
+            self.__selected_vars_buffer = buffer
+        buffer[:, n_vars:n_vars + n_new] = realisations
+        self.__n_selected_vars = n_vars + n_new
 
     def _idx_to_lag(self, idx_list, current_value_sample=None):
         """Change sample indices to lags for each sample in the list."""
@@ -222,12 +240,9 @@ class NetworkAnalysis():
         # Find the indices of the columns with the realisations of the
         # requested variables (the single one to be removed and the remaining
         # variables).
-        array_col_single = self.selected_vars_full.index(idx_single)
-        array_col_remain = np.zeros(len(idx_remaining)).astype(int)
-        i = 0
-        for idx in idx_remaining:
-            array_col_remain[i] = self.selected_vars_full.index(idx)
-            i += 1
+        array_col_single = self._selected_vars_columns[idx_single]
+        array_col_remain = np.array([self._selected_vars_columns[idx]
+                                     for idx in idx_remaining], dtype=int)
 
         # Get realisations of the single and remaining variables.
         real_single = np.expand_dims(
@@ -242,6 +257,82 @@ class NetworkAnalysis():
 
         return real_remain, real_single
 
+    def _separate_realisations_all(self, idx_full, idx_candidates):
+        """Separate each candidate's realisations from a set of realisations.
+
+        Batched version of _separate_realisations(): for each candidate,
+        return the realisations of the candidate and the realisations of the
+        remaining variables in idx_full, stacked over candidates such that they
+        can be passed to an estimator's estimate_mult() method with one chunk
+        per candidate. Realisations of all candidates are taken from
+        self._selected_vars_realisations in one gather.
+
+        Args:
+            idx_full : list of tuples
+                indices indicating the full set
+            idx_candidates : list of tuples
+                indices to be removed one at a time, must be in idx_full
+
+        Returns:
+            numpy array
+                realisations of the set without each candidate, stacked over
+                candidates, with dimensions (no. candidates * no. realisations
+                x len(idx_full) - 1), None if idx_full has a single entry
+            numpy array
+                realisations of each candidate, stacked over candidates, with
+                dimensions (no. candidates * no. realisations x 1)
+        """
+        array_col_full = np.array([self._selected_vars_columns[idx]
+                                   for idx in idx_full], dtype=int)
+        i_single = [idx_full.index(idx) for idx in idx_candidates]
+        array_col_single = array_col_full[i_single]
+        array_col_remain = np.array([np.delete(array_col_full, i)
+                                     for i in i_single], dtype=int)
+
+        realisations = self._selected_vars_realisations
+        real_single = realisations[:, array_col_single].T.reshape(-1, 1)
+        if len(idx_full) == 1:
+            # If no realisations remain, return None, see
+            # _separate_realisations().
+            real_remain = None
+        else:
+            real_remain = np.transpose(realisations[:, array_col_remain],
+                                       (1, 0, 2)).reshape(
+                                                    -1, len(idx_full) - 1)
+        return real_remain, real_single
+
+    def _get_cache_keys(self, data, candidates, conditionals):
+        """Return keys identifying estimates in the estimator's cache.
+
+        Each key identifies the CMI between a candidate and the current value,
+        conditional on a set of variables, estimated from a data set. See
+        documentation of Estimator.estimate_mult() for caching of estimates.
+
+        Args:
+            data : Data instance
+                raw data
+            candidates : list of tuples
+                indices of candidates
+            conditionals : list of lists of tuples
+                indices of the conditioning set for each candidate
+
+        Returns:
+            list of tuples
+                one key per candidate; None if caching is disabled in the
+                settings
+        """
+        if not self.settings.get('cache_estimates', False):
+            return None
+        return [(data.fingerprint, self.current_value, c, tuple(sorted(cond)))
+                for (c, cond) in zip(candidates, conditionals)]
+
+    def _print_cache_info(self):
+        """Print cache statistics if caching is enabled."""
+        if (self.settings.get('cache_estimates', False) and
+                self.settings.get('verbose', True)):
+            print('estimate cache: {0}'.format(
+                self._cmi_estimator.cache_info()))
+
     def _define_candidates(self, processes, samples):
         """Build a list of candidate indices.
 
@@ -267,6 +358,7 @@ class NetworkAnalysis():
             self.selected_vars_full = idx
         else:
             for i in idx:
+                self._selected_vars_columns[i] = len(self.selected_vars_full)
                 self.selected_vars_full.append(i)
         # separate indexes into source and target indixes
         for i in idx:
@@ -293,11 +385,19 @@ class NetworkAnalysis():
         self._append_selected_vars_realisations(realisations)
 
     def _remove_selected_var(self, idx):
-        """Remove a single selected variable and its realisations."""
-        self._selected_vars_realisations = utils.remove_column(
-                                         self._selected_vars_realisations,
-                                         self.selected_vars_full.index(idx))
-        self.selected_vars_full.pop(self.selected_vars_full.index(idx))
+        """Remove a single selected variable and its realisations.
+
+        Columns of the realisations buffer to the right of the removed
+        variable are shifted left in place.
+        """
+        col = self._selected_vars_columns.pop(idx)
+        n_vars = self.__n_selected_vars
+        buffer = self.__selected_vars_buffer
+        buffer[:, col:n_vars - 1] = buffer[:, col + 1:n_vars]
+        self.__n_selected_vars = n_vars - 1
+        self.selected_vars_full.pop(col)
+        for i in self.selected_vars_full[col:]:
+            self._selected_vars_columns[i] -= 1
         if idx[0] == self.target:
             self.selected_vars_target.pop(
                                         self.selected_vars_target.index(idx))
@@ -1,10 +1,11 @@
 """Perform inference statistics on groups of data."""
-import copy as cp
 import numpy as np
 from scipy.special import binom
 from .estimator import find_estimator
 from . import stats
-from . import idtxl_utils as utils
+from . import parallel
+from . import idtxl_io as io
+from .data import Data
 from .network_analysis import NetworkAnalysis
 
 
@@ -42,9 +43,10 @@ class NetworkComparison(NetworkAnalysis):
         cmi_diff : dict
             original difference in CMI estimates for each source variable >
             target combination in the union network
-        cmi_surr : dict
+        cmi_surr : numpy array
             differences in CMI estimates from surrogate data, used as test
-            distribution
+            distribution, dimensions (n_perm x links), where links are all
+            source > target combinations in the union network
         alpha : float
             critical alpha level for network comparison
         n_permutations : int
@@ -58,6 +60,13 @@ class NetworkComparison(NetworkAnalysis):
     def __init__(self):
         super().__init__()
 
+    def __getstate__(self):
+        # The estimator is not sent to worker processes, workers create
+        # their own estimator from the settings.
+        state = self.__dict__.copy()
+        state.pop('_cmi_estimator', None)
+        return state
+
     def compare_within(self, settings, network_a, network_b, data_a, data_b):
         """Compare networks inferred under two conditions within one subject.
 
@@ -82,6 +91,19 @@ class NetworkComparison(NetworkAnalysis):
                   significance (default=0.05)
                 - verbose : bool [optional] - toggle console output
                   (default=True)
+                - executor : str [optional] - executor used to create
+                  surrogate data for targets in parallel, 'serial', 'pool',
+                  or 'disk_queue', see idtxl.parallel (default='serial')
+                - n_workers : int [optional] - number of worker processes
+                  used by the 'pool' executor (default=number of CPUs)
+                - seed : int [optional] - seed for numpy's random number
+                  generator, each target (compare_within) or subject
+                  (compare_between) and the permutation test use their own
+                  seed derived from this value, such that results do not
+                  depend on the executor (default=None)
+                - max_mem_surrogates : int [optional] - approximate memory in
+                  bytes used by the surrogate data of one target that are
+                  passed to the estimator in a single call (default=1e9)
 
             network_a : dict
                 results from network inference, condition a
@@ -131,7 +153,7 @@ class NetworkComparison(NetworkAnalysis):
             # are negative (which may happen due to estimator bias).
             'cmi_diff_abs': self._get_abs_diff(self.cmi_diff),
             'a>b': self.cmi_comp,
-            'cmi_surr': self.cmi_surr,
+            'cmi_surr': self._cmi_surr_to_dict(),
             'union_network': self.union,
             'pval': pvalue,
             'sign': sign,
@@ -150,6 +172,13 @@ class NetworkComparison(NetworkAnalysis):
         data have been recorded from subjects assigned to one of two
         experimental conditions (units of observations are subjects).
 
+        CMI for each subject is estimated as one job of the executor
+        requested in the settings (see idtxl.parallel), such that subjects may
+        be processed in parallel. Subjects may be passed as file paths to Data
+        objects saved using idtxl_io.save(), these are loaded only when their
+        job is run. When using the 'pool' executor, at most 'n_workers'
+        recordings are thus held in memory at once.
+
         Args:
             settings : dict
                 parameters for estimation and statistical testing, see
@@ -160,10 +189,12 @@ class NetworkComparison(NetworkAnalysis):
             network_set_b : numpy array of dicts
                 results from network inference for multiple subjects observed
                 under condition b
-            data_a : numpy array of Data objects
-                set of data from which network_set_a was inferred
-            data_b : numpy array of Data objects
-                set of data from which network_set_b was inferred
+            data_a : numpy array of Data objects or str
+                set of data from which network_set_a was inferred, each entry
+                is a Data object or a path to a Data object saved as '.npz'
+            data_b : numpy array of Data objects or str
+                set of data from which network_set_b was inferred, each entry
+                is a Data object or a path to a Data object saved as '.npz'
 
         Returns
             dict
@@ -183,8 +214,10 @@ class NetworkComparison(NetworkAnalysis):
         # Check input and analysis parameters.
         self._initialise(settings)
         self._check_n_subjects(data_set_a, data_set_b)
+        # Data given as file paths are checked after loading.
         data_all = np.hstack((data_set_a, data_set_b))
-        self._check_equal_realisations(*data_all)
+        self._check_equal_realisations(
+            *[d for d in data_all if isinstance(d, Data)])
 
         # Main comparison.
         print('\n-------------------------- (1) create union of networks')
@@ -207,7 +240,7 @@ class NetworkComparison(NetworkAnalysis):
             # are negative (which may happen due to estimator bias).
             'cmi_diff_abs': self._get_abs_diff(self.cmi_diff),
             'a>b': self.cmi_comp,
-            'cmi_surr': self.cmi_surr,
+            'cmi_surr': self._cmi_surr_to_dict(),
             'union_network': self.union,
             'pval': pvalue,
             'sign': sign,
@@ -267,11 +300,13 @@ class NetworkComparison(NetworkAnalysis):
 
     def _check_equal_realisations(self, *data_sets):
         """Check if all data sets have an equal no. realisations."""
-        n_realisations = data_sets[0].n_realisations()
-        for d in data_sets:
-            if d.n_realisations() != n_realisations:
-                raise RuntimeError('Unequal no. realisations between data '
-                                   'sets.')
+        self._check_equal_n_realisations(
+            [d.n_realisations() for d in data_sets])
+
+    def _check_equal_n_realisations(self, n_realisations):
+        """Check if all entries in a list of no. realisations are equal."""
+        if len(set(n_realisations)) > 1:
+            raise RuntimeError('Unequal no. realisations between data sets.')
 
     def _create_union(self, *networks):
         """Create the union from a set of individual networks."""
@@ -378,56 +413,129 @@ class NetworkComparison(NetworkAnalysis):
         (CMI) of each source > target combination in the union network for a
         set of data recorded under experimental condition a and a set of data
         recorded under experimental condition b. The mean is taken once over
-        all data objects in data_set_a and once over data in data_set_b. If
-        permute is set to True, data objects are permuted between condition a
-        and b before the difference of the mean is calculated to create
-        surrogate data sets. These surrogate data can be used as test
-        distribution when testing the orginal difference of the means.
+        all data objects in data_set_a and once over data in data_set_b, CMI
+        values are expected as (subjects x links) arrays in self.cmi_a and
+        self.cmi_b (see _calculate_union_cmi()). If permute is set to True,
+        data objects are permuted between condition a and b before the
+        difference of the mean is calculated to create a surrogate data set
+        (see _calculate_diff_of_mean_permuted()).
         """
         if permute:
-            # Permute data obejcts between conditions a and b before
-            # calculating the CMI.
-            cmi_all = self.cmi_a + self.cmi_b
-            new_partition_a = np.random.choice(range(len(cmi_all)),
-                                               size=len(self.cmi_a),
-                                               replace=False)
-            new_partition_b = list(set(range(0, len(cmi_all))) -
-                                   set(new_partition_a))
-            cmi_a_perm = [cmi_all[i] for i in new_partition_a]
-            cmi_b_perm = [cmi_all[i] for i in new_partition_b]
-
-            return self._calculate_diff(self._calculate_mean(cmi_a_perm),
-                                        self._calculate_mean(cmi_b_perm))
+            return self._links_to_dict(
+                self._calculate_diff_of_mean_permuted(n_perm=1)[0])
+        else:
+            return self._links_to_dict(np.mean(self.cmi_a, axis=0) -
+                                       np.mean(self.cmi_b, axis=0))
+
+    def _calculate_diff_of_mean_permuted(self, n_perm):
+        """Calculate differences of mean CMI for permuted data sets.
+
+        Draw n_perm permutations of data objects between conditions a and b
+        (see _get_permuted_subjects()) and calculate the difference of the mean
+        CMI between permuted conditions for all permutations and links at
+        once.
 
+        Returns:
+            numpy array
+                differences of the means with dimensions (n_perm x links)
+        """
+        cmi_all = np.vstack((self.cmi_a, self.cmi_b))
+        partition_a = self._get_permuted_subjects(n_perm)
+        n_a = self.cmi_a.shape[0]
+        n_b = self.cmi_b.shape[0]
+        return (np.dot(partition_a, cmi_all) / n_a -
+                np.dot(np.invert(partition_a), cmi_all) / n_b)
+
+    def _get_permuted_subjects(self, n_perm):
+        """Return masks of data objects assigned to condition a.
+
+        Draw n_perm permutations of data objects between conditions a and b,
+        where data objects are ordered as in np.vstack((self.cmi_a,
+        self.cmi_b)). For a dependent test, data objects with the same rank in
+        both conditions are swapped between conditions; for an independent
+        test, data objects are randomly assigned to a group of the size of
+        condition a and a group of the size of condition b (see
+        _create_surrogate_distribution_between()).
+
+        Returns:
+            numpy array
+                boolean array with dimensions (n_perm x no. data objects),
+                True where a data object is assigned to condition a
+        """
+        n_a = self.cmi_a.shape[0]
+        n_all = n_a + self.cmi_b.shape[0]
+        if self.settings['stats_type'] == 'dependent':
+            swap = np.random.randint(2, size=(n_perm, n_a)).astype(bool)
+            return np.hstack((np.invert(swap), swap))
+        elif self.settings['stats_type'] == 'independent':
+            idx_a = np.argsort(np.random.rand(n_perm, n_all), axis=1)[:, :n_a]
+            partition_a = np.zeros((n_perm, n_all), dtype=bool)
+            np.put_along_axis(partition_a, idx_a, True, axis=1)
+            return partition_a
         else:
-            return self._calculate_diff(self._calculate_mean(self.cmi_a),
-                                        self._calculate_mean(self.cmi_b))
+            raise RuntimeError('Unknown ''stats_type''!')
 
     def _calculate_union_cmi(self, data_set_a, data_set_b):
         """Calculate CMI for each data object using the union network mask.
 
+        Data objects are processed as jobs of the executor requested in the
+        settings. Results are stored as arrays with dimensions (subjects x
+        links), where links are all source > target combinations in the union
+        network (see _get_union_links()).
+
         Args:
-            data_set_a : list/array of Data instances
-                first set of raw data
-            data_set_b : list/array of Data instances
-                second set of raw data
+            data_set_a : list/array of Data instances or str
+                first set of raw data, Data instances or paths to Data objects
+                saved using idtxl_io.save()
+            data_set_b : list/array of Data instances or str
+                second set of raw data, Data instances or paths to Data
+                objects saved using idtxl_io.save()
+        """
+        data_all = list(data_set_a) + list(data_set_b)
+        seeds = parallel._get_node_seeds(self.settings.get('seed', None),
+                                         len(data_all))
+        results = parallel.get_executor(self.settings).map(
+            _calculate_cmi_subject, self, list(zip(data_all, seeds)))
+        self._check_equal_n_realisations([r[1] for r in results])
+        cmi_all = np.array([r[0] for r in results]).reshape(len(data_all), -1)
+        self.cmi_a = cmi_all[:len(data_set_a)]
+        self.cmi_b = cmi_all[len(data_set_a):]
+
+    def _get_union_links(self):
+        """Return slices of each target's sources in the flattened union.
+
+        Links are all source > target combinations in the union network,
+        ordered by target and, for each target, by the order of the target's
+        sources in the union network.
         """
-        self.cmi_a = []
-        for d in data_set_a:
-            self.cmi_a.append(self._calculate_cmi_all_links(d))
-        self.cmi_b = []
-        for d in data_set_b:
-            self.cmi_b.append(self._calculate_cmi_all_links(d))
+        links = {}
+        i = 0
+        for t in self.union['targets']:
+            n_sources = len(self.union[t]['selected_vars_sources'])
+            links[t] = slice(i, i + n_sources)
+            i += n_sources
+        return links
+
+    def _dict_to_links(self, cmi):
+        """Flatten a dict of CMI values per target into an array of links."""
+        return np.concatenate(
+            [np.asarray(cmi[t], dtype=float) for t in self.union['targets']])
+
+    def _links_to_dict(self, cmi):
+        """Split an array of links into a dict of CMI values per target."""
+        return {t: cmi[s] for t, s in self._get_union_links().items()}
+
+    def _cmi_surr_to_dict(self):
+        """Split surrogates into a list of dicts per permutation."""
+        return [self._links_to_dict(c) for c in self.cmi_surr]
 
     def _calculate_cmi_all_links(self, data):
         """Calculate CMI for each source>target combi in the union network."""
         cmi = {}
         for t in self.union['targets']:
-            cmi_temp = []
-
             # if there are no sources for the current target, continue to next
             if not self.union[t]['selected_vars_sources']:
-                cmi[t] = np.array(cmi_temp)
+                cmi[t] = np.array([])
                 continue
 
             # get realisations of the current value and the full cond. set.
@@ -435,38 +543,73 @@ class NetworkComparison(NetworkAnalysis):
             current_val = (t, self.union['max_lag'])
             idx_cond_full = (self.union[t]['selected_vars_target'] +
                              self.union[t]['selected_vars_sources'])
-            [cur_val_real, repl_idx] = data.get_realisations(current_val,
-                                                             [current_val])
+            cur_val_real = data.get_realisations(current_val,
+                                                 [current_val])[0]
             cond_full_real = data.get_realisations(current_val,
                                                    idx_cond_full)[0]
 
             # Calculate TE from each source variable to current target t
-            n_sources = len(self.union[t]['selected_vars_sources'])
-            cmi_temp = np.zeros(n_sources)
-            i = 0
-            for idx_source in self.union[t]['selected_vars_sources']:
-                # get realisations of current TE-source from the set of all
-                # conditionals and calculate the CMI
-                [cond_real, source_real] = utils.separate_arrays(
-                                                             idx_cond_full,
-                                                             idx_source,
-                                                             cond_full_real)
-                cmi_temp[i] = self._cmi_estimator.estimate(cur_val_real,
-                                                           source_real,
-                                                           cond_real)
-                i += 1
+            cmi[t] = self._calculate_cmi_target(
+                                        t, cur_val_real[np.newaxis, :, :],
+                                        cond_full_real[np.newaxis, :, :])[0]
+        return cmi
 
-            cmi[t] = cmi_temp
+    def _calculate_cmi_target(self, target, cur_val_real, cond_full_real):
+        """Calculate CMI from each source to a target for multiple data sets.
 
-        return cmi
+        Pack the CMI between the current value and each source variable,
+        conditional on all other variables in the union network's
+        conditioning set, for all data sets into one call to the estimator's
+        estimate_mult() method. Each combination of data set and source is
+        estimated as one chunk.
+
+        Args:
+            target : int
+                index of the target in the union network
+            cur_val_real : numpy array
+                realisations of the current value for each data set,
+                dimensions (data sets x realisations x 1)
+            cond_full_real : numpy array
+                realisations of the full conditioning set (target variables
+                followed by source variables) for each data set, dimensions
+                (data sets x realisations x no. conditionals)
+
+        Returns:
+            numpy array
+                CMI values with dimensions (data sets x no. sources)
+        """
+        n_sets, n_real, n_cond = cond_full_real.shape
+        n_target_vars = len(self.union[target]['selected_vars_target'])
+        n_sources = n_cond - n_target_vars
+        cols_remain = np.array([np.delete(np.arange(n_cond), c) for c in
+                                range(n_target_vars, n_cond)], dtype=int)
+
+        # Order chunks by data set first and by source second.
+        source_real = np.transpose(cond_full_real[:, :, n_target_vars:],
+                                   (0, 2, 1)).reshape(-1, 1)
+        if n_cond > 1:
+            cond_real = np.transpose(cond_full_real[:, :, cols_remain],
+                                     (0, 2, 1, 3)).reshape(-1, n_cond - 1)
+        else:
+            cond_real = None
+        if n_sets == 1:
+            cur_val_real = cur_val_real[0]
+            re_use = ['var1']
+        else:
+            cur_val_real = np.repeat(cur_val_real, n_sources,
+                                     axis=0).reshape(-1, 1)
+            re_use = []
+        cmi = self._cmi_estimator.estimate_mult(n_chunks=n_sets * n_sources,
+                                                re_use=re_use,
+                                                var1=cur_val_real,
+                                                var2=source_real,
+                                                conditional=cond_real)
+        return np.reshape(cmi, (n_sets, n_sources))
 
     def _compare_union_cmi_between(self):
         """Compare mean TE between conditions to get direction of effect."""
-        self.cmi_comp = {}
-        cmi_a_mean = self._calculate_mean(self.cmi_a)
-        cmi_b_mean = self._calculate_mean(self.cmi_b)
-        for t in self.union['targets']:
-            self.cmi_comp[t] = cmi_a_mean[t] > cmi_b_mean[t]
+        self.cmi_comp = self._links_to_dict(
+            np.mean(self.cmi_a, axis=0) > np.mean(self.cmi_b, axis=0))
 
     def _compare_union_cmi_within(self, cmi_a, cmi_b):
         """Compare TE between conditions to get direction of effect."""
@@ -481,68 +624,51 @@ class NetworkComparison(NetworkAnalysis):
             cmi_diff_abs[t] = np.abs(cmi_diff[t])
         return cmi_diff_abs
 
-    def _calculate_cmi_all_links_permuted(self, data_a, data_b):
-        """Calculate surrogate CMI for union network.
+    def _create_surrogates_target_within(self, data_a, data_b, target):
+        """Calculate surrogate CMI differences for one target.
 
-        Calculate conditional mutual information (CMI) for each source > target
-        combination in the union network after permuting realisations of
-        sources between the two data sets (coming from two conditions).
-        Results can be used in a surrogate permutation test of the original CMI
-        in the two data sets.
-        """
-        cmi_a = {}
-        cmi_b = {}
-        for t in self.union['targets']:
-            cmi_temp_a = []
-            cmi_temp_b = []
-            # If there are no sources for current target, continue  to the next
-            if not self.union[t]['selected_vars_sources']:
-                cmi_a[t] = np.array(cmi_temp_a)
-                cmi_b[t] = np.array(cmi_temp_b)
-                continue
+        Calculate conditional mutual information (CMI) for each source >
+        target combination in the union network after permuting realisations
+        of sources between the two data sets (coming from two conditions).
+        Permuted data sets are packed into batched calls to the estimator,
+        where each batch holds the data sets for as many permutations as fit
+        into the memory budget 'max_mem_surrogates'.
 
-            # Get full conditioning set for current target.
-            idx_cond_full = (self.union[t]['selected_vars_target'] +
-                             self.union[t]['selected_vars_sources'])
-            # Get realisations, where realisations are permuted/swapped
-            # replication-wise between two data sets (e.g., from different
-            # conditions)
-            [cond_full_perm_a,
-             cur_val_perm_a,
-             cond_full_perm_b,
-             cur_val_perm_b] = self._get_permuted_replications(data_a,
-                                                               data_b,
-                                                               t)
-            # Calculate CMI from each source to current target t from permuted
-            # data
-            n_sources = len(self.union[t]['selected_vars_sources'])
-            cmi_temp_a = np.zeros(n_sources)
-            cmi_temp_b = np.zeros(n_sources)
-            i = 0
-            for idx_source in self.union[t]['selected_vars_sources']:
-                # Get realisations of current source from the set of all
-                # surrogate conditionals and calculate the CMI. Do this for
-                # both conditions.
-                [temp_cond_real_a, source_real_a] = utils.separate_arrays(
-                                                             idx_cond_full,
-                                                             idx_source,
-                                                             cond_full_perm_a)
-                cmi_temp_a[i] = self._cmi_estimator.estimate(cur_val_perm_a,
-                                                             source_real_a,
-                                                             temp_cond_real_a)
-                [temp_cond_real_b, source_real_b] = utils.separate_arrays(
-                                                             idx_cond_full,
-                                                             idx_source,
-                                                             cond_full_perm_b)
-                cmi_temp_b[i] = self._cmi_estimator.estimate(cur_val_perm_b,
-                                                             source_real_b,
-                                                             temp_cond_real_b)
-                i += 1
-
-            cmi_a[t] = cmi_temp_a
-            cmi_b[t] = cmi_temp_b
-
-        return cmi_a, cmi_b
+        Returns:
+            numpy array
+                differences in surrogate CMI between conditions A and B with
+                dimensions (no. permutations x no. sources)
+        """
+        n_perm = self.settings['n_perm_comp']
+        n_sources = len(self.union[target]['selected_vars_sources'])
+        n_cond = (n_sources +
+                  len(self.union[target]['selected_vars_target']))
+        current_val = (target, self.union['max_lag'])
+        n_real = data_a.n_realisations(current_val)
+        # Each chunk holds the current value, the source, and the remaining
+        # conditionals.
+        mem_perm = n_sources * n_real * (n_cond + 1) * 8
+        n_batch = max(1, int(self.settings['max_mem_surrogates'] // mem_perm))
+
+        # Get realisations once and draw all permutations of replications,
+        # surrogate data are gathered from the realisations batch-wise.
+        [cond_real, cur_val_real, repl_rows] = self._get_target_realisations(
+                                                        data_a, data_b, target)
+        n_repl = repl_rows.shape[0] // 2
+        perm_repl = self._get_permuted_replications_idx(n_repl, n_perm)
+
+        cmi_surr = np.empty((n_perm, n_sources))
+        for i_1 in range(0, n_perm, n_batch):
+            i_2 = min(i_1 + n_batch, n_perm)
+            idx = repl_rows[perm_repl[i_1:i_2]]
+            idx_a = idx[:, :n_repl].reshape(i_2 - i_1, -1)
+            idx_b = idx[:, n_repl:].reshape(i_2 - i_1, -1)
+            cmi_a = self._calculate_cmi_target(target, cur_val_real[idx_a],
+                                               cond_real[idx_a])
+            cmi_b = self._calculate_cmi_target(target, cur_val_real[idx_b],
+                                               cond_real[idx_b])
+            cmi_surr[i_1:i_2, :] = cmi_a - cmi_b
+        return cmi_surr
 
     def _calculate_mean(self, cmi_set):
         """Calculate the mean CMI over multiple data sets for all targets."""
@@ -610,14 +736,24 @@ class NetworkComparison(NetworkAnalysis):
             data_a : Data instance
                 second set of raw data
         """
-        self.cmi_surr = []
-        for p in range(self.settings['n_perm_comp']):
-            if self.settings['verbose']:
-                print('Creating surrogate data set {0} of {1}.'.format(
-                        p + 1, self.settings['n_perm_comp']))
-            [cmi_a, cmi_b] = self._calculate_cmi_all_links_permuted(data_a,
-                                                                    data_b)
-            self.cmi_surr.append(self._calculate_diff(cmi_a, cmi_b))
+        # Spread targets over the executor requested in the settings, each
+        # target is processed with its own seed derived from settings['seed'].
+        targets = [t for t in self.union['targets']
+                   if self.union[t]['selected_vars_sources']]
+        seeds = parallel._get_node_seeds(self.settings.get('seed', None),
+                                         len(targets))
+        if self.settings['verbose']:
+            print('Creating {0} surrogate data sets for {1} targets.'.format(
+                self.settings['n_perm_comp'], len(targets)))
+        cmi_surr_targets = parallel.get_executor(self.settings).map(
+            _create_surrogates_target_within, (self, data_a, data_b),
+            list(zip(targets, seeds)))
+
+        links = self._get_union_links()
+        n_links = sum(s.stop - s.start for s in links.values())
+        self.cmi_surr = np.empty((self.settings['n_perm_comp'], n_links))
+        for t, cmi_surr in zip(targets, cmi_surr_targets):
+            self.cmi_surr[:, links[t]] = cmi_surr
 
     def _create_surrogate_distribution_between(self):
         """Create the surrogate distribution for network inference.
@@ -649,32 +785,31 @@ class NetworkComparison(NetworkAnalysis):
         A_5    B_5        ->        B_1    A_2
         ...                         ...
         """
-        self.cmi_surr = []
-        for p in range(self.settings['n_perm_comp']):
-            self.cmi_surr.append(self._calculate_diff_of_mean(permute=True))
+        # Draw permutations using a seed derived from settings['seed'], such
+        # that they do not depend on the executor used for CMI estimation.
+        n_subjects = self.cmi_a.shape[0] + self.cmi_b.shape[0]
+        seed = parallel._get_node_seeds(self.settings.get('seed', None),
+                                        n_subjects + 1)[-1]
+        with parallel.seeded_random_state(seed):
+            self.cmi_surr = self._calculate_diff_of_mean_permuted(
+                                                self.settings['n_perm_comp'])
 
     def _p_value_union(self):
         """Calculate the p-value for the CMI between each source and target."""
-        # Test each original difference against its surrogate distribution.
+        # Test each original difference against its surrogate distribution,
+        # all links in the union network are tested at once.
+        [sign, pval] = stats._find_pvalues(
+                                    statistic=self._dict_to_links(
+                                                            self.cmi_diff),
+                                    distribution=self.cmi_surr.T,
+                                    alpha=self.settings['alpha_comp'],
+                                    tail=self.settings['tail_comp'])
         significance = {}
         pvalue = {}
-        for t in self.union['targets']:
-            n_sources = self.cmi_surr[0][t].shape[0]
-            if n_sources == 0:
-                continue
-            surr_temp = np.zeros((self.settings['n_perm_comp'], n_sources))
-            significance[t] = np.zeros(n_sources, dtype=bool)
-            pvalue[t] = np.empty(n_sources)
-            for p in range(self.settings['n_perm_comp']):
-                surr_temp[p, :] = self.cmi_surr[p][t]
-            for s in range(n_sources):
-                [sig, p] = stats._find_pvalue(
-                                            statistic=self.cmi_diff[t][s],
-                                            distribution=surr_temp[:, s],
-                                            alpha=self.settings['alpha_comp'],
-                                            tail=self.settings['tail_comp'])
-                significance[t][s] = sig
-                pvalue[t][s] = p
+        for t, s in self._get_union_links().items():
+            if s.stop > s.start:
+                significance[t] = sign[s]
+                pvalue[t] = pval[s]
         return pvalue, significance
 
     def _union_indices_to_lags(self):
@@ -691,13 +826,11 @@ class NetworkComparison(NetworkAnalysis):
     def _get_permuted_replications(self, data_a, data_b, target):
         """Return realisations with replications permuted betw. two data sets.
 
-        Return surrogate data for a given target for the conditioning and the
-
-        where original data
-
-        Create surrogate data by permuting realisations of the conditioning set
-        over replications. All realisations in one replication get swapped
-        between the two conditions to generate surrogate data.
+        Return surrogate data for a given target for the conditioning set and
+        the current value. Create surrogate data by permuting realisations of
+        the conditioning set over replications. All realisations in one
+        replication get swapped between the two conditions to generate
+        surrogate data (see _get_permuted_replications_idx()).
 
         Args:
             data_a : Data instance
@@ -711,6 +844,41 @@ class NetworkComparison(NetworkAnalysis):
             cond_a_perm, cur_val_a_perm, cond_b_perm, cur_val_b_perm
 
         """
+        [cond_real, cur_val_real, repl_rows] = self._get_target_realisations(
+                                                        data_a, data_b, target)
+        n_repl = repl_rows.shape[0] // 2
+        idx = repl_rows[self._get_permuted_replications_idx(n_repl, 1)[0]]
+        idx_a = idx[:n_repl].reshape(-1)
+        idx_b = idx[n_repl:].reshape(-1)
+        return (cond_real[idx_a], cur_val_real[idx_a],
+                cond_real[idx_b], cur_val_real[idx_b])
+
+    def _get_target_realisations(self, data_a, data_b, target):
+        """Return realisations of two data sets for permuting replications.
+
+        Get realisations of the current value and the full conditioning set
+        in the union network for a given target from both data sets. The
+        realisations of both data sets are stacked, such that surrogate data
+        can be gathered from them by indexing.
+
+        Args:
+            data_a : Data instance
+                raw data, condition A
+            data_b : Data instance
+                raw data, condition B
+            target : int
+                index of the target in the union network
+
+        Returns:
+            numpy array
+                realisations of the full conditioning set in A followed by B
+            numpy array
+                realisations of the current value in A followed by B
+            numpy array
+                indices of realisations in each replication, with dimensions
+                (2 * no. replications x no. samples per replication), rows are
+                replications in A followed by replications in B
+        """
         # Get indices of current value and full conditioning set in the
         # union network.
         current_val = (target, self.union['max_lag'])
@@ -727,70 +895,53 @@ class NetworkComparison(NetworkAnalysis):
         cond_a_real = data_a.get_realisations(current_val, idx_cond_full)[0]
         cond_b_real = data_b.get_realisations(current_val, idx_cond_full)[0]
 
-        # Get no. replications and no. samples per replication.
+        # Get indices of realisations per replication, indices into B are
+        # shifted by the no. realisations in A.
         n_repl = max(repl_idx_a) + 1
-        n_per_repl = sum(repl_idx_a == 0)
+        n_real = cur_val_a_real.shape[0]
+        repl_rows = np.vstack((
+            np.array([np.where(repl_idx_a == r)[0] for r in range(n_repl)]),
+            np.array([np.where(repl_idx_b == r)[0] for r in range(n_repl)]) +
+            n_real))
+        return (np.vstack((cond_a_real, cond_b_real)),
+                np.vstack((cur_val_a_real, cur_val_b_real)),
+                repl_rows)
+
+    def _get_permuted_replications_idx(self, n_repl, n_perm):
+        """Draw permutations of replications between two data sets.
+
+        Swap or permute replications depending on the stats type. For a
+        dependent test, replications with the same index are swapped between
+        conditions with probability 0.5. For an independent test,
+        replications from both data sets are pooled and two samples of size
+        n_repl are drawn.
 
-        # Make copies such that arrays in the caller scope are not overwritten.
-        cond_a_perm = cp.copy(cond_a_real)
-        cond_b_perm = cp.copy(cond_b_real)
-        cur_val_a_perm = cp.copy(cur_val_a_real)
-        cur_val_b_perm = cp.copy(cur_val_b_real)
+        Args:
+            n_repl : int
+                no. replications per data set
+            n_perm : int
+                no. permutations
 
-        # Swap or permute realisations of the conditioning set depending on the
-        # stats type.
+        Returns:
+            numpy array
+                indices of replications in the pooled replications of A and B
+                (A followed by B), with dimensions (n_perm x 2 * n_repl); for
+                each permutation, the first n_repl entries are the
+                replications assigned to condition A, the remaining entries
+                are assigned to condition B
+        """
         if self.settings['stats_type'] == 'dependent':
-            swap = np.repeat(np.random.randint(2, size=n_repl).astype(bool),
-                             n_per_repl)
-            cond_a_perm[swap, :] = cond_b_real[swap, :]
-            cond_b_perm[swap, :] = cond_a_real[swap, :]
-            cur_val_a_perm[swap, :] = cur_val_b_real[swap, :]
-            cur_val_b_perm[swap, :] = cur_val_a_real[swap, :]
-
+            swap = np.random.randint(2, size=(n_perm, n_repl))
+            return np.hstack((np.arange(n_repl) + n_repl * swap,
+                              np.arange(n_repl) + n_repl * (1 - swap)))
         elif self.settings['stats_type'] == 'independent':
-            # Pool replications from both data sets and draw two samples of
-            # size n_repl.
-            resample_a = np.random.choice(2 * n_repl, n_repl, replace=False)
-            resample_b = np.setdiff1d(np.arange(2 * n_repl), resample_a)
-
-            # Get resampled realisations for group A.
-            i_0 = 0
-            i_1 = n_per_repl
-            for r in resample_a:
-                if r >= n_repl:     # take realisation from cond B
-                    r_perm = r - n_repl
-                    cond_a_perm[i_0:i_1, ] = cond_b_real[repl_idx_b ==
-                                                         r_perm, :]
-                    cur_val_a_perm[i_0:i_1, ] = cur_val_b_real[repl_idx_b ==
-                                                               r_perm, :]
-                else:               # take realisation from cond A otherwise
-                    cond_a_perm[i_0:i_1, ] = cond_a_real[repl_idx_a == r, :]
-                    cur_val_a_perm[i_0:i_1, ] = cur_val_a_real[repl_idx_a == r,
-                                                               :]
-                i_0 = i_1
-                i_1 = i_0 + n_per_repl
-
-            # Get resampled realisations for group B.
-            i_0 = 0
-            i_1 = n_per_repl
-            for r in resample_b:
-                if r >= n_repl:     # take realisation from cond B
-                    r_perm = r - n_repl
-                    cond_b_perm[i_0:i_1, ] = cond_b_real[repl_idx_b ==
-                                                         r_perm, :]
-                    cur_val_b_perm[i_0:i_1, ] = cur_val_b_real[repl_idx_b ==
-                                                               r_perm, :]
-                else:               # take realisation from cond A otherwise
-                    cond_b_perm[i_0:i_1, ] = cond_a_real[repl_idx_a == r, :]
-                    cur_val_b_perm[i_0:i_1, ] = cur_val_a_real[repl_idx_a == r,
-                                                               :]
-                i_0 = i_1
-                i_1 = i_0 + n_per_repl
+            resample = np.argsort(np.random.rand(n_perm, 2 * n_repl), axis=1)
+            resample[:, n_repl:] = np.sort(resample[:, n_repl:], axis=1)
+            return resample
         else:
             raise ValueError('Unkown "stats_type": {0}, should be "dependent" '
                              'or "independent".'.format(
                                                 self.settings['stats_type']))
-        return cond_a_perm, cur_val_a_perm, cond_b_perm, cur_val_b_perm
 
     def _initialise(self, settings):
         """Check input and set analysis settings to initial values."""
@@ -813,6 +964,7 @@ class NetworkComparison(NetworkAnalysis):
         settings.setdefault('n_perm_comp', 500)
         settings.setdefault('alpha_comp', 0.05)
         settings.setdefault('tail_comp', 'two')
+        settings.setdefault('max_mem_surrogates', int(1e9))
         stats.check_n_perm(settings['n_perm_comp'], settings['alpha_comp'])
         self.settings = settings
 
@@ -824,3 +976,39 @@ class NetworkComparison(NetworkAnalysis):
         del self.cmi_diff
         del self.cmi_surr
         del self._cmi_estimator
+
+
+def _init_job(comparison):
+    """Create the estimator for a job run by executors if necessary."""
+    if not hasattr(comparison, '_cmi_estimator'):
+        EstimatorClass = find_estimator(comparison.settings['cmi_estimator'])
+        comparison._cmi_estimator = EstimatorClass(comparison.settings)
+
+
+def _calculate_cmi_subject(shared, job):
+    """Calculate CMI for all links of one subject, this is the job run by
+    executors.
+
+    Returns the CMI for all links in the union network and the number of
+    realisations in the subject's data. Data given as a file path are loaded
+    within the job.
+    """
+    comparison = shared
+    data, seed = job
+    _init_job(comparison)
+    if isinstance(data, str):
+        data = io.load(data)
+    with parallel.seeded_random_state(seed):
+        cmi = comparison._calculate_cmi_all_links(data)
+    return comparison._dict_to_links(cmi), data.n_realisations()
+
+
+def _create_surrogates_target_within(shared, job):
+    """Create surrogate CMI differences for one target, this is the job run by
+    executors."""
+    comparison, data_a, data_b = shared
+    target, seed = job
+    _init_job(comparison)
+    with parallel.seeded_random_state(seed):
+        return comparison._create_surrogates_target_within(data_a, data_b,
+                                                           target)
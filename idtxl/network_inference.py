@@ -137,6 +137,10 @@ class NetworkInference(NetworkAnalysis):
             self.pvalues_sign_sources = None
             self.te_sign_sources = None
             self._min_stats_surr_table = None
+        self._n_perm_used = {}
+        self._max_stats_perm = None
+        self._max_stats_surr_realisations = {}
+        self._max_stats_surr_distribution = None
 
         # Check if the user provided a list of candidates that must go into
         # the conditioning set. These will be added and used for TE estimation,
@@ -240,14 +244,17 @@ class NetworkInference(NetworkAnalysis):
         success = False
         while candidate_set:
             # Get realisations for all candidates.
-            cand_real = data.get_realisations(self.current_value,
-                                              candidate_set)[0]
-            cand_real = cand_real.T.reshape(cand_real.size, 1)
+            cand_real = data.get_realisations_stacked(self.current_value,
+                                                      candidate_set)
 
             # Calculate the (C)MI for each candidate and the target.
             temp_te = self._cmi_estimator.estimate_mult(
                                 n_chunks=len(candidate_set),
                                 re_use=['var2', 'conditional'],
+                                cache_keys=self._get_cache_keys(
+                                    data, candidate_set,
+                                    [self.selected_vars_full] *
+                                    len(candidate_set)),
                                 var1=cand_real,
                                 var2=self._current_value_realisations,
                                 conditional=self._selected_vars_realisations)
@@ -269,11 +276,14 @@ class NetworkInference(NetworkAnalysis):
                 if self.settings['verbose']:
                     print(' -- significant')
                 success = True
-                candidate_set.pop(np.argmax(temp_te))
+                # Realisations of the max candidate are re-used from the
+                # stacked candidate realisations.
+                i_max = np.argmax(temp_te)
+                n_real = data.n_realisations(self.current_value)
+                candidate_set.pop(i_max)
                 self._append_selected_vars(
                         [max_candidate],
-                        data.get_realisations(self.current_value,
-                                              [max_candidate])[0])
+                        cand_real[i_max * n_real:(i_max + 1) * n_real])
             else:
                 if self.settings['verbose']:
                     print(' -- not significant')
@@ -298,6 +308,7 @@ class NetworkInference(NetworkAnalysis):
 
     def _reset(self):
         """Reset instance after analysis."""
+        self._print_cache_info()
         self.__init__()
         del self.settings
         del self.source_set
@@ -0,0 +1,431 @@
+"""Provide executors for the parallel analysis of network nodes.
+
+Network-level analyses, e.g., MultivariateTE.analyse_network(), analyse each
+target independently of all other targets. Executors farm out these
+single-node analyses to worker processes and gather the results. The
+executor is chosen through the analysis settings:
+
+- executor : str [optional] - 'serial' runs all nodes in the calling
+  process, 'pool' uses a pool of local worker processes, 'disk_queue' uses
+  local worker processes that claim jobs from a queue directory on disk
+  (default='serial')
+- n_workers : int [optional] - number of worker processes used by the
+  'pool' and 'disk_queue' executors (default=number of CPUs)
+- queue_dir : str [optional] - directory holding jobs and results of the
+  'disk_queue' executor; results found in the directory are reused, such
+  that an interrupted analysis can be resumed, if they were created by the
+  same analysis (same function, settings, data, and jobs; executor,
+  n_workers, and queue_dir may differ), otherwise an error is raised
+  (default=temporary directory that is removed after the analysis)
+- seed : int [optional] - seed for numpy's random number generator, each
+  node is analysed with its own seed derived from this value, such that
+  results do not depend on the executor or the order in which nodes are
+  processed; the caller's random state is restored after each node
+  (default=None, numpy's global state is not touched)
+
+Executors send a copy of the data to each worker process. Call
+Data.share_data() before starting the analysis to move the data into shared
+memory or a memory-mapped file, workers then attach to the shared data
+instead of holding their own copies.
+
+Worker processes are started using the 'spawn' method because a running
+Java virtual machine (JVM) does not survive a fork. Each worker starts its
+own JVM when the first JIDT estimator is created and reuses it for all
+further nodes it analyses. Note that JIDT's Kraskov estimators add random
+noise to the data using Java's random number generator, set 'noise_level'
+to 0 to obtain fully reproducible results for a fixed seed. Scripts using
+parallel executors have to protect their entry point by
+if __name__ == '__main__'.
+"""
+import os
+import glob
+import pickle
+import hashlib
+import shutil
+import tempfile
+import traceback
+import copy as cp
+import multiprocessing as mp
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Objects shared by all jobs of a worker process, set by _start_worker().
+_worker_shared = None
+
+# Settings that configure the executor only and do not change results.
+_EXECUTOR_SETTINGS = ['executor', 'n_workers', 'queue_dir']
+
+
+def get_executor(settings):
+    """Return the executor requested in the analysis settings.
+
+    Args:
+        settings : dict
+            analysis settings, see module docstring for the settings used to
+            select and configure the executor
+
+    Returns:
+        Executor instance
+    """
+    settings.setdefault('executor', 'serial')
+    settings.setdefault('n_workers', os.cpu_count())
+    try:
+        executor = EXECUTORS[settings['executor']]
+    except KeyError:
+        raise RuntimeError('Unknown executor {0}, use one of {1}.'.format(
+            settings['executor'], list(EXECUTORS.keys())))
+    return executor(settings)
+
+
+def analyse_nodes(analysis, method, settings, data, node_args, labels=None):
+    """Apply a single-node analysis method to multiple network nodes.
+
+    Call the method of a fresh instance of the analysis class for each node,
+    using the executor requested in the settings. Each call receives its own
+    copy of the settings, such that defaults set during the analysis of one
+    node do not leak into the analysis of the next.
+
+    Args:
+        analysis : NetworkAnalysis instance
+            analysis providing the single-node analysis method
+        method : str
+            name of the single-node method, e.g., 'analyse_single_target'
+        settings : dict
+            analysis settings, passed to each call of the method
+        data : Data instance
+            raw data for analysis
+        node_args : list of tuples
+            additional arguments passed to the method for each node, e.g.,
+            (target, sources)
+        labels : list of str [optional]
+            message printed before the analysis of each node if
+            settings['verbose'] is True
+
+    Returns:
+        list
+            results for each node, in the order of node_args
+    """
+    executor = get_executor(settings)
+    seeds = _get_node_seeds(settings.get('seed', None), len(node_args))
+    if labels is None or not settings.get('verbose', True):
+        labels = [None for n in node_args]
+    shared = (type(analysis), method, settings, data)
+    jobs = [(labels[n], node_args[n], seeds[n]) for n in range(len(node_args))]
+    return executor.map(_analyse_node, shared, jobs)
+
+
+def _analyse_node(shared, job):
+    """Analyse a single node, this is the job run by executors."""
+    analysis_class, method, settings, data = shared
+    label, args, seed = job
+    if label is not None:
+        print(label)
+    with seeded_random_state(seed):
+        return getattr(analysis_class(), method)(cp.deepcopy(settings), data,
+                                                 *args)
+
+
+@contextmanager
+def seeded_random_state(seed):
+    """Seed numpy's global random state for a job and restore it afterwards.
+
+    Analyses draw random numbers from numpy's global random state. Seed it
+    for the duration of a job, such that jobs run by the serial executor do
+    not change the random state of the calling process. If seed is None,
+    the random state is not touched.
+
+    Args:
+        seed : int | None
+            seed for numpy's random number generator
+    """
+    if seed is None:
+        yield
+        return
+    state = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        yield
+    finally:
+        np.random.set_state(state)
+
+
+def _get_node_seeds(seed, n_nodes):
+    """Derive one seed per node from a base seed."""
+    if seed is None:
+        return [None for n in range(n_nodes)]
+    return np.random.RandomState(seed).randint(
+        np.iinfo(np.int32).max, size=n_nodes).tolist()
+
+
+def _start_worker(shared):
+    """Store objects shared by all jobs in a worker process."""
+    global _worker_shared
+    _worker_shared = shared
+
+
+def _run_job(func, job):
+    """Run a job on the objects shared within a worker process."""
+    return func(_worker_shared, job)
+
+
+class Executor(metaclass=ABCMeta):
+    """Abstract class for executors.
+
+    Executors apply a function to a list of jobs. The function is called as
+    func(shared, job), where shared holds objects common to all jobs (e.g.,
+    settings and data), which are transferred to each worker only once.
+    Functions have to be defined on the module level such that they can be
+    pickled.
+
+    Args:
+        settings : dict
+            analysis settings, see module docstring
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    @abstractmethod
+    def map(self, func, shared, jobs):
+        """Apply function to all jobs and return results in job order."""
+        pass
+
+
+class SerialExecutor(Executor):
+    """Run all jobs one after another in the calling process."""
+
+    def map(self, func, shared, jobs):
+        return [func(shared, j) for j in jobs]
+
+
+class PoolExecutor(Executor):
+    """Run jobs in a pool of local worker processes."""
+
+    def map(self, func, shared, jobs):
+        n_workers = min(self.settings['n_workers'], len(jobs))
+        if n_workers < 2:
+            return SerialExecutor(self.settings).map(func, shared, jobs)
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 mp_context=mp.get_context('spawn'),
+                                 initializer=_start_worker,
+                                 initargs=(shared,)) as pool:
+            futures = [pool.submit(_run_job, func, j) for j in jobs]
+            return [f.result() for f in futures]
+
+
+class DiskQueueExecutor(Executor):
+    """Run jobs in local worker processes that claim jobs from disk.
+
+    Jobs and shared objects are written to a queue directory. Worker
+    processes claim jobs by atomically renaming job files and write each
+    result to disk as soon as it is available. Finished results are kept if
+    the analysis is interrupted and are reused when the same queue directory
+    is used again for the same analysis. The analysis is identified by a
+    fingerprint of the function, shared objects, and jobs, which is written
+    to the queue directory (see _get_fingerprint()). A queue directory
+    holding results of a different analysis is not used. Executor settings,
+    e.g., the number of workers, may change between runs.
+    """
+
+    def map(self, func, shared, jobs):
+        queue_dir = self.settings.get('queue_dir', None)
+        if queue_dir is not None:
+            return self._run_queue(queue_dir, func, shared, jobs)
+        # A temporary queue holds copies of the data and is removed even if
+        # the analysis fails.
+        queue_dir = tempfile.mkdtemp(prefix='idtxl_queue_')
+        try:
+            return self._run_queue(queue_dir, func, shared, jobs)
+        finally:
+            shutil.rmtree(queue_dir, ignore_errors=True)
+
+    def _run_queue(self, queue_dir, func, shared, jobs):
+        """Run all jobs without a result in the queue directory."""
+        os.makedirs(queue_dir, exist_ok=True)
+        _check_manifest(queue_dir, _get_fingerprint(func, shared, jobs,
+                                                    self.settings))
+
+        # Write shared objects and all jobs without a result. Jobs claimed by
+        # workers of an interrupted run are put back into the queue.
+        _dump(os.path.join(queue_dir, 'shared.pkl'), (func, shared))
+        for f in glob.glob(os.path.join(queue_dir, 'error_*')):
+            os.remove(f)
+        for f in glob.glob(os.path.join(queue_dir, 'job_*.claimed*')):
+            os.remove(f)
+        n_open = 0
+        for j in range(len(jobs)):
+            if not os.path.isfile(_result_file(queue_dir, j)):
+                _dump(_job_file(queue_dir, j), jobs[j])
+                n_open += 1
+
+        n_workers = min(self.settings['n_workers'], n_open)
+        ctx = mp.get_context('spawn')
+        workers = [ctx.Process(target=_run_disk_worker, args=(queue_dir,))
+                   for w in range(n_workers)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        errors = sorted(glob.glob(os.path.join(queue_dir, 'error_*')))
+        if errors:
+            with open(errors[0]) as f:
+                message = f.read()
+            raise RuntimeError('{0} job(s) failed in the disk queue {1}, '
+                               'first error:\n{2}'.format(len(errors),
+                                                          queue_dir, message))
+        results = []
+        for j in range(len(jobs)):
+            try:
+                results.append(_load(_result_file(queue_dir, j)))
+            except FileNotFoundError:
+                raise RuntimeError('No result for job {0} in the disk queue '
+                                   '{1}, a worker may have been killed.'
+                                   .format(j, queue_dir))
+        return results
+
+
+def _run_disk_worker(queue_dir):
+    """Claim and run jobs from a disk queue until no jobs are left."""
+    func, shared = _load(os.path.join(queue_dir, 'shared.pkl'))
+    while True:
+        job_files = sorted(glob.glob(os.path.join(queue_dir, 'job_*.pkl')))
+        if not job_files:
+            return
+        for job_file in job_files:
+            claimed = '{0}.claimed{1}'.format(job_file, os.getpid())
+            try:
+                os.rename(job_file, claimed)
+            except FileNotFoundError:  # claimed by another worker
+                continue
+            j = int(os.path.basename(job_file)[4:-4])
+            try:
+                _dump(_result_file(queue_dir, j), func(shared, _load(claimed)))
+            except Exception:
+                with open(os.path.join(queue_dir, 'error_{0:06d}.txt'.format(
+                        j)), 'w') as f:
+                    f.write(traceback.format_exc())
+            os.remove(claimed)
+
+
+def _check_manifest(queue_dir, fingerprint):
+    """Check if a queue directory belongs to the analysis to be run.
+
+    Write the analysis fingerprint to the manifest of a new queue directory.
+    Raise an error if the directory belongs to a different analysis or
+    holds results without a manifest.
+    """
+    manifest = os.path.join(queue_dir, 'manifest.txt')
+    if os.path.isfile(manifest):
+        with open(manifest) as f:
+            if f.read().strip() == fingerprint:
+                return
+        raise RuntimeError('The disk queue {0} holds results of a different '
+                           'analysis (function, settings, data, or jobs '
+                           'differ), use a different queue_dir or remove the '
+                           'directory.'.format(queue_dir))
+    if glob.glob(os.path.join(queue_dir, 'result_*.pkl')):
+        raise RuntimeError('The disk queue {0} holds results without a '
+                           'manifest, use a different queue_dir or remove the '
+                           'directory.'.format(queue_dir))
+    with open(manifest, 'w') as f:
+        f.write(fingerprint)
+
+
+def _get_fingerprint(func, shared, jobs, settings=None):
+    """Return a hash identifying an analysis run by an executor.
+
+    The hash covers the job function, shared objects (e.g., settings and
+    data), and jobs. Arrays are identified by their content and memory-mapped
+    or HDF5 files by their name, size, and modification time, such that data
+    moved into shared memory have the same fingerprint in every run. If the
+    executor's settings dict is given, its entries that configure the
+    executor only (see _EXECUTOR_SETTINGS) are left out.
+    """
+    h = hashlib.sha256()
+    _FingerprintPickler(_HashWriter(h), settings).dump(
+        (func.__module__, func.__qualname__, shared, jobs))
+    return h.hexdigest()
+
+
+class _HashWriter():
+    """File-like object feeding written bytes into a hash."""
+
+    def __init__(self, h):
+        self.h = h
+
+    def write(self, b):
+        self.h.update(b)
+
+
+class _FingerprintPickler(pickle.Pickler):
+    """Pickler replacing data by stable identifiers for fingerprints."""
+
+    def __init__(self, file, settings=None):
+        super().__init__(file)
+        self.settings = settings
+
+    def persistent_id(self, obj):
+        if self.settings is not None and obj is self.settings:
+            return ('settings', {k: v for k, v in obj.items()
+                                 if k not in _EXECUTOR_SETTINGS})
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.hasobject:
+                return NotImplemented
+            filename = getattr(obj, 'filename', None)
+            if filename is not None:
+                return tuple, (('file', _file_stats(filename), obj.shape,
+                                obj.dtype.str, obj.offset),)
+            return tuple, (('array', obj.shape, obj.dtype.str, hashlib.sha256(
+                np.ascontiguousarray(obj).view(np.uint8)).hexdigest()),)
+        if getattr(obj, '_shared', None) is not None:
+            # Data moved into shared memory, identify by content instead of
+            # the name of the shared block.
+            state = {k: v for k, v in obj.__dict__.items()
+                     if k not in ['_shared', '_shared_memory',
+                                  '_attached_memory']}
+            return tuple, ((type(obj).__name__, state),)
+        source = getattr(obj, '_source', None)
+        if source is not None:
+            # Data read lazily from a memory-mapped file or HDF5 dataset.
+            state = {k: v for k, v in obj.__dict__.items() if k != '_source'}
+            if not isinstance(source, np.ndarray):
+                source = (_file_stats(source.file.filename), source.name)
+            return tuple, ((type(obj).__name__, source, state),)
+        return NotImplemented
+
+
+def _file_stats(filename):
+    stat = os.stat(filename)
+    return os.path.abspath(filename), stat.st_size, stat.st_mtime_ns
+
+
+def _job_file(queue_dir, j):
+    return os.path.join(queue_dir, 'job_{0:06d}.pkl'.format(j))
+
+
+def _result_file(queue_dir, j):
+    return os.path.join(queue_dir, 'result_{0:06d}.pkl'.format(j))
+
+
+def _dump(file_name, obj):
+    """Pickle object, the file appears only once it is written completely."""
+    tmp_name = '{0}.tmp{1}'.format(file_name, os.getpid())
+    with open(tmp_name, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_name, file_name)
+
+
+def _load(file_name):
+    with open(file_name, 'rb') as f:
+        return pickle.load(f)
+
+
+EXECUTORS = {'serial': SerialExecutor,
+             'pool': PoolExecutor,
+             'disk_queue': DiskQueueExecutor}
@@ -5,6 +5,7 @@ Created on Mon Mar  7 18:13:27 2016
 @author: patricia
 """
 import numpy as np
+from scipy.stats import beta
 from . import idtxl_utils as utils
 
 VERBOSE = True
@@ -67,27 +68,26 @@ def network_fdr(settings=None, *results):
     # p-value of whole target (all candidates), or correct p-value of
     # individual source variables. Use targets with significant input only
     # (determined by the omnibus test).
-    pval = np.arange(0)
-    target_idx = np.arange(0).astype(int)
-    n_perm = np.arange(0).astype(int)
+    # Collect arrays in lists and concatenate them once.
+    targets = [t for t in res.keys() if res[t]['omnibus_sign']]
     cands = []
     if correct_by_target:  # whole target
-        for target in res.keys():
-            if res[target]['omnibus_sign']:
-                pval = np.append(pval, res[target]['omnibus_pval'])
-                target_idx = np.append(target_idx, target)
-                n_perm = np.append(n_perm,
-                                   res[target]['settings']['n_perm_omnibus'])
+        pval = np.array([res[t]['omnibus_pval'] for t in targets],
+                        dtype=float)
+        target_idx = np.array(targets, dtype=int)
+        n_perm = np.array([res[t]['settings']['n_perm_omnibus']
+                           for t in targets], dtype=int)
     else:  # individual variables
-        for target in res.keys():
-            if res[target]['omnibus_sign']:
-                n_sign = res[target]['selected_sources_pval'].size
-                pval = np.append(pval, res[target]['selected_sources_pval'])
-                target_idx = np.append(target_idx,
-                                       np.ones(n_sign) * target).astype(int)
-                cands = cands + res[target]['selected_vars_sources']
-                n_perm = np.append(n_perm,
-                                   res[target]['settings']['n_perm_max_seq'])
+        pval = np.concatenate(
+            [np.atleast_1d(res[t]['selected_sources_pval']) for t in targets] +
+            [np.arange(0)]).astype(float)
+        target_idx = np.repeat(
+            np.array(targets, dtype=int),
+            [np.size(res[t]['selected_sources_pval']) for t in targets])
+        for t in targets:
+            cands = cands + res[t]['selected_vars_sources']
+        n_perm = np.array([res[t]['settings']['n_perm_max_seq']
+                           for t in targets], dtype=int)
 
     if pval.size == 0:
         print('No links in final results. Return ...')
@@ -174,6 +174,10 @@ def omnibus_test(analysis_setup, data):
             - permute_in_time : bool [optional] - generate surrogates by
               shuffling samples in time instead of shuffling whole replications
               (default=False)
+            - perm_adaptive : bool [optional] - create surrogates in batches
+              of increasing size and stop once the test decision is settled,
+              see _get_adaptive_surrogates() for further settings
+              (default=False)
 
         data : Data instance
             raw data
@@ -231,28 +235,34 @@ def omnibus_test(analysis_setup, data):
         i_1 = i_2
         i_2 += data.n_realisations(analysis_setup.current_value)
         '''
-    if (analysis_setup._cmi_estimator.is_analytic_null_estimator() and
-            permute_in_time):
-        # Generate the surrogates analytically
-        surr_distribution = (analysis_setup._cmi_estimator.
-                             estimate_surrogates_analytic(
-                               n_perm=n_permutations,
+    def create_surrogates(n_perm):
+        if (analysis_setup._cmi_estimator.is_analytic_null_estimator() and
+                permute_in_time):
+            # Generate the surrogates analytically
+            surr = analysis_setup._cmi_estimator.estimate_surrogates_analytic(
+                               n_perm=n_perm,
                                var1=cond_source_realisations,
                                var2=analysis_setup._current_value_realisations,
-                               conditional=cond_target_realisations))
-    else:
-        surr_cond_real = _get_surrogates(data,
+                               conditional=cond_target_realisations)
+        else:
+            surr_cond_real = _get_surrogates(
+                                         data,
                                          analysis_setup.current_value,
                                          analysis_setup.selected_vars_sources,
-                                         n_permutations,
+                                         n_perm,
                                          analysis_setup.settings)
-
-        surr_distribution = analysis_setup._cmi_estimator.estimate_mult(
-                            n_chunks=n_permutations,
+            surr = analysis_setup._cmi_estimator.estimate_mult(
+                            n_chunks=n_perm,
                             re_use=['var2', 'conditional'],
                             var1=surr_cond_real,
                             var2=analysis_setup._current_value_realisations,
                             conditional=cond_target_realisations)
+        return np.reshape(surr, (1, n_perm))
+
+    surr_distribution = _get_adaptive_surrogates(
+        analysis_setup, create_surrogates, _find_table_max, te_orig,
+        n_permutations, alpha)[0]
+    _record_n_perm(analysis_setup, 'omnibus', surr_distribution.shape[0])
     [significance, pvalue] = _find_pvalue(te_orig, surr_distribution,
                                           alpha, 'one_bigger')
     if VERBOSE:
@@ -281,6 +291,27 @@ def max_statistic(analysis_setup, data, candidate_set, te_max_candidate):
             - permute_in_time : bool [optional] - generate surrogates by
               shuffling samples in time instead of shuffling whole replications
               (default=False)
+            - max_mem_surrogates : int [optional] - memory budget in bytes
+              for surrogates estimated in one call to a parallel estimator
+              (default=1e9)
+            - perm_adaptive : bool [optional] - create surrogates in batches
+              of increasing size and stop once the test decision is settled,
+              see _get_adaptive_surrogates() for further settings
+              (default=False)
+            - perm_warm_start : bool [optional] - draw permutations once per
+              analysis and re-use them in each call, such that surrogate
+              realisations are created once per candidate and only
+              re-estimated for the current conditioning set, see
+              _get_warm_start_surrogates() (default=False)
+            - perm_screening : bool [optional] - if the candidate's value is
+              below the median of the surrogate maxima of the previous call,
+              test against 'n_perm_screen' permutations first and stop if
+              enough surrogate maxima exceed the value for the test to be
+              non-significant with n_perm_max_stat permutations; ignored if
+              'perm_adaptive' is True or if the screening pass would use all
+              n_perm_max_stat permutations (default=False)
+            - n_perm_screen : int [optional] - number of permutations in the
+              screening pass (default=4 * alpha_max_stat * n_perm_max_stat)
 
         data : Data instance
             raw data
@@ -302,12 +333,55 @@ def max_statistic(analysis_setup, data, candidate_set, te_max_candidate):
     n_perm = analysis_setup.settings['n_perm_max_stat']
     analysis_setup.settings.setdefault('alpha_max_stat', 0.05)
     alpha = analysis_setup.settings['alpha_max_stat']
+    analysis_setup.settings.setdefault('perm_adaptive', False)
+    analysis_setup.settings.setdefault('perm_warm_start', False)
+    analysis_setup.settings.setdefault('perm_screening', False)
+    analysis_setup.settings.setdefault('n_perm_screen',
+                                       int(np.ceil(4 * alpha * n_perm)))
     _check_permute_in_time(analysis_setup, data, n_perm)
     assert(candidate_set), 'The candidate set is empty.'
 
-    surr_table = _create_surrogate_table(analysis_setup, data, candidate_set,
-                                         n_perm)
+    # With warm start, consecutive calls take consecutive blocks of the fixed
+    # permutations, starting with the first permutation.
+    n_created = [0]
+
+    def create_surrogates(n):
+        if not analysis_setup.settings['perm_warm_start']:
+            return _create_surrogate_table(analysis_setup, data,
+                                           candidate_set, n)
+        n_created[0] += n
+        return _create_surrogate_table(analysis_setup, data, candidate_set, n,
+                                       perm_start=n_created[0] - n)
+
+    # Screen candidates that are far below the surrogate maxima of the
+    # previous call. The test is non-significant if at least alpha * n_perm
+    # surrogate maxima exceed the candidate value, otherwise complete the
+    # test. Screening is skipped if it would use all n_perm permutations.
+    surr_table = None
+    n_screen = max(analysis_setup.settings['n_perm_screen'],
+                   int(1 / alpha) + 1)
+    if (analysis_setup.settings['perm_screening'] and
+            not analysis_setup.settings['perm_adaptive'] and
+            n_screen < n_perm and
+            analysis_setup._max_stats_surr_distribution is not None and
+            te_max_candidate <
+            np.median(analysis_setup._max_stats_surr_distribution)):
+        surr_table = create_surrogates(n_screen)
+        n_exceed = np.count_nonzero(
+            _find_table_max(surr_table) >= te_max_candidate)
+        if n_exceed < alpha * n_perm:
+            surr_table = np.hstack((surr_table,
+                                    create_surrogates(n_perm - n_screen)))
+        elif VERBOSE:
+            print('stopped max stats after screening with {0} '
+                  'permutations'.format(n_screen))
+
+    surr_table = _get_adaptive_surrogates(
+        analysis_setup, create_surrogates, _find_table_max, te_max_candidate,
+        n_perm, alpha, surr_table)
+    _record_n_perm(analysis_setup, 'max_stat', surr_table.shape[1])
     max_distribution = _find_table_max(surr_table)
+    analysis_setup._max_stats_surr_distribution = max_distribution
     [significance, pvalue] = _find_pvalue(statistic=te_max_candidate,
                                           distribution=max_distribution,
                                           alpha=alpha,
@@ -342,6 +416,13 @@ def max_statistic_sequential(analysis_setup, data):
             - permute_in_time : bool [optional] - generate surrogates by
               shuffling samples in time instead of shuffling whole replications
               (default=False)
+            - max_mem_surrogates : int [optional] - memory budget in bytes
+              for surrogates estimated in one call to a parallel estimator
+              (default=1e9)
+            - perm_adaptive : bool [optional] - create surrogates in batches
+              of increasing size and stop once the test decision is settled,
+              see _get_adaptive_surrogates() for further settings
+              (default=False)
 
         data : Data instance
             raw data
@@ -392,9 +473,14 @@ def max_statistic_sequential(analysis_setup, data):
         i_1 = i_2
         i_2 += data.n_realisations(analysis_setup.current_value)
 
+    sources = analysis_setup.selected_vars_sources
     individual_te = analysis_setup._cmi_estimator.estimate_mult(
                             n_chunks=len(analysis_setup.selected_vars_sources),
                             re_use=['var2'],
+                            cache_keys=analysis_setup._get_cache_keys(
+                                data, sources,
+                                [[v for v in analysis_setup.selected_vars_full
+                                  if v != c] for c in sources]),
                             var1=candidate_realisations,
                             var2=analysis_setup._current_value_realisations,
                             conditional=conditional_realisations)
@@ -402,33 +488,38 @@ def max_statistic_sequential(analysis_setup, data):
     selected_vars_order = utils.argsort_descending(individual_te)
     individual_te_sorted = utils.sort_descending(individual_te)
 
-    # Re-use or create surrogate table and sort it, this saves some time
+    # Re-use or create surrogate table and sort it, this saves some time. In
+    # adaptive mode, a smaller table is re-used as the first batch.
+    analysis_setup.settings.setdefault('perm_adaptive', False)
+    surr_table = None
     if (analysis_setup._min_stats_surr_table is not None and
-            n_permutations <= analysis_setup._min_stats_surr_table.shape[1]):
+            (analysis_setup.settings['perm_adaptive'] or n_permutations <=
+             analysis_setup._min_stats_surr_table.shape[1])):
         surr_table = analysis_setup._min_stats_surr_table[:, :n_permutations]
         assert len(analysis_setup.selected_vars_sources) == surr_table.shape[0]
-    else:
-        surr_table = _create_surrogate_table(
-                                        analysis_setup,
-                                        data,
-                                        analysis_setup.selected_vars_sources,
-                                        n_permutations)
+    surr_table = _get_adaptive_surrogates(
+        analysis_setup,
+        lambda n: _create_surrogate_table(
+            analysis_setup, data, analysis_setup.selected_vars_sources, n),
+        _sort_table_max, individual_te_sorted, n_permutations, alpha,
+        surr_table)
+    _record_n_perm(analysis_setup, 'max_seq', surr_table.shape[1])
     max_distribution = _sort_table_max(surr_table)
 
     # Compare each TE value with the distribution of the same rank, starting
     # with the highest TE.
-    significance = np.zeros(individual_te.shape[0]).astype(bool)
-    pvalue = np.ones(individual_te.shape[0])
-    for c in range(individual_te.shape[0]):
-        [s, p] = _find_pvalue(individual_te_sorted[c],
-                              max_distribution[c, ], alpha, tail='one_bigger')
-        significance[c] = s
-        pvalue[c] = p
-        if not s:  # break as soon as a candidate is no longer significant
-            if VERBOSE:
-                print('Stopping sequential max stats at candidate with rank '
-                      '{0}.'.format(c))
-            break
+    [significance, pvalue] = _find_pvalues(individual_te_sorted,
+                                           max_distribution, alpha,
+                                           tail='one_bigger')
+    # Stop as soon as a candidate is no longer significant, candidates with
+    # lower rank are considered non-significant as well.
+    if not significance.all():
+        c = np.argmin(significance)
+        significance[c:] = False
+        pvalue[c + 1:] = 1
+        if VERBOSE:
+            print('Stopping sequential max stats at candidate with rank '
+                  '{0}.'.format(c))
 
     # Get back original order and return results.
     significance = significance[selected_vars_order]
@@ -454,6 +545,13 @@ def min_statistic(analysis_setup, data, candidate_set, te_min_candidate):
             - permute_in_time : bool [optional] - generate surrogates by
               shuffling samples in time instead of shuffling whole replications
               (default=False)
+            - max_mem_surrogates : int [optional] - memory budget in bytes
+              for surrogates estimated in one call to a parallel estimator
+              (default=1e9)
+            - perm_adaptive : bool [optional] - create surrogates in batches
+              of increasing size and stop once the test decision is settled,
+              see _get_adaptive_surrogates() for further settings
+              (default=False)
 
         data : Data instance
             raw data
@@ -479,8 +577,12 @@ def min_statistic(analysis_setup, data, candidate_set, te_min_candidate):
 
     assert(candidate_set), 'The candidate set is empty.'
 
-    surr_table = _create_surrogate_table(analysis_setup, data, candidate_set,
-                                         n_perm)
+    surr_table = _get_adaptive_surrogates(
+        analysis_setup,
+        lambda n: _create_surrogate_table(analysis_setup, data, candidate_set,
+                                          n),
+        _find_table_min, te_min_candidate, n_perm, alpha)
+    _record_n_perm(analysis_setup, 'min_stat', surr_table.shape[1])
     min_distribution = _find_table_min(surr_table)
     [significance, pvalue] = _find_pvalue(statistic=te_min_candidate,
                                           distribution=min_distribution,
@@ -823,7 +925,124 @@ def check_n_perm(n_perm, alpha):
                            .format(n_perm, alpha))
 
 
-def _create_surrogate_table(analysis_setup, data, idx_test_set, n_perm):
+def _get_adaptive_surrogates(analysis_setup, create_surrogates,
+                             get_distribution, statistic, n_perm, alpha,
+                             surr_table=None):
+    """Create surrogates in batches until the test decision is settled.
+
+    If analysis_setup.settings['perm_adaptive'] is True, surrogates are
+    created in batches of increasing size, starting with
+    'perm_adaptive_init' permutations and doubling the number of
+    permutations in each round up to n_perm. After each batch, the number of
+    surrogate values exceeding each test statistic is counted and creation
+    stops as soon as the test decision at the critical alpha level is
+    settled:
+
+    - a statistic is not significant if the number of exceedances reaches
+      alpha * n_perm, i.e., the p-value over all n_perm permutations can no
+      longer drop below alpha (Besag & Clifford, 1991); this is the decision
+      the full test would take
+    - a statistic is significant if the upper bound of the Clopper-Pearson
+      confidence interval of its p-value drops below alpha, where the
+      interval's error level is 'perm_adaptive_error'
+
+    Statistics are tested sequentially, i.e., creation stops if all
+    statistics up to the first non-significant one are settled.
+
+    References:
+
+    - Besag, J., & Clifford, P. (1991). Sequential Monte Carlo p-values.
+      Biometrika, 78(2), 301-304.
+
+    Args:
+        analysis_setup : MultivariateTE instance
+            information on the current analysis, can have an optional
+            attribute 'settings', a dictionary with parameters for
+            statistical testing:
+
+            - perm_adaptive : bool [optional] - create surrogates in batches
+              and stop once the test decision is settled (default=False)
+            - perm_adaptive_init : int [optional] - number of permutations in
+              the first batch, at least 1/alpha (default=50)
+            - perm_adaptive_error : float [optional] - error level of the
+              confidence interval used to stop for significant statistics
+              (default=0.01)
+
+        create_surrogates : callable
+            function returning a table of n new surrogate values with
+            dimensions (no. variables, n) when called as
+            create_surrogates(n)
+        get_distribution : callable
+            function returning the test distribution(s) for a surrogate
+            table, either 1D or 2D with one row per statistic
+        statistic : numpy array
+            test statistic(s) in the order in which they are tested
+        n_perm : int
+            maximum number of permutations
+        alpha : float
+            critical alpha level for statistical significance
+        surr_table : numpy array [optional]
+            surrogate table created previously, used as first batch
+
+    Returns:
+        numpy array
+            surrogate table, dimensions: (no. variables, no. surrogates used)
+    """
+    settings = analysis_setup.settings
+    settings.setdefault('perm_adaptive', False)
+    settings.setdefault('perm_adaptive_init', 50)
+    settings.setdefault('perm_adaptive_error', 0.01)
+    if not settings['perm_adaptive']:
+        if surr_table is None:
+            return create_surrogates(n_perm)
+        return surr_table
+
+    n_min = min(n_perm, int(1 / alpha) + 1)
+    if surr_table is None:
+        surr_table = create_surrogates(
+                min(n_perm, max(settings['perm_adaptive_init'], n_min)))
+    statistic = np.atleast_1d(statistic)
+    while surr_table.shape[1] < n_perm:
+        n_used = surr_table.shape[1]
+        distribution = np.atleast_2d(get_distribution(surr_table))
+        n_exceed = np.sum(distribution >= statistic[:, np.newaxis], axis=1)
+        decision = _get_adaptive_decision(
+            n_exceed, n_used, n_perm, alpha, settings['perm_adaptive_error'])
+        not_sign = np.where(decision == 0)[0]
+        last = not_sign[0] if not_sign.size else decision.size
+        if n_used >= n_min and not (decision[:last] == -1).any():
+            break
+        surr_table = np.hstack((surr_table, create_surrogates(
+                                        min(n_used, n_perm - n_used))))
+    if VERBOSE and surr_table.shape[1] < n_perm:
+        print('adaptive permutation test stopped after {0} of {1} '
+              'permutations'.format(surr_table.shape[1], n_perm))
+    return surr_table
+
+
+def _get_adaptive_decision(n_exceed, n_used, n_perm, alpha, error):
+    """Return settled test decisions for running exceedance counts.
+
+    Returns an array with entries 1 (significant), 0 (not significant), or
+    -1 (not settled) for each count of surrogates exceeding a statistic.
+    """
+    decision = np.full(n_exceed.shape, -1)
+    upper = np.ones(n_exceed.shape)
+    valid = n_exceed < n_used
+    upper[valid] = beta.ppf(1 - error, n_exceed[valid] + 1,
+                            n_used - n_exceed[valid])
+    decision[upper < alpha] = 1
+    decision[n_exceed >= alpha * n_perm] = 0
+    return decision
+
+
+def _record_n_perm(analysis_setup, test, n_perm):
+    """Record the number of permutations used by a test."""
+    analysis_setup._n_perm_used.setdefault(test, []).append(n_perm)
+
+
+def _create_surrogate_table(analysis_setup, data, idx_test_set, n_perm,
+                            perm_start=None):
     """Create a table of surrogate MI/CMI/TE values.
 
     Calculate MI/CMI/TE between surrogates for each source in the test
@@ -840,6 +1059,10 @@ def _create_surrogate_table(analysis_setup, data, idx_test_set, n_perm):
             list of indices indicating samples to be used as sources
         n_perm : int
             number of permutations for testing
+        perm_start : int [optional]
+            if given, use the fixed permutations perm_start to perm_start +
+            n_perm of the analysis setup instead of drawing new permutations,
+            see _get_warm_start_surrogates()
 
     Returns:
         numpy array
@@ -855,61 +1078,128 @@ def _create_surrogate_table(analysis_setup, data, idx_test_set, n_perm):
                                                                     n_perm))
         print('\tcand.', end='')
     surr_table = np.zeros((len(idx_test_set), n_perm))
+    if n_perm == 0:
+        return surr_table
     current_value_realisations = analysis_setup._current_value_realisations
-    idx_c = 0
-    for candidate in idx_test_set:
-        if VERBOSE:
-            print('\t{0}'.format(analysis_setup._idx_to_lag([candidate])[0]),
-                  end='')
-        '''
-        surr_candidate_realisations = np.empty(
-                (data.n_realisations(analysis_setup.current_value) * n_perm,
-                1))
-        i_1 = 0
-        i_2 = data.n_realisations(analysis_setup.current_value)
-        for perm in range(n_perm):
-            # Check the permutation type for the current candidate.
-            if permute_over_replications:
-                sur_temp = data.permute_data(analysis_setup.current_value,
-                                             [candidate])[0]
-            else:
-                [real, repl_idx] = data.get_realisations(
-                                                analysis_setup.current_value,
-                                                [candidate])
-                sur_temp = _permute_realisations(real, repl_idx, perm_range)
-
-            surr_candidate_realisations[i_1:i_2, ] = sur_temp
-            i_1 = i_2
-            i_2 += data.n_realisations(analysis_setup.current_value)
-        '''
-        if (analysis_setup._cmi_estimator.is_analytic_null_estimator() and
-                permute_in_time):
+    conditional_realisations = analysis_setup._selected_vars_realisations
+    estimator = analysis_setup._cmi_estimator
+
+    if estimator.is_analytic_null_estimator() and permute_in_time:
+        for idx_c, candidate in enumerate(idx_test_set):
+            if VERBOSE:
+                print('\t{0}'.format(
+                    analysis_setup._idx_to_lag([candidate])[0]), end='')
             # Generate the surrogates analytically
-            surr_table[idx_c, :] = (analysis_setup._cmi_estimator.
-                                    estimate_surrogates_analytic(
-                                        n_perm=n_perm,
-                                        var1=data.get_realisations(
-                                                analysis_setup.current_value, [candidate])[0],
-                                        var2=current_value_realisations,
-                                        conditional=analysis_setup._selected_vars_realisations))
-        else:
-            surr_candidate_realisations = _get_surrogates(
-                                                 data,
-                                                 analysis_setup.current_value,
-                                                 [candidate],
-                                                 n_perm,
-                                                 analysis_setup.settings)
-            surr_table[idx_c, :] = analysis_setup._cmi_estimator.estimate_mult(
-                    n_chunks=n_perm,
-                    re_use=['var2', 'conditional'],
-                    var1=surr_candidate_realisations,  # too long
-                    var2=current_value_realisations,
-                    conditional=analysis_setup._selected_vars_realisations)
-        idx_c += 1
+            surr_table[idx_c, :] = estimator.estimate_surrogates_analytic(
+                n_perm=n_perm,
+                var1=data.get_realisations(analysis_setup.current_value,
+                                           [candidate])[0],
+                var2=current_value_realisations,
+                conditional=conditional_realisations)
+        return surr_table
+
+    # Estimate surrogates for multiple candidates in one call to parallel
+    # estimators, each candidate contributes n_perm chunks. Split candidates
+    # into batches such that surrogates and re-used variables, which are
+    # replicated for each chunk, fit into the memory budget.
+    n_batch = _get_surrogate_batch_size(analysis_setup, data, n_perm)
+    n_realisations = data.n_realisations(analysis_setup.current_value)
+    n_cand_real = n_realisations * n_perm
+    for i_1 in range(0, len(idx_test_set), n_batch):
+        batch = idx_test_set[i_1:i_1 + n_batch]
+        surr_realisations = np.empty((n_cand_real * len(batch), 1),
+                                     dtype=data.data_type)
+        for idx_c, candidate in enumerate(batch):
+            if VERBOSE:
+                print('\t{0}'.format(
+                    analysis_setup._idx_to_lag([candidate])[0]), end='')
+            if perm_start is None:
+                surr = _get_surrogates(data,
+                                       analysis_setup.current_value,
+                                       [candidate],
+                                       n_perm,
+                                       analysis_setup.settings)
+            else:
+                surr = _get_warm_start_surrogates(analysis_setup, data,
+                                                  candidate, perm_start,
+                                                  n_perm)
+            surr_realisations[idx_c * n_cand_real:
+                              (idx_c + 1) * n_cand_real] = surr
+        surr_table[i_1:i_1 + len(batch), :] = np.reshape(
+            estimator.estimate_mult(
+                n_chunks=n_perm * len(batch),
+                re_use=['var2', 'conditional'],
+                var1=surr_realisations,
+                var2=current_value_realisations,
+                conditional=conditional_realisations),
+            (len(batch), n_perm))
 
     return surr_table
 
 
+def _get_warm_start_surrogates(analysis_setup, data, candidate, perm_start,
+                               n_perm):
+    """Return surrogates for a candidate using fixed permutations.
+
+    The permutation indices are drawn once per analysis, for
+    analysis_setup.settings['n_perm_max_stat'] permutations, and are kept
+    in analysis_setup._max_stats_perm. Surrogate realisations are created
+    once per candidate by applying these permutations and are kept in
+    analysis_setup._max_stats_surr_realisations, as long as all kept
+    realisations fit into the memory budget 'max_mem_surrogates' (default=1e9
+    bytes). Realisations that do not fit are re-created from the fixed
+    permutations when needed.
+
+    Returns:
+        numpy array
+            surrogate data for permutations perm_start to perm_start + n_perm
+            with dimensions (realisations * n_perm) x 1
+    """
+    try:
+        surr = analysis_setup._max_stats_surr_realisations[candidate]
+    except KeyError:
+        settings = analysis_setup.settings
+        if analysis_setup._max_stats_perm is None:
+            [surr, analysis_setup._max_stats_perm] = _get_surrogates(
+                data, analysis_setup.current_value, [candidate],
+                settings['n_perm_max_stat'], settings, return_perm=True)
+        else:
+            surr = _get_surrogates(data, analysis_setup.current_value,
+                                   [candidate],
+                                   analysis_setup._max_stats_perm.shape[0],
+                                   settings,
+                                   perm=analysis_setup._max_stats_perm)
+        settings.setdefault('max_mem_surrogates', 1e9)
+        mem = sum(s.nbytes for s in
+                  analysis_setup._max_stats_surr_realisations.values())
+        if mem + surr.nbytes <= settings['max_mem_surrogates']:
+            analysis_setup._max_stats_surr_realisations[candidate] = surr
+    n_real = data.n_realisations(analysis_setup.current_value)
+    return surr[perm_start * n_real:(perm_start + n_perm) * n_real]
+
+
+def _get_surrogate_batch_size(analysis_setup, data, n_perm):
+    """Return the number of candidates whose surrogates are estimated at once.
+
+    Parallel estimators receive the surrogates of multiple candidates in one
+    call. The batch size is limited by the memory budget in
+    analysis_setup.settings['max_mem_surrogates'] (in bytes, default=1e9).
+    Each chunk holds the surrogate, the current value, and the conditional,
+    where the latter two are replicated for each chunk. Estimators that are
+    not parallel receive one candidate at a time.
+    """
+    if not analysis_setup._cmi_estimator.is_parallel():
+        return 1
+    analysis_setup.settings.setdefault('max_mem_surrogates', 1e9)
+    n_dims = 2
+    if analysis_setup._selected_vars_realisations is not None:
+        n_dims += analysis_setup._selected_vars_realisations.shape[1]
+    chunk_mem = (data.n_realisations(analysis_setup.current_value) * n_dims *
+                 np.dtype(data.data_type).itemsize)
+    return max(1, int(analysis_setup.settings['max_mem_surrogates'] //
+                      (chunk_mem * max(n_perm, 1))))
+
+
 def _find_table_max(table):
     """Find maximum for each column of a table."""
     return np.max(table, axis=0)
@@ -922,18 +1212,12 @@ def _find_table_min(table):
 
 def _sort_table_min(table):
     """Sort each column in a table in ascending order."""
-    for permutation in range(table.shape[1]):
-        table[:, permutation].sort()
-    return table
+    return np.sort(table, axis=0)
 
 
 def _sort_table_max(table):
     """Sort each column in a table in descending order."""
-    table_sorted = np.empty(table.shape)
-    for permutation in range(0, table.shape[1]):
-        table_sorted[:, permutation] = utils.sort_descending(
-                                            table[:, permutation])
-    return table_sorted
+    return np.sort(table, axis=0)[::-1]
 
 
 def _find_pvalue(statistic, distribution, alpha, tail):
@@ -956,27 +1240,62 @@ def _find_pvalue(statistic, distribution, alpha, tail):
         float
             the test's p-value
     """
-    assert alpha <= 1.0, 'Critical alpha levels needs to be smaller than 1.'
     assert distribution.ndim == 1, 'Test distribution must be 1D.'
-    check_n_perm(distribution.shape[0], alpha)
+    [significance, pvalue] = _find_pvalues(np.atleast_1d(statistic),
+                                           distribution[np.newaxis, :],
+                                           alpha, tail)
+    return bool(significance[0]), float(pvalue[0])
+
+
+def _find_pvalues(statistic, distribution, alpha, tail):
+    """Find p-values of multiple test statistics under their distributions.
 
+    Compare each test statistic against its own test distribution, all
+    comparisons are done in one broadcasted operation.
+
+    Args:
+        statistic : numpy array
+            1-dimensional array of values to be tested
+        distribution : numpy array
+            2-dimensional array of test distributions, where the i-th row is
+            the distribution for the i-th statistic, dimensions: (no.
+            statistics, no. permutations)
+        alpha : float
+            critical alpha level for statistical significance
+        tail : str
+            'one_bigger' for one-tailed testing H1 > H0, 'one_smaller' for one-
+            tailed testing H1 < H0, or 'two' for two-tailed testing
+
+    Returns:
+        numpy array, bool
+            statistical significance of each statistic
+        numpy array, float
+            the test's p-value for each statistic
+    """
+    assert alpha <= 1.0, 'Critical alpha levels needs to be smaller than 1.'
+    assert distribution.ndim == 2, 'Test distributions must be 2D.'
+    assert statistic.shape[0] == distribution.shape[0], (
+        'No. statistics and test distributions must match.')
+    n_perm = distribution.shape[1]
+    check_n_perm(n_perm, alpha)
+
+    statistic = statistic[:, np.newaxis]
     if tail == 'one_bigger':
-        pvalue = sum(distribution >= statistic) / distribution.shape[0]
+        pvalue = np.count_nonzero(distribution >= statistic, axis=1) / n_perm
     elif tail == 'one_smaller':
-        pvalue = sum(distribution <= statistic) / distribution.shape[0]
+        pvalue = np.count_nonzero(distribution <= statistic, axis=1) / n_perm
     elif tail == 'two':
-        p_bigger = sum(distribution >= statistic) / distribution.shape[0]
-        p_smaller = sum(distribution <= statistic) / distribution.shape[0]
-        pvalue = min(p_bigger, p_smaller)
+        p_bigger = np.count_nonzero(distribution >= statistic, axis=1)
+        p_smaller = np.count_nonzero(distribution <= statistic, axis=1)
+        pvalue = np.minimum(p_bigger, p_smaller) / n_perm
         alpha = alpha / 2
     else:
         raise ValueError(('Unkown value for ''tail'', can be ''one_bigger'', '
                           ' ''one_smaller'', or ''two''): {0}.'.format(tail)))
 
-    # If the statistic is larger than all values in the test distribution, set
+    # If a statistic is larger than all values in the test distribution, set
     # the p-value to the smallest possible value 1/n_perm.
-    if pvalue == 0:
-        pvalue = 1.0 / distribution.shape[0]
+    pvalue[pvalue == 0] = 1.0 / n_perm
     significance = pvalue < alpha
 
     return significance, pvalue
@@ -994,7 +1313,8 @@ def _sufficient_replications(data, n_perm):
         return False
 
 
-def _get_surrogates(data, current_value, idx_list, n_perm, perm_settings):
+def _get_surrogates(data, current_value, idx_list, n_perm, perm_settings,
+                    perm=None, return_perm=False):
     """Return surrogate data for statistical testing.
 
     Calls surrogate generation methods of the data instance. The method for
@@ -1021,43 +1341,38 @@ def _get_surrogates(data, current_value, idx_list, n_perm, perm_settings):
             'permute_in_time' to True to create surrogates by shuffling data
             over time. See Data.permute_samples() for settings for surrogate
             creation.
+        perm : numpy array [optional]
+            permutation indices returned by a previous call, these are applied
+            instead of drawing new permutations
+        return_perm : bool [optional]
+            return the permutation indices (default=False)
 
     Returns:
         numpy array
             surrogate data with dimensions
             (realisations * n_perm) x len(idx_list)
+        numpy array
+            permutation indices with dimensions n_perm x replications or n_perm
+            x samples, only returned if return_perm is True
     """
-    # Allocate memory for surrogates
-    n_realisations = data.n_realisations(current_value)
-    surrogates = np.empty((n_realisations * n_perm,
-                           len(idx_list))).astype(data.data_type)
-
     # Check if the user requested to permute samples in time and not over
     # replications
     permute_in_time = perm_settings['permute_in_time']
 
     # Generate surrogates by permuting over replications if possible (no.
     # replications needs to be sufficient); else permute samples over time.
-    i_1 = 0
-    i_2 = n_realisations
-    # permute samples
+    # All permutations are generated in one call to the data instance.
     if permute_in_time:
-        for perm in range(n_perm):
-            surrogates[i_1:i_2, ] = data.permute_samples(current_value,
-                                                         idx_list,
-                                                         perm_settings)[0]
-            i_1 = i_2
-            i_2 += n_realisations
-
+        [surr, perm] = data.permute_samples_mult(current_value, idx_list,
+                                                 perm_settings, n_perm, perm)
     else:  # permute replications
         assert _sufficient_replications(data, n_perm), (
                 'Not enough replications for surrogate creation.')
-        for perm in range(n_perm):
-            surrogates[i_1:i_2, ] = data.permute_replications(current_value,
-                                                              idx_list)[0]
-            i_1 = i_2
-            i_2 += n_realisations
-    return surrogates
+        [surr, perm] = data.permute_replications_mult(current_value, idx_list,
+                                                      n_perm, perm)
+    if return_perm:
+        return surr, perm
+    return surr
 
 
 def _generate_spectral_surrogates(data, scale, n_perm, perm_settings):
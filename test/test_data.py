@@ -4,9 +4,10 @@ Created on Mon Apr  4 16:36:41 2016
 
 @author: patricia
 """
+import pickle
 import pytest
 import numpy as np
-from idtxl.data import Data
+from idtxl.data import Data, LazyData
 import idtxl.idtxl_utils as utils
 
 
@@ -62,6 +63,100 @@ def test_set_data():
                                     'of replications wrong.')
 
 
+def test_data_fingerprint():
+    """Test data fingerprint used to identify cached estimates."""
+    dat = np.arange(30).reshape(3, 10)
+    d_1 = Data(dat, 'ps', normalise=False)
+    d_2 = Data(dat.copy(), 'ps', normalise=False)
+    assert d_1.fingerprint == d_2.fingerprint, (
+        'Identical data have different fingerprints.')
+    d_2.set_data(dat + 1, 'ps')
+    assert d_1.fingerprint != d_2.fingerprint, (
+        'Fingerprint was not updated for new data.')
+    d_3 = Data(dat.astype(float), 'ps', normalise=False)
+    assert d_1.fingerprint != d_3.fingerprint
+
+
+def test_share_data(tmpdir):
+    """Test sharing data in shared memory and memory-mapped files."""
+    dat = np.random.randn(3, 100, 2)
+    d = Data(dat, 'psr', normalise=True)
+    expected = d.data.copy()
+    fingerprint = d.fingerprint
+    with pytest.raises(AttributeError):
+        Data().share_data()
+
+    for file_name in [None, str(tmpdir.join('data.mmap'))]:
+        d.share_data(file_name)
+        assert np.array_equal(d.data, expected)
+        assert d.fingerprint == fingerprint
+        d_copy = pickle.loads(pickle.dumps(d))
+        assert '_data' not in d.__getstate__()
+        assert np.array_equal(d_copy.data, expected)
+        assert not d_copy.data.flags.writeable
+        assert d_copy.n_processes == 3
+        assert np.array_equal(d_copy.get_realisations((0, 5), [(1, 2)])[0],
+                              d.get_realisations((0, 5), [(1, 2)])[0])
+        d_copy = None
+        d.unshare_data()
+        assert d._shared is None
+        assert np.array_equal(d.data, expected)
+
+    # Setting new data frees shared memory.
+    d.share_data()
+    name = d._shared[1]
+    d.set_data(dat[:2], 'psr')
+    assert d._shared is None
+    with pytest.raises(FileNotFoundError):
+        utils.attach_shared_array(name, expected.shape, expected.dtype)
+
+
+def test_lazy_data(tmpdir):
+    """Test if LazyData returns the same realisations as Data."""
+    dat = np.random.normal(loc=2, scale=3, size=(200, 3, 4))
+    file_name = str(tmpdir.join('data.npy'))
+    np.save(file_name, dat)
+    d = Data(dat, 'spr', normalise=True)
+    d_lazy = LazyData(np.load(file_name, mmap_mode='r'), 'spr',
+                      normalise=True, block_size=100)
+    assert d_lazy.n_processes == 3
+    assert d_lazy.n_samples == 200
+    assert d_lazy.n_replications == 4
+    assert len(d_lazy._get_sample_blocks()) == 25
+    current_value = (1, 10)
+    idx_list = [(0, 3), (1, 9), (0, 7), (2, 0)]
+    assert np.allclose(d_lazy.get_realisations(current_value, idx_list)[0],
+                       d.get_realisations(current_value, idx_list)[0])
+    assert np.allclose(
+        d_lazy.get_realisations_stacked(current_value, idx_list),
+        d.get_realisations_stacked(current_value, idx_list))
+    assert np.allclose(d_lazy._get_data_slice(2, 5)[0],
+                       d._get_data_slice(2, 5)[0])
+    perm_settings = {'perm_type': 'circular', 'max_shift': 5}
+    np.random.seed(0)
+    perm = d.permute_samples_mult(current_value, idx_list, perm_settings, 3)
+    np.random.seed(0)
+    perm_lazy = d_lazy.permute_samples_mult(current_value, idx_list,
+                                            perm_settings, 3)
+    assert np.allclose(perm[0], perm_lazy[0])
+    with pytest.raises(RuntimeError):
+        d_lazy.get_embedding_view(current_value)
+
+    # Memmaps are pickled as file references.
+    d_copy = pickle.loads(pickle.dumps(d_lazy))
+    assert isinstance(d_copy.data, np.memmap)
+    assert d_copy.fingerprint == d_lazy.fingerprint
+    assert np.allclose(d_copy.get_realisations(current_value, idx_list)[0],
+                       d.get_realisations(current_value, idx_list)[0])
+
+    # Missing dimensions and no normalisation.
+    d = Data(dat[:, 0, 0], 's', normalise=False)
+    d_lazy = LazyData(np.load(file_name, mmap_mode='r')[:, 0, 0], 's',
+                      normalise=False)
+    assert np.array_equal(d_lazy.get_realisations((0, 5), [(0, 2)])[0],
+                          d.get_realisations((0, 5), [(0, 2)])[0])
+
+
 def test_data_normalisation():
     """Test if data are normalised correctly when stored in a Data instance."""
     a_1 = 100
@@ -111,6 +206,38 @@ def test_get_realisations():
     dat = d.get_realisations(current_value, [current_value])[0]
 
 
+def test_get_embedding_view():
+    """Test strided view on realisations and stacked retrieval."""
+    dat = Data(np.random.rand(3, 50, 4), 'psr', normalise=False)
+    current_value = (1, 5)
+    idx_list = [(0, 1), (2, 5), (1, 3), (0, 0)]
+    view = dat.get_embedding_view(current_value)
+    assert view.shape == (4, 45, 3, 6)
+    assert not view.flags.writeable, 'View is writeable.'
+    with pytest.raises(ValueError):
+        view[0, 0, 0, 0] = 1
+    real = dat.get_realisations(current_value, idx_list)[0]
+    stacked = dat.get_realisations_stacked(current_value, idx_list)
+    assert stacked.shape == (real.size, 1)
+    n_real = dat.n_realisations(current_value)
+    for i, idx in enumerate(idx_list):
+        # Reference: loop over replications.
+        ref = np.hstack([dat.data[idx[0], idx[1]:idx[1] + 45, r]
+                         for r in range(dat.n_replications)])
+        assert (real[:, i] == ref).all(), (
+            'Realisations for {0} are incorrect.'.format(idx))
+        assert (view[:, :, idx[0], idx[1]].ravel() == ref).all(), (
+            'View for {0} is incorrect.'.format(idx))
+        assert (stacked[i * n_real:(i + 1) * n_real, 0] == ref).all(), (
+            'Stacked realisations for {0} are incorrect.'.format(idx))
+    with pytest.raises(IndexError):
+        dat.get_realisations(current_value, [(3, 1)])
+    with pytest.raises(IndexError):
+        dat.get_realisations_stacked(current_value, [(0, -1)])
+    with pytest.raises(RuntimeError):
+        dat.get_realisations_stacked(current_value, [(0, 6)])
+
+
 def test_permute_replications():
     """Test surrogate creation by permuting replications."""
     n = 20
@@ -157,6 +284,88 @@ def test_permute_replications():
                         'The remainder did not contain the same realisations.')
 
 
+def test_permute_mult():
+    """Test creation of multiple surrogates at once."""
+    n = 20
+    n_perm = 50
+    n_repl = 10
+    dat = Data(np.tile(np.arange(n), (n_repl, 1)).T +
+               np.arange(n_repl) * 100, 'sr', normalise=False)
+    current_value = (0, 2)
+    idx_list = [(0, 0), (0, 2)]
+    n_real = n - current_value[1]
+
+    # Permute replications, each surrogate contains whole replications.
+    surr, perm = dat.permute_replications_mult(current_value, idx_list,
+                                               n_perm)
+    assert surr.shape == (n_perm * n_real * n_repl, len(idx_list))
+    assert perm.shape == (n_perm, n_repl)
+    surr = surr.reshape(n_perm, n_repl, n_real, len(idx_list))
+    for p in range(n_perm):
+        assert (np.sort(perm[p]) == np.arange(n_repl)).all()
+        assert (surr[p, :, :, 1] == np.arange(2, n) +
+                100 * perm[p][:, np.newaxis]).all(), (
+                    'Replications were not permuted correctly.')
+    assert (surr[:, :, :, 0] == surr[:, :, :, 1] - 2).all(), (
+        'Variables were not permuted jointly.')
+
+    # Permute samples for all permutation types.
+    settings = [{'perm_type': 'random'},
+                {'perm_type': 'circular', 'max_shift': 4},
+                {'perm_type': 'block', 'block_size': 3, 'perm_range': 2},
+                {'perm_type': 'block', 'block_size': 3, 'perm_range': 10},
+                {'perm_type': 'local', 'perm_range': 4}]
+    for s in settings:
+        surr, perm = dat.permute_samples_mult(current_value, idx_list, s,
+                                              n_perm)
+        assert surr.shape == (n_perm * n_real * n_repl, len(idx_list))
+        assert perm.shape == (n_perm, n_real)
+        surr = surr.reshape(n_perm, n_repl, n_real, len(idx_list))
+        for p in range(n_perm):
+            assert (np.sort(perm[p]) == np.arange(n_real)).all(), (
+                'Invalid permutation for perm_type {0}.'.format(s))
+            assert (surr[p, :, :, 1] == perm[p] + 2 +
+                    100 * np.arange(n_repl)[:, np.newaxis]).all(), (
+                        'Samples were not permuted correctly.')
+        if s['perm_type'] == 'circular':
+            shift = (np.arange(n_real) - perm) % n_real
+            assert (shift == shift[:, :1]).all()
+            assert ((shift[:, 0] >= 1) & (shift[:, 0] <= 4)).all()
+        elif s['perm_type'] == 'block':
+            blocks = perm // 3
+            n_blocks = int(np.ceil(n_real / 3))
+            for p in range(n_perm):
+                order = blocks[p][np.append(0, np.where(
+                    np.diff(blocks[p]) != 0)[0] + 1)]
+                assert len(order) == n_blocks, 'Blocks were split.'
+                assert (order // s['perm_range'] ==
+                        np.arange(n_blocks) // s['perm_range']).all(), (
+                            'Blocks were swapped out of range.')
+        elif s['perm_type'] == 'local':
+            assert (perm // 4 == np.arange(n_real) // 4).all(), (
+                'Samples were swapped out of range.')
+
+    # Re-use permutations from a previous call for other variables.
+    surr, perm = dat.permute_replications_mult(current_value, [(0, 0)],
+                                               n_perm)
+    surr_reuse = dat.permute_replications_mult(current_value, [(0, 1)], None,
+                                               perm)[0]
+    assert (surr_reuse == surr + 1).all(), 'Permutations were not re-used.'
+    surr, perm = dat.permute_samples_mult(current_value, [(0, 0)],
+                                          settings[0], n_perm)
+    surr_reuse = dat.permute_samples_mult(current_value, [(0, 1)],
+                                          settings[0], None, perm)[0]
+    assert (surr_reuse == surr + 1).all(), 'Permutations were not re-used.'
+
+    with pytest.raises(ValueError):
+        dat.permute_samples_mult(current_value, idx_list, {'perm_type': 'foo'},
+                                 n_perm)
+    with pytest.raises(TypeError):
+        dat.permute_samples_mult(current_value, idx_list,
+                                 {'perm_type': 'local', 'perm_range': 'foo'},
+                                 n_perm)
+
+
 def test_permute_samples():
     """Test surrogate creation by permuting samples."""
     n = 20
@@ -10,7 +10,8 @@ Created on Fri Sep 30 14:39:06 2016
 """
 import inspect
 import pytest
-from idtxl.estimator import Estimator, find_estimator
+import numpy as np
+from idtxl.estimator import Estimator, EstimateCache, find_estimator
 from idtxl.multivariate_te import MultivariateTE
 
 
@@ -59,6 +60,90 @@ def test_find_estimator():
         find_estimator(MultivariateTE)
 
 
+class EstimatorTestCache(Estimator):
+    """Estimator returning the sum of var1 and recording estimated chunks."""
+
+    def __init__(self, settings=None, parallel=True):
+        self.settings = self._check_settings(settings)
+        self.parallel = parallel
+        self.n_estimated = 0
+
+    def is_parallel(self):
+        return self.parallel
+
+    def is_analytic_null_estimator(self):
+        return False
+
+    def estimate(self, var1, var2, n_chunks=1):
+        self.n_estimated += n_chunks
+        assert var2.shape[0] == var1.shape[0]
+        return np.sum(var1.reshape(n_chunks, -1), axis=1)
+
+
+def test_estimate_cache():
+    """Test caching of estimates in estimate_mult."""
+    var1 = np.arange(40).reshape(40, 1).astype(float)
+    var2 = np.ones((10, 1))
+    keys = [('a', 1), ('a', 2), ('b', 1), ('b', 2)]
+    expected = np.sum(var1.reshape(4, -1), axis=1)
+
+    for parallel in [True, False]:
+        # Without caching, all chunks are estimated on every call.
+        est = EstimatorTestCache({}, parallel)
+        for i in range(2):
+            res = est.estimate_mult(n_chunks=4, re_use=['var2'],
+                                    cache_keys=keys, var1=var1, var2=var2)
+        assert est.n_estimated == 8
+        assert est.cache_info() is None
+
+        est = EstimatorTestCache({'cache_estimates': True}, parallel)
+        res = est.estimate_mult(n_chunks=4, re_use=['var2'], cache_keys=keys,
+                                var1=var1, var2=var2)
+        assert np.array_equal(res, expected)
+        assert est.n_estimated == 4
+        res = est.estimate_mult(n_chunks=4, re_use=['var2'], cache_keys=keys,
+                                var1=var1, var2=var2)
+        assert np.array_equal(res, expected)
+        assert est.n_estimated == 4, 'Cached estimates were estimated again.'
+        # Partial hits: only missing chunks are estimated.
+        res = est.estimate_mult(n_chunks=4, re_use=['var2'],
+                                cache_keys=[keys[1], ('c', 1), keys[3],
+                                            ('c', 2)],
+                                var1=var1, var2=var2)
+        assert np.array_equal(res, expected[[1, 1, 3, 3]])
+        assert est.n_estimated == 6, 'Missing chunks were not estimated.'
+        info = est.cache_info()
+        assert info['hits'] == 6
+        assert info['misses'] == 6
+        assert info['size'] == 6
+        # Calls without keys bypass the cache.
+        est.estimate_mult(n_chunks=4, re_use=['var2'], var1=var1, var2=var2)
+        assert est.n_estimated == 10
+        assert est.cache_info()['hits'] == 6
+
+    # Local values are not cached.
+    est = EstimatorTestCache({'cache_estimates': True, 'local_values': True})
+    assert est.cache_info() is None
+
+    with pytest.raises(AssertionError):
+        est = EstimatorTestCache({'cache_estimates': True})
+        est.estimate_mult(n_chunks=4, re_use=['var2'], cache_keys=keys[:2],
+                          var1=var1, var2=var2)
+
+
+def test_estimate_cache_eviction():
+    """Test LRU eviction of cached estimates."""
+    cache = EstimateCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None, 'Least recently used entry was kept.'
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.info() == {'hits': 3, 'misses': 1, 'size': 2, 'max_size': 2}
+
+
 if __name__ == '__main__':
     test_find_estimator()
     test_base_class_implementation()
@@ -10,15 +10,20 @@ Created on Thu Jun 1 2017
 @author: patricia
 """
 import math
+import warnings
 import pytest
 import random as rn
 import numpy as np
+from scipy.stats import chi2
 from idtxl.estimators_jidt import (JidtKraskovCMI, JidtKraskovMI,
                                    JidtKraskovAIS, JidtKraskovTE,
                                    JidtDiscreteCMI, JidtDiscreteMI,
                                    JidtDiscreteAIS, JidtDiscreteTE,
                                    JidtGaussianCMI, JidtGaussianMI,
-                                   JidtGaussianAIS, JidtGaussianTE)
+                                   JidtGaussianAIS, JidtGaussianTE,
+                                   _get_permutation_invariant_hash,
+                                   _to_java_array, get_jvm_stats,
+                                   _get_chi_square_parameters)
 
 package_missing = False
 try:
@@ -553,6 +558,172 @@ def test_discrete_ais():
     _assert_result(mi_g, 0, 'JidtGaussianAIS', 'MI (no memory)')
 
 
+def test_permutation_invariant_hash():
+    a = np.random.randn(100, 2)
+    h = _get_permutation_invariant_hash(a)
+    assert h == _get_permutation_invariant_hash(a[np.random.permutation(100)])
+    assert h != _get_permutation_invariant_hash(a[:, ::-1])
+    a[0, 0] += 1e-12
+    assert h != _get_permutation_invariant_hash(a)
+
+
+@jpype_missing
+def test_discretisation_cache():
+    """Test reuse of bin edges for permuted data in discrete estimators."""
+    settings = {'discretise_method': 'max_ent', 'num_discrete_bins': 4}
+    est = JidtDiscreteMI(settings)
+    var1 = np.random.randn(1000)
+    var2 = var1 + np.random.randn(1000)
+    mi = est.estimate(var1, var2)
+    assert len(est._bin_edges) == 2
+    perm = np.random.permutation(1000)
+    mi_perm = est.estimate(var1[perm], var2)
+    assert len(est._bin_edges) == 2
+    assert mi_perm < mi
+    assert np.isclose(mi, JidtDiscreteMI(settings).estimate(var1, var2))
+
+
+@jpype_missing
+def test_discrete_alphabet_relabelling():
+    """Test relabelling of alphabets larger than the number of samples."""
+    est = JidtDiscreteCMI({'discretise_method': 'none', 'alph1': 2,
+                           'alph2': 2, 'alphc': 2})
+    n = 100
+    var = np.random.randint(0, 2, size=(n, 3))
+    combined, alph = est._combine_discrete_dimensions(var, 2)
+    assert alph == 8, 'Alphabet smaller than no. samples was relabelled.'
+    var = np.random.randint(0, 2, size=(n, 20))
+    combined, alph = est._combine_discrete_dimensions(var, 2)
+    assert alph <= n, 'Alphabet larger than no. samples was not relabelled.'
+    assert combined.max() < alph
+    combined, alph = est._combine_discrete_dimensions(
+        np.zeros((n, 20), dtype=int), 2)
+    assert alph == 2
+    # Estimation with a relabelled conditional.
+    var1 = np.random.randint(0, 2, size=(n, 1))
+    var2 = np.random.randint(0, 2, size=(n, 1))
+    assert np.isfinite(est.estimate(var1, var2, var))
+
+
+@jpype_missing
+def test_analytic_surrogates():
+    """Test vectorised sampling from chi-square null distributions."""
+    expected_mi, source1, source2, target = _get_gauss_data(n=1000)
+    source = np.random.randint(0, 2, size=1000)
+    target_discrete = np.random.randint(0, 2, size=1000)
+    for est, data in [
+            (JidtGaussianCMI(), {'var1': source1, 'var2': target,
+                                 'conditional': source2}),
+            (JidtGaussianMI(), {'var1': source1, 'var2': target}),
+            (JidtDiscreteMI({'num_discrete_bins': 2}),
+             {'var1': source, 'var2': target_discrete}),
+            (JidtDiscreteTE({'num_discrete_bins': 2, 'history_target': 2}),
+             {'source': source, 'target': target_discrete})]:
+        dist = est.get_analytic_distribution(**data)
+        np.random.seed(0)
+        expected = [dist.computeEstimateForGivenPValue(np.random.random())
+                    for i in range(50)]
+        np.random.seed(0)
+        surrogates = est.estimate_surrogates_analytic(n_perm=50, **data)
+        assert np.allclose(surrogates, expected)
+        # Parameters are re-used for data of the same shape.
+        assert len(est._chi_square_parameters) == 1
+        est.estimate_surrogates_analytic(n_perm=50, **data)
+        assert len(est._chi_square_parameters) == 1
+
+
+@jpype_missing
+def test_chi_square_parameters():
+    """Test reading chi-square parameters from the bundled JIDT jar."""
+    source = np.random.randint(0, 2, size=1000)
+    target = np.random.randint(0, 2, size=1000)
+    est = JidtDiscreteMI({'num_discrete_bins': 2})
+    dist = est.get_analytic_distribution(var1=source, var2=target)
+    # The bundled jar's ChiSquareMeasurementDistribution has the private
+    # fields read via reflection, no fallback should be necessary.
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        parameters = _get_chi_square_parameters(dist)
+    assert parameters == (1000, 1), (
+        'Unexpected chi-square parameters: {0}.'.format(parameters))
+    for p in [0.01, 0.5, 0.99]:
+        assert np.isclose(dist.computeEstimateForGivenPValue(p),
+                          chi2.ppf(1 - p, parameters[1]) /
+                          (2.0 * parameters[0]))
+
+    # Parameters are not re-used if alphabets were relabelled, i.e., if the
+    # degrees of freedom depend on the values in the data.
+    est = JidtDiscreteCMI({'num_discrete_bins': 2, 'alph1': 2, 'alph2': 2,
+                           'alphc': 2})
+    n = 100
+    var1 = np.random.randint(0, 2, size=n)
+    var2 = np.random.randint(0, 2, size=n)
+    cond = np.random.randint(0, 2, size=(n, 3))
+    est.estimate_surrogates_analytic(n_perm=10, var1=var1, var2=var2,
+                                     conditional=cond)
+    assert len(est._chi_square_parameters) == 1
+    cond = np.random.randint(0, 2, size=(n, 10))
+    est.estimate_surrogates_analytic(n_perm=10, var1=var1, var2=var2,
+                                     conditional=cond)
+    assert len(est._chi_square_parameters) == 1
+
+
+@jpype_missing
+def test_java_array_transfer():
+    """Test bulk transfer of arrays and resident arrays for re-used data."""
+    JidtKraskovCMI()  # start JVM
+    var = np.random.randn(100, 3)
+    java_var = _to_java_array(var)
+    assert np.array_equal(np.array([list(row) for row in java_var]), var)
+    java_var = _to_java_array(np.arange(10), 'int')
+    assert list(java_var) == list(range(10))
+
+    n = 500
+    n_chunks = 4
+    var1 = np.random.randn(n * n_chunks, 1)
+    var2 = np.random.randn(n, 1)
+    conditional = np.random.randn(n, 2)
+    for est in [JidtGaussianCMI(), JidtKraskovCMI({'noise_level': 0})]:
+        res = est.estimate_mult(n_chunks=n_chunks,
+                                re_use=['var2', 'conditional'],
+                                var1=var1, var2=var2, conditional=conditional)
+        assert est._resident_arrays is None
+        for c in range(n_chunks):
+            assert np.isclose(res[c], est.estimate(
+                var1[c * n:(c + 1) * n], var2, conditional))
+
+
+@jpype_missing
+def test_calculator_pool():
+    """Test re-use of JIDT calculators and JVM session statistics."""
+    settings = {'kraskov_k': 4, 'noise_level': 0}
+    est1 = JidtKraskovCMI(settings.copy())
+    stats = get_jvm_stats()
+    assert stats['jvm_started']
+    est2 = JidtKraskovCMI(settings.copy())
+    assert est1.calc is est2.calc
+    assert get_jvm_stats()['calculators_reused'] > stats['calculators_reused']
+    est3 = JidtKraskovCMI({'kraskov_k': 3, 'noise_level': 0})
+    assert est3.calc is not est1.calc
+
+    # Shared calculators return the same estimates as new calculators.
+    expected_mi, source1, source2, target = _get_gauss_data(n=1000)
+    cmi1 = est1.estimate(source1, target, source2)
+    est3.estimate(source2, target, source1)
+    assert est2.estimate(source1, target, source2) == cmi1
+    mi = est1.estimate(source1, target)
+    assert est1.est_mi is not None
+    assert est1.estimate(source1, target) == mi
+
+    est = JidtDiscreteMI({'num_discrete_bins': 2})
+    n_created = get_jvm_stats()['calculators_created']
+    var = np.random.randint(0, 2, size=1000)
+    mi = est.estimate(var, var)
+    assert est.estimate(var, var) == mi
+    assert get_jvm_stats()['calculators_created'] <= n_created + 1
+    assert get_jvm_stats()['n_transfers'] > 0
+
+
 def test_invalid_settings_input():
     """Test handling of wrong inputs for settings dictionary."""
 
@@ -0,0 +1,57 @@
+"""Test multiprocessing Kraskov estimators.
+
+This module provides unit tests for the multiprocessing Kraskov estimators.
+Estimators are tested against the Python Kraskov estimators.
+"""
+import pickle
+import pytest
+import numpy as np
+from idtxl.estimators_multiprocessing import (MultiprocessingKraskovCMI,
+                                              MultiprocessingKraskovMI)
+from idtxl.estimators_python import PythonKraskovCMI, PythonKraskovMI
+
+
+def test_compare_python_estimators():
+    """Test if results equal estimates of the Python estimators."""
+    n = 300
+    n_chunks = 8
+    var1, var2, conditional = np.random.randn(3, n * n_chunks, 2)
+    settings = {'noise_level': 0, 'theiler_t': 1, 'n_workers': 2}
+    est = MultiprocessingKraskovCMI(settings=settings.copy())
+    est_python = PythonKraskovCMI(settings=settings.copy())
+    # Force multiple runs per worker.
+    est.settings['max_mem'] = 2 * 2 * n * (4 * 8 * 7 + 16 * 7)
+    assert len(est._get_runs(n * n_chunks, 6, n_chunks)) == 4
+    res = est.estimate(var1, var2, conditional, n_chunks=n_chunks)
+    assert np.allclose(res, est_python.estimate(var1, var2, conditional,
+                                                n_chunks=n_chunks))
+    res = est.estimate_mult(n_chunks=n_chunks, re_use=['conditional'],
+                            var1=var1, var2=var2, conditional=conditional[:n])
+    assert np.allclose(res, est_python.estimate_mult(
+        n_chunks=n_chunks, re_use=['conditional'], var1=var1, var2=var2,
+        conditional=conditional[:n]))
+    est.close()
+
+    settings['lag'] = 2
+    settings['local_values'] = True
+    est = MultiprocessingKraskovMI(settings=settings.copy())
+    res = est.estimate(var1, var2, n_chunks=n_chunks)
+    assert res.shape == ((n - 2) * n_chunks,)
+    assert np.allclose(res, PythonKraskovMI(settings=settings.copy()).estimate(
+        var1, var2, n_chunks=n_chunks))
+    est.close()
+
+
+def test_pickle_and_memory_limit():
+    est = MultiprocessingKraskovCMI(settings={'n_workers': 2, 'max_mem': 1e3})
+    with pytest.raises(RuntimeError):
+        est.estimate(np.random.randn(1000), np.random.randn(1000),
+                     n_chunks=2)
+    est.settings['max_mem'] = 1e9
+    est.estimate(np.random.randn(1000), np.random.randn(1000), n_chunks=2)
+    assert est._pool is not None
+    est_copy = pickle.loads(pickle.dumps(est))
+    assert est_copy._pool is None
+    assert est_copy.settings == est.settings
+    est.close()
+    assert est._pool is None
@@ -0,0 +1,411 @@
+"""Test Python Kraskov, discrete, and Gaussian estimators.
+
+This module provides unit tests for the NumPy/SciPy Kraskov, plug-in, and
+Gaussian estimators. Estimators are tested against analytic results,
+brute-force implementations of the KSG and plug-in estimators, and the JIDT
+estimators.
+"""
+import pytest
+import numpy as np
+from scipy.special import digamma
+from idtxl.estimators_python import (PythonKraskovCMI, PythonKraskovMI,
+                                     PythonKraskovTE, PythonKraskovAIS,
+                                     PythonDiscreteCMI, PythonDiscreteMI,
+                                     PythonDiscreteTE, PythonDiscreteAIS,
+                                     PythonGaussianCMI, PythonGaussianMI,
+                                     PythonGaussianTE, PythonGaussianAIS)
+from idtxl.estimators_jidt import (JidtKraskovCMI, JidtKraskovMI,
+                                   JidtKraskovTE, JidtKraskovAIS,
+                                   JidtDiscreteCMI, JidtDiscreteMI,
+                                   JidtDiscreteTE, JidtDiscreteAIS,
+                                   JidtGaussianCMI, JidtGaussianMI,
+                                   JidtGaussianTE, JidtGaussianAIS)
+from test_estimators_jidt import (jpype_missing, _get_gauss_data,
+                                  _get_ar_data, _assert_result,
+                                  _compare_result)
+
+
+def _brute_force_cmi(var1, var2, conditional, k, theiler_t):
+    """Return local KSG (algorithm 1) CMI estimated by brute force."""
+    def max_dist(var):
+        return np.max(np.abs(var[:, np.newaxis, :] - var[np.newaxis, :, :]),
+                      axis=2)
+    n = var1.shape[0]
+    excluded = np.abs(np.arange(n)[:, np.newaxis] -
+                      np.arange(n)[np.newaxis, :]) <= theiler_t
+    dist_joint = max_dist(np.hstack((var1, var2, conditional)))
+    dist_joint[excluded] = np.inf
+    eps = np.sort(dist_joint, axis=1)[:, k - 1][:, np.newaxis]
+
+    def count(var):
+        dist = max_dist(var)
+        dist[excluded] = np.inf
+        return np.sum(dist < eps, axis=1)
+    return (digamma(k) - digamma(count(np.hstack((var1, conditional))) + 1) -
+            digamma(count(np.hstack((var2, conditional))) + 1) +
+            digamma(count(conditional) + 1))
+
+
+def _entropy(*variables):
+    """Return plug-in entropy in bits of the joint distribution."""
+    joint = np.hstack([v.reshape(v.shape[0], -1) for v in variables])
+    p = np.unique(joint, axis=0, return_counts=True)[1] / joint.shape[0]
+    return -np.sum(p * np.log2(p))
+
+
+def _plugin_cmi(var1, var2, conditional):
+    """Return plug-in CMI in bits calculated from joint entropies."""
+    return (_entropy(var1, conditional) + _entropy(var2, conditional) -
+            _entropy(var1, var2, conditional) - _entropy(conditional))
+
+
+def test_user_input():
+    est_cmi = PythonKraskovCMI()
+    N = 1000
+    with pytest.raises(AssertionError):
+        est_cmi.estimate(var1=np.random.randn(N, 1),
+                         var2=np.random.randn(N + 1, 1))
+    with pytest.raises(AssertionError):
+        est_cmi.estimate(var1=np.random.randn(N, 1),
+                         var2=np.random.randn(N, 1), n_chunks=3)
+    with pytest.raises(RuntimeError):
+        est_cmi.estimate(var1=np.random.randn(4, 1),
+                         var2=np.random.randn(4, 1))
+    with pytest.raises(RuntimeError):
+        PythonKraskovTE(settings={})
+    with pytest.raises(RuntimeError):
+        PythonKraskovAIS(settings={})
+    with pytest.raises(TypeError):
+        PythonKraskovAIS(settings=None)
+
+    # Settings given as strings for JIDT estimators are accepted.
+    est = PythonKraskovCMI(settings={'normalise': 'false',
+                                     'noise_level': '1e-8'})
+    assert est.settings['normalise'] is False
+    assert est.settings['noise_level'] == 1e-8
+    est = PythonKraskovCMI(settings={'normalise': 'True'})
+    assert est.settings['normalise'] is True
+    est.estimate(var1=np.random.randn(N, 1), var2=np.random.randn(N, 1))
+    with pytest.raises(TypeError):
+        PythonKraskovCMI(settings={'normalise': 'no'})
+    with pytest.raises(ValueError):
+        PythonKraskovCMI(settings={'noise_level': 'none'})
+
+
+def test_mi_cmi_gauss_data():
+    """Test MI and CMI estimates against analytic results."""
+    expected_mi, source1, source2, target = _get_gauss_data(n=5000)
+    mi_estimator = PythonKraskovMI()
+    _assert_result(mi_estimator.estimate(source1, target), expected_mi,
+                   'PythonKraskovMI', 'MI')
+    _assert_result(mi_estimator.estimate(source2, target), 0,
+                   'PythonKraskovMI', 'MI (uncorr.)')
+    cmi_estimator = PythonKraskovCMI()
+    _assert_result(cmi_estimator.estimate(source1, target, source2),
+                   expected_mi, 'PythonKraskovCMI', 'CMI')
+    _assert_result(cmi_estimator.estimate(source2, target, source1), 0,
+                   'PythonKraskovCMI', 'CMI (uncorr.)')
+
+
+@pytest.mark.parametrize('theiler_t', [0, 3])
+def test_cmi_brute_force(theiler_t):
+    """Test KD-tree searches against a brute-force implementation."""
+    var1, var2, conditional = np.random.randn(3, 300, 1)
+    expected = _brute_force_cmi(var1, var2, conditional, 4, theiler_t)
+    est = PythonKraskovCMI(settings={'noise_level': 0,
+                                     'theiler_t': theiler_t,
+                                     'local_values': True})
+    assert np.allclose(est.estimate(var1, var2, conditional), expected)
+
+
+def test_chunks():
+    """Test if estimating chunks in parallel equals individual estimation."""
+    n = 500
+    n_chunks = 4
+    var1, var2, conditional = np.random.randn(3, n * n_chunks, 2)
+    est = PythonKraskovCMI(settings={'noise_level': 0, 'theiler_t': 1})
+    res_parallel = est.estimate(var1, var2, conditional, n_chunks=n_chunks)
+    assert res_parallel.shape == (n_chunks,)
+    for c in range(n_chunks):
+        chunk = slice(c * n, (c + 1) * n)
+        assert np.isclose(res_parallel[c], est.estimate(
+            var1[chunk], var2[chunk], conditional[chunk]))
+    res_mult = est.estimate_mult(n_chunks=n_chunks, re_use=['conditional'],
+                                 var1=var1, var2=var2,
+                                 conditional=conditional[:n])
+    assert np.allclose(res_mult, est.estimate(
+        var1, var2, np.tile(conditional[:n], (n_chunks, 1)),
+        n_chunks=n_chunks))
+    assert est.estimate_mult(n_chunks=1, var1=var1[:n], var2=var2[:n],
+                             conditional=None).shape == (1,)
+
+    process = np.random.randn(n * n_chunks)
+    est = PythonKraskovAIS(settings={'noise_level': 0, 'history': 2})
+    res_parallel = est.estimate(process, n_chunks=n_chunks)
+    for c in range(n_chunks):
+        assert np.isclose(res_parallel[c],
+                          est.estimate(process[c * n:(c + 1) * n]))
+
+
+def test_te_ais():
+    """Test TE and AIS on processes with known dependencies."""
+    source = _get_ar_data(n=3000)[0]
+    process_no_memory = np.random.randn(source.shape[0])
+    target = np.hstack((0, source[:-1])) + np.random.normal(
+        scale=0.5, size=source.shape[0])
+    est_te = PythonKraskovTE(settings={'history_target': 1})
+    assert est_te.estimate(source, target) > 0.5
+    assert np.isclose(est_te.estimate(process_no_memory, target), 0,
+                      atol=0.05)
+    est_ais = PythonKraskovAIS(settings={'history': 2})
+    assert est_ais.estimate(source) > 0.5
+    assert np.isclose(est_ais.estimate(process_no_memory), 0, atol=0.05)
+    est_ais.settings['local_values'] = True
+    assert est_ais.estimate(source).shape == (source.shape[0] - 2,)
+
+
+@jpype_missing
+def test_compare_jidt():
+    """Test Python estimators against JIDT estimators."""
+    settings = {'noise_level': 0, 'kraskov_k': 4, 'theiler_t': 2}
+    expected_mi, source1, source2, target = _get_gauss_data(n=2000)
+    _compare_result(
+        PythonKraskovMI(settings.copy()).estimate(source1, target),
+        JidtKraskovMI(settings.copy()).estimate(source1, target),
+        'PythonKraskovMI', 'JidtKraskovMI', 'MI', tol=1e-6)
+    _compare_result(
+        PythonKraskovCMI(settings.copy()).estimate(source1, target, source2),
+        JidtKraskovCMI(settings.copy()).estimate(source1, target, source2),
+        'PythonKraskovCMI', 'JidtKraskovCMI', 'CMI', tol=1e-6)
+
+    source = _get_ar_data(n=2000)[0]
+    target = np.hstack((0, source[:-1])) + np.random.randn(source.shape[0])
+    settings_te = dict(settings, history_target=2, history_source=2,
+                       tau_source=2, source_target_delay=2)
+    _compare_result(
+        PythonKraskovTE(settings_te.copy()).estimate(source, target),
+        JidtKraskovTE(settings_te.copy()).estimate(source, target),
+        'PythonKraskovTE', 'JidtKraskovTE', 'TE', tol=1e-6)
+    settings_ais = dict(settings, history=3, tau=2)
+    _compare_result(
+        PythonKraskovAIS(settings_ais.copy()).estimate(source),
+        JidtKraskovAIS(settings_ais.copy()).estimate(source),
+        'PythonKraskovAIS', 'JidtKraskovAIS', 'AIS', tol=1e-6)
+
+
+def test_discrete_plugin():
+    """Test discrete estimators against plug-in entropies."""
+    n = 1000
+    var1 = np.random.randint(0, 3, size=(n, 2))
+    var2 = (var1[:, :1] + np.random.randint(0, 2, size=(n, 1))) % 3
+    conditional = np.random.randint(0, 3, size=(n, 1))
+    est = PythonDiscreteCMI(settings={'num_discrete_bins': 3})
+    assert np.isclose(est.estimate(var1, var2, conditional),
+                      _plugin_cmi(var1, var2, conditional))
+    assert np.isclose(est.estimate(var1, var2), _plugin_cmi(
+        var1, var2, np.zeros(n, dtype=int)))
+    est = PythonDiscreteMI(settings={'num_discrete_bins': 3, 'lag': 2})
+    assert np.isclose(est.estimate(var1, var2), _plugin_cmi(
+        var1[:-2], var2[2:], np.zeros(n - 2, dtype=int)))
+    est.settings['local_values'] = True
+    assert est.estimate(var1, var2).shape == (n - 2,)
+
+    # TE and AIS with embedding.
+    source = np.random.randint(0, 2, size=n)
+    target = np.hstack((0, source[:-1])) ^ (np.random.rand(n) < 0.1)
+    est = PythonDiscreteTE(settings={'history_target': 2, 'history_source': 2,
+                                     'tau_source': 2})
+    t = np.arange(2, n - 1)
+    expected = _plugin_cmi(
+        np.vstack((source[t], source[t - 2])).T, target[t + 1],
+        np.vstack((target[t], target[t - 1])).T)
+    assert np.isclose(est.estimate(source, target), expected)
+    assert est.estimate(source, target) > 0.4
+    est = PythonDiscreteAIS(settings={'history': 3})
+    t = np.arange(2, n - 1)
+    expected = _plugin_cmi(
+        np.vstack((target[t], target[t - 1], target[t - 2])).T,
+        target[t + 1], np.zeros(t.shape[0], dtype=int))
+    assert np.isclose(est.estimate(target), expected)
+
+    # Discretisation and user input.
+    est = PythonDiscreteCMI(settings={'discretise_method': 'max_ent',
+                                      'num_discrete_bins': 4})
+    var = np.random.randn(n, 1)
+    assert np.isclose(est.estimate(var, var), 2)
+    with pytest.raises(AssertionError):
+        PythonDiscreteCMI().estimate(var, var)
+    with pytest.raises(AssertionError):
+        PythonDiscreteCMI().estimate(var1, var1)
+    with pytest.raises(ValueError):
+        PythonDiscreteCMI(settings={'discretise_method': 'foo'}).estimate(
+            var1, var2)
+
+
+def test_discrete_chunks():
+    """Test if estimating chunks in parallel equals individual estimation."""
+    n = 300
+    n_chunks = 5
+    var1, var2, conditional = np.random.randn(3, n * n_chunks, 2)
+    for method in ['equal', 'max_ent']:
+        est = PythonDiscreteCMI(settings={'discretise_method': method,
+                                          'num_discrete_bins': 3})
+        assert est.is_parallel()
+        assert not est.is_analytic_null_estimator()
+        res_parallel = est.estimate(var1, var2, conditional,
+                                    n_chunks=n_chunks)
+        assert res_parallel.shape == (n_chunks,)
+        for c in range(n_chunks):
+            chunk = slice(c * n, (c + 1) * n)
+            assert np.isclose(res_parallel[c], est.estimate(
+                var1[chunk], var2[chunk], conditional[chunk]))
+
+    source, target = np.random.randint(0, 4, size=(2, n * n_chunks))
+    est = PythonDiscreteTE(settings={'history_target': 3,
+                                     'num_discrete_bins': 4})
+    res_parallel = est.estimate(source, target, n_chunks=n_chunks)
+    for c in range(n_chunks):
+        chunk = slice(c * n, (c + 1) * n)
+        assert np.isclose(res_parallel[c],
+                          est.estimate(source[chunk], target[chunk]))
+
+    # Alphabets that do not fit into a 64-bit integer are relabelled.
+    var = np.random.randint(0, 2, size=(n * n_chunks, 40))
+    est = PythonDiscreteCMI()
+    res_parallel = est.estimate(var, var, var, n_chunks=n_chunks)
+    assert np.allclose(res_parallel, 0)
+    res_parallel = est.estimate(var, var, n_chunks=n_chunks)
+    for c in range(n_chunks):
+        chunk = var[c * n:(c + 1) * n]
+        assert np.isclose(res_parallel[c], _entropy(chunk))
+
+
+@jpype_missing
+def test_compare_jidt_discrete():
+    """Test Python plug-in estimators against JIDT estimators."""
+    n = 2000
+    source = np.random.randint(0, 3, size=n)
+    target = (np.hstack((0, source[:-1])) +
+              np.random.randint(0, 2, size=n)) % 3
+    conditional = np.random.randint(0, 3, size=n)
+    settings = {'num_discrete_bins': 3}
+    _compare_result(
+        PythonDiscreteMI(settings.copy()).estimate(source, target),
+        JidtDiscreteMI(settings.copy()).estimate(source, target),
+        'PythonDiscreteMI', 'JidtDiscreteMI', 'MI', tol=1e-6)
+    _compare_result(
+        PythonDiscreteCMI(settings.copy()).estimate(source, target,
+                                                    conditional),
+        JidtDiscreteCMI(settings.copy()).estimate(source, target,
+                                                  conditional),
+        'PythonDiscreteCMI', 'JidtDiscreteCMI', 'CMI', tol=1e-6)
+    settings_te = dict(settings, history_target=2, history_source=1)
+    _compare_result(
+        PythonDiscreteTE(settings_te.copy()).estimate(source, target),
+        JidtDiscreteTE(settings_te.copy()).estimate(source, target),
+        'PythonDiscreteTE', 'JidtDiscreteTE', 'TE', tol=1e-6)
+    settings_ais = dict(settings, history=2)
+    _compare_result(
+        PythonDiscreteAIS(settings_ais.copy()).estimate(target),
+        JidtDiscreteAIS(settings_ais.copy()).estimate(target),
+        'PythonDiscreteAIS', 'JidtDiscreteAIS', 'AIS', tol=1e-6)
+
+
+def test_gaussian():
+    """Test Gaussian estimators against analytic results."""
+    expected_mi, source1, source2, target = _get_gauss_data(n=10000)
+    est_mi = PythonGaussianMI()
+    _assert_result(est_mi.estimate(source1, target), expected_mi,
+                   'PythonGaussianMI', 'MI')
+    est_cmi = PythonGaussianCMI()
+    _assert_result(est_cmi.estimate(source1, target, source2), expected_mi,
+                   'PythonGaussianCMI', 'CMI')
+    _assert_result(est_cmi.estimate(source2, target, source1), 0,
+                   'PythonGaussianCMI', 'CMI (uncorr.)')
+    est_cmi.settings['local_values'] = True
+    local = est_cmi.estimate(source1, target, source2)
+    assert local.shape == (source1.shape[0],)
+    est_cmi.settings['local_values'] = False
+    assert np.isclose(np.mean(local),
+                      est_cmi.estimate(source1, target, source2))
+
+    source = _get_ar_data(n=3000)[0]
+    process_no_memory = np.random.randn(source.shape[0])
+    target = np.hstack((0, source[:-1])) + np.random.normal(
+        scale=0.5, size=source.shape[0])
+    est_te = PythonGaussianTE(settings={'history_target': 1})
+    assert est_te.estimate(source, target) > 0.5
+    assert np.isclose(est_te.estimate(process_no_memory, target), 0,
+                      atol=0.01)
+    est_ais = PythonGaussianAIS(settings={'history': 2})
+    assert est_ais.estimate(source) > 0.5
+    assert np.isclose(est_ais.estimate(process_no_memory), 0, atol=0.01)
+
+
+def test_gaussian_chunks():
+    """Test chunked and shared estimation against individual estimation."""
+    n = 400
+    n_chunks = 6
+    var1 = np.random.randn(n * n_chunks, 2)
+    var2 = np.random.randn(n, 1)
+    conditional = np.random.randn(n, 3)
+    var2[:, 0] += var1[:n, 0]
+    est = PythonGaussianCMI()
+    res_individual = np.array([
+        est.estimate(var1[c * n:(c + 1) * n], var2, conditional)
+        for c in range(n_chunks)])
+    res_parallel = est.estimate(var1, np.tile(var2, (n_chunks, 1)),
+                                np.tile(conditional, (n_chunks, 1)),
+                                n_chunks=n_chunks)
+    assert np.allclose(res_parallel, res_individual)
+    res_shared = est.estimate_mult(n_chunks=n_chunks,
+                                   re_use=['var2', 'conditional'],
+                                   var1=var1, var2=var2,
+                                   conditional=conditional)
+    assert np.allclose(res_shared, res_individual)
+    res_shared = est.estimate_mult(n_chunks=n_chunks,
+                                   re_use=['var2', 'conditional'],
+                                   var1=var1, var2=var2, conditional=None)
+    assert np.allclose(res_shared, [est.estimate(var1[c * n:(c + 1) * n],
+                                                 var2)
+                                    for c in range(n_chunks)])
+    assert est.estimate_mult(n_chunks=1, re_use=['var2', 'conditional'],
+                             var1=var1[:n], var2=var2,
+                             conditional=conditional).shape == (1,)
+
+    # Local values are not estimated from shared covariances.
+    est.settings['local_values'] = True
+    res_local = est.estimate_mult(n_chunks=n_chunks,
+                                  re_use=['var2', 'conditional'],
+                                  var1=var1, var2=var2,
+                                  conditional=conditional)
+    assert np.allclose(res_local.reshape(n_chunks, -1).mean(axis=1),
+                       res_individual)
+
+
+@jpype_missing
+def test_compare_jidt_gaussian():
+    """Test Python Gaussian estimators against JIDT estimators."""
+    expected_mi, source1, source2, target = _get_gauss_data(n=2000)
+    _compare_result(
+        PythonGaussianMI().estimate(source1, target),
+        JidtGaussianMI().estimate(source1, target),
+        'PythonGaussianMI', 'JidtGaussianMI', 'MI', tol=1e-6)
+    _compare_result(
+        PythonGaussianCMI().estimate(source1, target, source2),
+        JidtGaussianCMI().estimate(source1, target, source2),
+        'PythonGaussianCMI', 'JidtGaussianCMI', 'CMI', tol=1e-6)
+
+    source = _get_ar_data(n=2000)[0]
+    target = np.hstack((0, source[:-1])) + np.random.randn(source.shape[0])
+    settings_te = {'history_target': 2, 'history_source': 2,
+                   'tau_source': 2, 'source_target_delay': 2}
+    _compare_result(
+        PythonGaussianTE(settings_te.copy()).estimate(source, target),
+        JidtGaussianTE(settings_te.copy()).estimate(source, target),
+        'PythonGaussianTE', 'JidtGaussianTE', 'TE', tol=1e-6)
+    settings_ais = {'history': 3, 'tau': 2}
+    _compare_result(
+        PythonGaussianAIS(settings_ais.copy()).estimate(source),
+        JidtGaussianAIS(settings_ais.copy()).estimate(source),
+        'PythonGaussianAIS', 'JidtGaussianAIS', 'AIS', tol=1e-6)
@@ -28,6 +28,30 @@ def test_combine_discrete_dimensions():
         np.array([[1, 0, 1], [0, 1, 0]]), 3)
     assert combined[0] == 10
     assert combined[1] == 3
+    combined, alphabet_size = utils.combine_discrete_dimensions(
+        np.array([[1, 0, 1], [0, 1, 0]]), 3, return_alphabet_size=True)
+    assert alphabet_size == 27
+
+    # Test relabelling of alphabets that overflow.
+    a = np.random.randint(4, size=(500, 40))
+    a[250:] = a[:250]
+    combined, alphabet_size = utils.combine_discrete_dimensions(
+        a, 4, return_alphabet_size=True)
+    assert combined.shape == (500,)
+    assert alphabet_size == np.unique(a, axis=0).shape[0]
+    assert np.array_equal(np.unique(combined), np.arange(alphabet_size))
+    assert np.array_equal(combined[250:], combined[:250])
+    # Relabelling preserves the order of combined values.
+    exact = [sum(int(v) * 4 ** (39 - c) for c, v in enumerate(row))
+             for row in a]
+    assert np.array_equal(np.argsort(combined, kind='stable'),
+                          np.argsort(exact, kind='stable'))
+    # Relabel if the alphabet exceeds the requested maximum.
+    a = np.array([[1, 0, 1], [0, 1, 0], [1, 0, 1]])
+    combined, alphabet_size = utils.combine_discrete_dimensions(
+        a, 3, max_alphabet_size=26, return_alphabet_size=True)
+    assert np.array_equal(combined, [1, 0, 1])
+    assert alphabet_size == 2
 
 
 def test_discretise():
@@ -84,6 +108,32 @@ def test_discretise_max_ent():
         discretised == np.array([[1, 0], [1, 0], [0, 0], [0, 1]]))
 
 
+def test_discretise_bin_edges():
+    """Test reuse of bin edges for permuted data."""
+    a = np.random.randn(1000, 3)
+    a[:, 1] = np.round(a[:, 1])  # introduce ties
+    perm = np.random.permutation(a.shape[0])
+    for discretise in [utils.discretise, utils.discretise_max_ent]:
+        discretised, bin_edges = discretise(a, 5, return_edges=True)
+        assert np.array_equal(discretise(a, 5), discretised)
+        assert np.array_equal(discretise(a[perm], 5, bin_edges=bin_edges),
+                              discretised[perm])
+        assert np.array_equal(discretise(a[perm, 0], 5,
+                                         bin_edges=bin_edges[:, 0]),
+                              discretised[perm, 0])
+        assert discretised.min() == 0
+        assert discretised.max() == 4
+    # Constant data go into the lowest bin, values outside the edges into the
+    # lowest or largest bin.
+    assert np.array_equal(utils.discretise(np.ones(4), 3), np.zeros(4))
+    bin_edges = utils.discretise(np.arange(10.), 2, return_edges=True)[1]
+    assert np.array_equal(utils.discretise(np.array([-1, 20]), 2,
+                                           bin_edges=bin_edges), [0, 1])
+    # Fewer samples than bins put all samples into the lowest bin.
+    assert np.array_equal(utils.discretise_max_ent(np.array([3., 1, 2]), 5),
+                          np.zeros(3))
+
+
 def check_all_bools_true(bool_array):
     for ind in range(bool_array.shape[0]):
         if not(bool_array[ind]):
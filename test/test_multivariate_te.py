@@ -257,6 +257,38 @@ def test_define_candidates():
     assert (1, 3) in candidates, 'Sample missing from candidates: (1, 3).'
 
 
+@jpype_missing
+def test_analyse_network_parallel():
+    """Test parallel network analysis against serial analysis."""
+    dat = Data()
+    dat.generate_mute_data(10, 5)
+    settings = {
+        'cmi_estimator': 'JidtKraskovCMI',
+        'noise_level': 0,
+        'n_perm_max_stat': 21,
+        'n_perm_min_stat': 21,
+        'n_perm_max_seq': 21,
+        'n_perm_omnibus': 21,
+        'max_lag_sources': 5,
+        'min_lag_sources': 4,
+        'max_lag_target': 5,
+        'seed': 1,
+        'n_workers': 2}
+    nw_0 = MultivariateTE()
+    r_serial = nw_0.analyse_network(settings, dat, targets=[0, 1, 2])
+    for executor in ['pool', 'disk_queue']:
+        settings['executor'] = executor
+        r = nw_0.analyse_network(settings, dat, targets=[0, 1, 2])
+        for t in [0, 1, 2]:
+            assert (r[t]['selected_vars_full'] ==
+                    r_serial[t]['selected_vars_full']), (
+                'Executor {0} returned different results for target {1}.'
+                .format(executor, t))
+            assert np.all(r[t]['selected_sources_pval'] ==
+                          r_serial[t]['selected_sources_pval'])
+        assert 'fdr_corrected' in r, 'FDR correction was not applied.'
+
+
 @jpype_missing
 def test_analyse_network():
     """Test method for full network analysis."""
@@ -34,6 +34,70 @@ def test_separate_realisations():
     assert remain is None, 'Remainder should be None.'
 
 
+def test_selected_vars_buffer():
+    """Test appending and removing realisations of selected variables."""
+    n = NetworkAnalysis()
+    n.target = 0
+    n_real = 10
+    variables = [(0, 1), (0, 2), (1, 1), (1, 2), (2, 1), (0, 3), (2, 4)]
+    realisations = {v: np.random.rand(n_real, 1) for v in variables}
+
+    def check():
+        full = np.hstack([realisations[v] for v in n.selected_vars_full])
+        assert np.array_equal(n._selected_vars_realisations, full)
+        for idx_list, real in [
+                (n.selected_vars_target, n._selected_vars_target_realisations),
+                (n.selected_vars_sources,
+                 n._selected_vars_sources_realisations)]:
+            assert real.shape == (n_real, len(idx_list))
+            for i, v in enumerate(idx_list):
+                assert np.array_equal(real[:, i:i + 1], realisations[v])
+
+    n._append_selected_vars(variables[:2], np.hstack(
+                                    [realisations[v] for v in variables[:2]]))
+    check()
+    for v in variables[2:]:
+        n._append_selected_vars([v], realisations[v])
+        check()
+    # Sources were selected after the first target variables and are returned
+    # as a view of the buffer.
+    n._remove_selected_var((0, 3))
+    check()
+    assert np.shares_memory(n._selected_vars_sources_realisations,
+                            n._selected_vars_realisations)
+    for v in [(1, 2), (0, 1), (2, 4)]:
+        n._remove_selected_var(v)
+        check()
+    [remain, single] = n._separate_realisations(n.selected_vars_full, (1, 1))
+    assert np.array_equal(single, realisations[(1, 1)])
+    assert np.array_equal(remain, np.hstack((realisations[(0, 2)],
+                                             realisations[(2, 1)])))
+
+
+def test_separate_realisations_all():
+    """Test separating realisations for all candidates at once."""
+    n = NetworkAnalysis()
+    n.target = 0
+    n_real = 10
+    variables = [(0, 1), (1, 1), (0, 2), (2, 1), (1, 3)]
+    n._append_selected_vars(variables, np.random.rand(n_real, len(variables)))
+    n._remove_selected_var((0, 2))
+    for idx_full in [n.selected_vars_full, n.selected_vars_sources]:
+        [remain, single] = n._separate_realisations_all(idx_full, idx_full)
+        assert single.shape == (len(idx_full) * n_real, 1)
+        assert remain.shape == (len(idx_full) * n_real, len(idx_full) - 1)
+        for i, idx in enumerate(idx_full):
+            [remain_i, single_i] = n._separate_realisations(idx_full, idx)
+            assert np.array_equal(single[i * n_real:(i + 1) * n_real],
+                                  single_i)
+            assert np.array_equal(remain[i * n_real:(i + 1) * n_real],
+                                  remain_i)
+    [remain, single] = n._separate_realisations_all([(2, 1)], [(2, 1)])
+    assert remain is None, 'Remainder should be None.'
+    assert np.array_equal(single, n._separate_realisations([(2, 1)],
+                                                           (2, 1))[1])
+
+
 def test_idx_to_lag():
     n = NetworkAnalysis()
     n.current_value = (0, 5)
@@ -65,3 +129,4 @@ if __name__ == '__main__':
     test_idx_to_lag()
     test_lag_to_idx()
     test_separate_realisations()
+    test_separate_realisations_all()
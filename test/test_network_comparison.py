@@ -7,12 +7,17 @@ within subjects.
 """
 import os
 import pickle
+import tempfile
+import pathlib
+import copy as cp
 import random as rn
 import pytest
 import numpy as np
 # from idtxl.multivariate_te import MultivariateTE
 from idtxl.network_comparison import NetworkComparison
 from idtxl.data import Data
+from idtxl import idtxl_io as io
+from idtxl import stats
 from test_estimators_jidt import jpype_missing
 
 # # Generate example data: the following was ran once to generate example data,
@@ -431,8 +436,7 @@ def test_p_value_union():
     comp._calculate_cmi_diff_within(dat, dat)
     comp._create_surrogate_distribution_within(dat, dat)
     target = 1
-    for p in range(comp_settings['n_perm_comp']):
-        comp.cmi_surr[p][target] = np.array([0, 1])
+    comp.cmi_surr[:, comp._get_union_links()[target]] = np.array([0, 1])
     comp.cmi_diff[target] = np.array([0.5, 0.5])
     [p, s] = comp._p_value_union()
     assert (s[target] == np.array([True, False])).all(), (
@@ -446,7 +450,218 @@ def test_p_value_union():
                                 .format(p[target]))
 
 
+def test_create_surrogates_batched():
+    """Test batched CMI estimation and surrogate creation for all targets."""
+    dat = Data()
+    dat.generate_mute_data(100, 5)
+    with open(os.path.join(os.path.dirname(__file__),
+                           'data/mute_res_0.pkl'), 'rb') as f:
+        res_0 = pickle.load(f)
+    with open(os.path.join(os.path.dirname(__file__),
+                           'data/mute_res_1.pkl'), 'rb') as f:
+        res_1 = pickle.load(f)
+    comp_settings = {
+        'cmi_estimator': 'PythonKraskovCMI',
+        'noise_level': 0,
+        'n_perm_comp': 6,
+        'alpha_comp': 0.2,
+        'stats_type': 'independent',
+        'verbose': False,
+        'seed': 1
+        }
+    comp = NetworkComparison()
+    comp._initialise(comp_settings)
+    comp._create_union(res_0, res_1)
+
+    # CMI from batched estimation should equal estimation for each source.
+    cmi = comp._calculate_cmi_all_links(dat)
+    for t in comp.union['targets']:
+        current_val = (t, comp.union['max_lag'])
+        idx_cond_full = (comp.union[t]['selected_vars_target'] +
+                         comp.union[t]['selected_vars_sources'])
+        cur_val_real = dat.get_realisations(current_val, [current_val])[0]
+        cond_full_real = dat.get_realisations(current_val, idx_cond_full)[0]
+        n_target_vars = len(comp.union[t]['selected_vars_target'])
+        cmi_expected = []
+        for c in range(n_target_vars, len(idx_cond_full)):
+            cond_real = np.delete(cond_full_real, c, axis=1)
+            cmi_expected.append(comp._cmi_estimator.estimate(
+                cur_val_real, cond_full_real[:, [c]],
+                cond_real if cond_real.shape[1] > 0 else None))
+        assert np.allclose(cmi[t], cmi_expected), (
+            'Batched CMI estimation differs from estimation per source.')
+
+    # Surrogates should not depend on the batch size.
+    comp._create_surrogate_distribution_within(dat, dat)
+    cmi_surr = comp.cmi_surr
+    n_links = sum(len(comp.union[t]['selected_vars_sources'])
+                  for t in comp.union['targets'])
+    assert cmi_surr.shape == (comp_settings['n_perm_comp'], n_links)
+    comp_settings['max_mem_surrogates'] = 1
+    comp._create_surrogate_distribution_within(dat, dat)
+    assert np.allclose(cmi_surr, comp.cmi_surr), (
+        'Surrogates depend on the batch size.')
+    cmi_surr_dict = comp._cmi_surr_to_dict()
+    for p in range(comp_settings['n_perm_comp']):
+        for t in comp.union['targets']:
+            assert cmi_surr_dict[p][t].shape == (
+                len(comp.union[t]['selected_vars_sources']),)
+
+
+def test_compare_between_from_files(tmp_path):
+    """Test between-subject comparison with data loaded from disk."""
+    res = []
+    for i in range(4):
+        with open(os.path.join(os.path.dirname(__file__),
+                               'data/mute_res_{0}.pkl'.format(i)), 'rb') as f:
+            res.append(pickle.load(f))
+    data_set = []
+    file_paths = []
+    for i in range(6):
+        dat = Data()
+        dat.generate_mute_data(100, 5)
+        data_set.append(dat)
+        io.save(dat, str(tmp_path / 'subject_{0}'.format(i)))
+        file_paths.append(str(tmp_path / 'subject_{0}.npz'.format(i)))
+    comp_settings = {
+        'cmi_estimator': 'PythonKraskovCMI',
+        'n_perm_comp': 20,
+        'alpha_comp': 0.2,
+        'stats_type': 'independent',
+        'verbose': False,
+        'seed': 1
+        }
+    network_set_a = np.array(res[:3])
+    network_set_b = np.array([res[3]] * 3)
+    comp = NetworkComparison()
+    res_data = comp.compare_between(
+        cp.deepcopy(comp_settings), network_set_a, network_set_b,
+        np.array(data_set[:3]), np.array(data_set[3:]))
+    res_files = comp.compare_between(
+        cp.deepcopy(comp_settings), network_set_a, network_set_b,
+        file_paths[:3], file_paths[3:])
+    comp_settings_pool = cp.deepcopy(comp_settings)
+    comp_settings_pool['executor'] = 'pool'
+    comp_settings_pool['n_workers'] = 2
+    res_pool = comp.compare_between(
+        comp_settings_pool, network_set_a, network_set_b,
+        file_paths[:3], file_paths[3:])
+    for res in [res_files, res_pool]:
+        for t in res_data['union_network']['targets']:
+            assert np.allclose(res_data['cmi_diff_abs'][t],
+                               res['cmi_diff_abs'][t])
+            assert (res_data['a>b'][t] == res['a>b'][t]).all()
+            if t in res_data['pval']:
+                assert (res_data['pval'][t] == res['pval'][t]).all(), (
+                    'p-values depend on the executor or data source.')
+    assert len(res_data['cmi_surr']) == comp_settings['n_perm_comp']
+
+    # Data loaded from disk are checked for equal no. realisations.
+    dat = Data()
+    dat.generate_mute_data(50, 5)
+    io.save(dat, str(tmp_path / 'subject_short'))
+    with pytest.raises(RuntimeError):
+        comp.compare_between(
+            cp.deepcopy(comp_settings), network_set_a, network_set_b,
+            file_paths[:3], file_paths[3:5] + [
+                str(tmp_path / 'subject_short.npz')])
+
+
+def test_permuted_subjects():
+    """Test vectorised permutation of subjects between conditions."""
+    comp = NetworkComparison()
+    comp.union = {
+        'targets': [0, 1, 2],
+        0: {'selected_vars_sources': [(1, 1), (2, 1)]},
+        1: {'selected_vars_sources': []},
+        2: {'selected_vars_sources': [(0, 2)]}}
+    comp.cmi_a = np.random.rand(5, 3)
+    comp.cmi_b = np.random.rand(5, 3)
+    n_perm = 100
+
+    comp.settings = {'stats_type': 'dependent'}
+    partition_a = comp._get_permuted_subjects(n_perm)
+    assert partition_a.shape == (n_perm, 10)
+    assert (partition_a[:, :5] != partition_a[:, 5:]).all(), (
+        'Dependent permutation did not swap subject pairs.')
+
+    comp.settings = {'stats_type': 'independent'}
+    partition_a = comp._get_permuted_subjects(n_perm)
+    assert (partition_a.sum(axis=1) == 5).all(), (
+        'Independent permutation did not preserve group sizes.')
+
+    comp.cmi_b = np.random.rand(7, 3)
+    cmi_all = np.vstack((comp.cmi_a, comp.cmi_b))
+    np.random.seed(0)
+    cmi_surr = comp._calculate_diff_of_mean_permuted(n_perm)
+    np.random.seed(0)
+    partition_a = comp._get_permuted_subjects(n_perm)
+    assert (partition_a.sum(axis=1) == 5).all()
+    for p in range(n_perm):
+        assert np.allclose(
+            cmi_surr[p],
+            (cmi_all[partition_a[p]].mean(axis=0) -
+             cmi_all[np.invert(partition_a[p])].mean(axis=0)))
+
+    # Test p-values of all links against testing each link individually.
+    comp.settings['alpha_comp'] = 0.05
+    comp.settings['tail_comp'] = 'two'
+    comp.cmi_surr = cmi_surr
+    links = comp._get_union_links()
+    comp.cmi_diff = comp._calculate_diff_of_mean()
+    [pvalue, sign] = comp._p_value_union()
+    assert 1 not in pvalue
+    for t in [0, 2]:
+        for s in range(pvalue[t].shape[0]):
+            [sig, p] = stats._find_pvalue(
+                statistic=comp.cmi_diff[t][s],
+                distribution=comp.cmi_surr[:, links[t]][:, s],
+                alpha=0.05, tail='two')
+            assert sign[t][s] == sig
+            assert pvalue[t][s] == p
+
+
+def test_get_permuted_replications_idx():
+    """Test drawing of all permutations of replications at once."""
+    comp = NetworkComparison()
+    n_repl = 5
+    n_perm = 50
+    comp.settings = {'stats_type': 'dependent'}
+    perm_repl = comp._get_permuted_replications_idx(n_repl, n_perm)
+    assert perm_repl.shape == (n_perm, 2 * n_repl)
+    assert ((perm_repl[:, :n_repl] % n_repl) == np.arange(n_repl)).all(), (
+        'Dependent permutation changed the rank of replications.')
+    assert (np.abs(perm_repl[:, :n_repl] - perm_repl[:, n_repl:]) ==
+            n_repl).all(), 'Dependent permutation did not swap replications.'
+    comp.settings = {'stats_type': 'independent'}
+    perm_repl = comp._get_permuted_replications_idx(n_repl, n_perm)
+    assert (np.sort(perm_repl, axis=1) == np.arange(2 * n_repl)).all(), (
+        'Independent permutation did not use all replications once.')
+
+    # Gathering surrogate data from the stacked realisations should return
+    # the original realisations of the swapped replications.
+    comp.union = {'max_lag': 1, 1: {'selected_vars_target': [(1, 1)],
+                                    'selected_vars_sources': [(0, 1)]}}
+    dat1 = Data(np.zeros((2, 10, n_repl)), 'psr', normalise=False)
+    dat2 = Data(np.ones((2, 10, n_repl)), 'psr', normalise=False)
+    comp.settings = {'stats_type': 'dependent'}
+    np.random.seed(0)
+    [cond_a, cur_val_a, cond_b, cur_val_b] = comp._get_permuted_replications(
+        dat1, dat2, target=1)
+    np.random.seed(0)
+    swap = comp._get_permuted_replications_idx(n_repl, 1)[0, :n_repl] >= n_repl
+    n_per_repl = dat1.n_realisations_samples((1, 1))
+    assert (cond_a == np.repeat(swap, n_per_repl)[:, np.newaxis]).all()
+    assert (cur_val_b == np.invert(np.repeat(swap, n_per_repl))[
+        :, np.newaxis]).all()
+    assert cond_b.shape == (n_repl * n_per_repl, 2)
+
+
 if __name__ == '__main__':
+    test_get_permuted_replications_idx()
+    test_permuted_subjects()
+    test_compare_between_from_files(pathlib.Path(tempfile.mkdtemp()))
+    test_create_surrogates_batched()
     test_network_comparison_use_cases()
     test_p_value_union()
     test_calculate_mean()
@@ -0,0 +1,122 @@
+"""Test executors for the parallel analysis of network nodes."""
+import os
+import glob
+import tempfile
+import pytest
+import numpy as np
+from idtxl import parallel
+from idtxl.data import Data
+
+
+class DummyAnalysis():
+    """Minimal single-node analysis returning random numbers."""
+
+    def analyse_single_target(self, settings, data, target, sources):
+        settings.setdefault('dummy_default', target)
+        return {'target': target,
+                'sources': sources,
+                'value': np.random.rand() + data.data[target, 0, 0],
+                'settings': settings,
+                'pid': os.getpid()}
+
+
+class FailingAnalysis():
+    """Single-node analysis raising an error."""
+
+    def analyse_single_target(self, settings, data, target, sources):
+        raise ValueError('Failing target {0}'.format(target))
+
+
+def _run(executor, tmpdir=None, seed=0, analysis=DummyAnalysis(),
+         n_workers=2):
+    dat = Data(np.arange(50).reshape(5, 10), 'ps', normalise=False)
+    settings = {'executor': executor, 'n_workers': n_workers, 'seed': seed,
+                'verbose': False}
+    if tmpdir is not None:
+        settings['queue_dir'] = str(tmpdir)
+    targets = [0, 2, 4]
+    return parallel.analyse_nodes(analysis, 'analyse_single_target',
+                                  settings, dat,
+                                  [(t, 'all') for t in targets])
+
+
+def test_serial_executor():
+    r = _run('serial')
+    assert [x['target'] for x in r] == [0, 2, 4], 'Results in wrong order.'
+    assert r[0]['settings']['dummy_default'] == 0
+    assert r[1]['settings']['dummy_default'] == 2, (
+        'Settings leaked between nodes.')
+    assert r[0]['value'] != r[1]['value'] - 20, 'Nodes used the same seed.'
+    r_2 = _run('serial')
+    assert [x['value'] for x in r] == [x['value'] for x in r_2], (
+        'Results not reproducible for a fixed seed.')
+    r_3 = _run('serial', seed=1)
+    assert [x['value'] for x in r] != [x['value'] for x in r_3], (
+        'Results identical for different seeds.')
+
+
+def test_parallel_executors(tmpdir):
+    r_serial = _run('serial')
+    for executor, queue in [('pool', None), ('disk_queue', None),
+                            ('disk_queue', tmpdir)]:
+        r = _run(executor, queue)
+        assert [x['target'] for x in r] == [0, 2, 4], (
+            'Results in wrong order for executor {0}.'.format(executor))
+        assert [x['value'] for x in r] == [x['value'] for x in r_serial], (
+            'Results of executor {0} differ from serial results.'.format(
+                executor))
+        assert all([x['pid'] != os.getpid() for x in r]), (
+            'Executor {0} did not use worker processes.'.format(executor))
+    # Results in an existing queue directory are reused for the same
+    # analysis.
+    result_file = os.path.join(str(tmpdir), 'result_000001.pkl')
+    mtime = os.stat(result_file).st_mtime_ns
+    os.remove(os.path.join(str(tmpdir), 'result_000002.pkl'))
+    r = _run('disk_queue', tmpdir)
+    assert [x['value'] for x in r] == [x['value'] for x in r_serial]
+    assert os.stat(result_file).st_mtime_ns == mtime, (
+        'Results of an existing queue were not reused.')
+    # Executor settings may change when resuming a queue.
+    os.remove(os.path.join(str(tmpdir), 'result_000002.pkl'))
+    r = _run('disk_queue', tmpdir, n_workers=3)
+    assert [x['value'] for x in r] == [x['value'] for x in r_serial]
+    assert os.stat(result_file).st_mtime_ns == mtime, (
+        'Results were not reused for a different no. workers.')
+    # Results of a different analysis are not reused.
+    with pytest.raises(RuntimeError):
+        _run('disk_queue', tmpdir, seed=5)
+    os.remove(os.path.join(str(tmpdir), 'manifest.txt'))
+    with pytest.raises(RuntimeError):
+        _run('disk_queue', tmpdir)
+
+
+def test_random_state_restored():
+    """Test if seeded jobs leave the caller's random state unchanged."""
+    np.random.seed(123)
+    expected = np.random.rand(3)
+    np.random.seed(123)
+    _run('serial', seed=1)
+    assert np.array_equal(np.random.rand(3), expected), (
+        'Serial executor changed the global random state.')
+
+
+def test_executor_errors():
+    with pytest.raises(RuntimeError):
+        _run('unknown')
+    # Temporary queue directories are removed if jobs fail.
+    queue_dirs = set(glob.glob(os.path.join(tempfile.gettempdir(),
+                                            'idtxl_queue_*')))
+    with pytest.raises(RuntimeError):
+        _run('disk_queue', analysis=FailingAnalysis())
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(),
+                                      'idtxl_queue_*'))) == queue_dirs, (
+        'Temporary queue directory was not removed.')
+    with pytest.raises(ValueError):
+        _run('pool', analysis=FailingAnalysis())
+
+
+if __name__ == '__main__':
+    test_random_state_restored()
+    test_executor_errors()
+    test_parallel_executors(tempfile.mkdtemp())
+    test_serial_executor()
@@ -9,6 +9,34 @@ import numpy as np
 from idtxl import stats
 from idtxl.multivariate_te import MultivariateTE
 from idtxl.data import Data
+from idtxl.estimator import Estimator
+
+
+class ChunkMeanEstimator(Estimator):
+    """Parallel dummy estimator returning the mean of var1 for each chunk."""
+
+    def __init__(self, settings=None):
+        self.settings = settings
+        self.n_calls = 0
+
+    def is_parallel(self):
+        return True
+
+    def is_analytic_null_estimator(self):
+        return False
+
+    def estimate(self, var1, var2, conditional=None, n_chunks=1):
+        self.n_calls += 1
+        assert var2.shape[0] == var1.shape[0], 'Re-used var2 was not tiled.'
+        return np.mean(var1.reshape(n_chunks, -1), axis=1)
+
+
+class ChunkFirstEstimator(ChunkMeanEstimator):
+    """Parallel dummy estimator returning the first value of each chunk."""
+
+    def estimate(self, var1, var2, conditional=None, n_chunks=1):
+        self.n_calls += 1
+        return var1.reshape(n_chunks, -1)[:, 0]
 
 
 def test_omnibus_test():
@@ -51,6 +79,176 @@ def test_max_statistic_sequential():
                                                    data=dat)
 
 
+def test_create_surrogate_table_batches():
+    """Test batched estimation of surrogate tables."""
+    dat = Data()
+    dat.generate_mute_data(104, 100)
+    settings = {
+        'cmi_estimator': ChunkMeanEstimator,
+        'max_lag_sources': 5,
+        'min_lag_sources': 1,
+        'max_lag_target': 5,
+        'permute_in_time': False
+        }
+    setup = MultivariateTE()
+    setup._initialise(settings, dat, sources=[0, 1], target=2)
+    setup._selected_vars_realisations = np.random.rand(
+                                    dat.n_realisations(setup.current_value),
+                                    2)
+    candidates = [(0, 1), (0, 2), (1, 1), (1, 3), (1, 4)]
+    n_perm = 21
+    tables = []
+    for max_mem, n_calls in zip([1e9, 1], [1, len(candidates)]):
+        setup._cmi_estimator.n_calls = 0
+        settings['max_mem_surrogates'] = max_mem
+        np.random.seed(0)
+        tables.append(stats._create_surrogate_table(setup, dat, candidates,
+                                                    n_perm))
+        assert setup._cmi_estimator.n_calls == n_calls, (
+            'Surrogates were not estimated in the expected number of batches.')
+    assert tables[0].shape == (len(candidates), n_perm)
+    assert np.array_equal(tables[0], tables[1]), (
+        'Batched and unbatched surrogate tables differ.')
+    # Surrogates are permutations of the candidate realisations.
+    for i, c in enumerate(candidates):
+        real = dat.get_realisations(setup.current_value, [c])[0]
+        assert np.allclose(tables[0][i, :], np.mean(real)), (
+            'Surrogate table does not hold estimates for the candidate.')
+
+
+def test_adaptive_permutation_test():
+    """Test early stopping of permutation tests."""
+    dat = Data()
+    dat.generate_mute_data(104, 100)
+    settings = {
+        'cmi_estimator': ChunkMeanEstimator,
+        'max_lag_sources': 5,
+        'min_lag_sources': 1,
+        'max_lag_target': 5,
+        'permute_in_time': False,
+        'n_perm_max_stat': 500,
+        'perm_adaptive': True
+        }
+    setup = MultivariateTE()
+    setup._initialise(settings, dat, sources=[0, 1], target=2)
+    setup._selected_vars_realisations = np.random.rand(
+                                    dat.n_realisations(setup.current_value),
+                                    2)
+    candidates = [(0, 1), (0, 2), (1, 1)]
+    # The dummy estimator returns the candidate's mean for each surrogate:
+    # candidates with a higher value are significant after the confidence
+    # bound drops below alpha, lower values are not significant after
+    # alpha * n_perm exceedances.
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, 10)
+    assert s, 'Candidate should be significant.'
+    assert surr_table.shape[1] == 100, (
+        'Adaptive test used {0} permutations.'.format(surr_table.shape[1]))
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, -10)
+    assert not s, 'Candidate should not be significant.'
+    assert surr_table.shape[1] == 50, (
+        'Adaptive test used {0} permutations.'.format(surr_table.shape[1]))
+    settings['perm_adaptive'] = False
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, 10)
+    assert surr_table.shape[1] == 500
+    assert setup._n_perm_used['max_stat'] == [100, 50, 500], (
+        'Number of permutations used was not recorded.')
+
+    # Stopping for non-significance must reproduce the decision of the full
+    # test, compare against tests on the full surrogate distribution.
+    n_perm = 500
+    alpha = 0.05
+    for seed in range(20):
+        np.random.seed(seed)
+        surrogates = np.random.rand(1, n_perm)
+        statistic = np.random.rand() * 0.1 + 0.9
+        used = [0]
+
+        def create_surrogates(n):
+            used[0] += n
+            return surrogates[:, used[0] - n:used[0]]
+
+        setup.settings['perm_adaptive'] = True
+        table = stats._get_adaptive_surrogates(
+            setup, create_surrogates, stats._find_table_max, statistic,
+            n_perm, alpha)
+        assert np.array_equal(table, surrogates[:, :table.shape[1]])
+        [s_adapt, p_adapt] = stats._find_pvalue(statistic, table[0], alpha,
+                                                'one_bigger')
+        [s_full, p_full] = stats._find_pvalue(statistic, surrogates[0],
+                                              alpha, 'one_bigger')
+        if not s_adapt:
+            assert not s_full, 'Early stopping changed the test decision.'
+
+
+def test_max_statistic_warm_start():
+    """Test re-use of permutations and screening in max statistics."""
+    dat = Data()
+    dat.generate_mute_data(104, 100)
+    settings = {
+        'cmi_estimator': ChunkFirstEstimator,
+        'max_lag_sources': 5,
+        'min_lag_sources': 1,
+        'max_lag_target': 5,
+        'permute_in_time': False,
+        'n_perm_max_stat': 200,
+        'perm_warm_start': True
+        }
+    setup = MultivariateTE()
+    setup._initialise(settings, dat, sources=[0, 1], target=2)
+    setup._selected_vars_realisations = np.random.rand(
+                                    dat.n_realisations(setup.current_value),
+                                    2)
+    candidates = [(0, 1), (0, 2), (1, 1)]
+    surr_table_1 = stats.max_statistic(setup, dat, candidates, 10)[2]
+    surr_table_2 = stats.max_statistic(setup, dat, candidates[1:], 10)[2]
+    assert np.array_equal(surr_table_1[1:, :], surr_table_2), (
+        'Permutations were not re-used.')
+    assert len(setup._max_stats_surr_realisations) == len(candidates), (
+        'Surrogate realisations were not kept.')
+    # Surrogates are the candidate realisations under the fixed permutations.
+    perm = setup._max_stats_perm
+    n_samples = dat.n_realisations_samples(setup.current_value)
+    for i, c in enumerate(candidates):
+        real = dat.get_realisations(setup.current_value, [c])[0]
+        assert np.array_equal(surr_table_1[i, :], real[perm[:, 0] * n_samples,
+                                                       0])
+
+    # Screening stops tests early for candidates far below the surrogate
+    # maxima of the previous call.
+    settings['perm_screening'] = True
+    setup._max_stats_surr_distribution = np.full(200, -20.)
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, -10)
+    assert surr_table.shape[1] == 200, 'Screened candidate above median.'
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, -10)
+    assert not s, 'Candidate should not be significant.'
+    assert surr_table.shape[1] == settings['n_perm_screen'], (
+        'Screening pass did not stop the test.')
+    assert np.array_equal(surr_table, surr_table_1[:, :surr_table.shape[1]]), (
+        'Screening pass did not use fixed permutations.')
+    [s, p, surr_table] = stats.max_statistic(setup, dat, candidates, 10)
+    assert s, 'Candidate should be significant.'
+    assert surr_table.shape[1] == 200, 'Screening pass was not completed.'
+
+    # Screening is skipped if the screening pass would use all permutations.
+    settings = {
+        'cmi_estimator': ChunkFirstEstimator,
+        'max_lag_sources': 5,
+        'min_lag_sources': 1,
+        'max_lag_target': 5,
+        'permute_in_time': False,
+        'n_perm_max_stat': 21,
+        'perm_screening': True
+        }
+    setup = MultivariateTE()
+    setup._initialise(settings, dat, sources=[0, 1], target=2)
+    setup._selected_vars_realisations = np.random.rand(
+                                    dat.n_realisations(setup.current_value),
+                                    2)
+    setup._max_stats_surr_distribution = np.full(21, 20.)
+    [s, p, surr_table] = stats.max_statistic(setup, dat, [(0, 1), (0, 2)], 10)
+    assert surr_table.shape == (2, 21), 'Wrong no. permutations.'
+
+
 def test_network_fdr():
     target_0 = {
         'selected_vars_sources': [(1, 1), (1, 2), (1, 3), (2, 1), (2, 0)],
@@ -152,6 +350,24 @@ def test_find_pvalue():
         stats._find_pvalue(test_val, distribution, alpha, tail='foo')
 
 
+def test_find_pvalues():
+    """Test p-values for multiple statistics against single comparisons."""
+    statistic = np.random.rand(10)
+    distribution = np.random.rand(10, 100)
+    alpha = 0.05
+    for tail in ['one_bigger', 'one_smaller', 'two']:
+        [s, p] = stats._find_pvalues(statistic, distribution, alpha, tail)
+        for i in range(statistic.shape[0]):
+            [s_i, p_i] = stats._find_pvalue(statistic[i], distribution[i, :],
+                                            alpha, tail)
+            assert s[i] == s_i, (
+                'Significance differs for statistic {0}.'.format(i))
+            assert p[i] == p_i, 'P-value differs for statistic {0}.'.format(i)
+    # Test assertion that no. statistics and distributions match.
+    with pytest.raises(AssertionError):
+        stats._find_pvalues(statistic[:5], distribution, alpha, tail)
+
+
 def test_find_table_max():
     tab = np.array([[0, 2, 1], [3, 4, 5], [10, 8, 1]])
     res = stats._find_table_max(tab)